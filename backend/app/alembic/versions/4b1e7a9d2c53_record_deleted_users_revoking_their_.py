@@ -0,0 +1,30 @@
+"""Record deleted users revoking their tokens
+
+Revision ID: 4b1e7a9d2c53
+Revises: dd7eafb2d707
+Create Date: 2026-10-19 20:12:41.308215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b1e7a9d2c53'
+down_revision = 'dd7eafb2d707'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('revoked_user',
+    sa.Column('user_id', sa.Uuid(), nullable=False),
+    sa.Column('revoked_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index(op.f('ix_revoked_user_revoked_at'), 'revoked_user', ['revoked_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_revoked_user_revoked_at'), table_name='revoked_user')
+    op.drop_table('revoked_user')
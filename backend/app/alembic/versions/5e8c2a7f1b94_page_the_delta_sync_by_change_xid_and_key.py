@@ -0,0 +1,41 @@
+"""Page the delta sync by change xid and key
+
+Revision ID: 5e8c2a7f1b94
+Revises: 4b1e7a9d2c53
+Create Date: 2026-10-19 21:40:12.517306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8c2a7f1b94'
+down_revision = '4b1e7a9d2c53'
+branch_labels = None
+depends_on = None
+
+# Tables of the delta sync, with their primary key
+SYNCED_TABLES = {
+    'sync_tombstone': ['id'],
+    'runsheet': ['id'],
+    'step_process': ['id'],
+    'sample': ['id'],
+    'link_runsheet_sample': ['sample_id', 'runsheet_id'],
+    'link_sample_step_process': ['sample_id', 'step_process_id'],
+    'link_sample_supervisor': ['sample_id', 'user_id'],
+}
+
+
+def upgrade():
+    # Pages resume after the last row served, which may share its change xid
+    # with the rows of the next page
+    for table, key in SYNCED_TABLES.items():
+        op.drop_index(op.f(f'ix_{table}_change_xid'), table_name=table)
+        op.create_index(op.f(f'ix_{table}_change_xid'), table, ['change_xid', *key], unique=False)
+
+
+def downgrade():
+    for table in SYNCED_TABLES:
+        op.drop_index(op.f(f'ix_{table}_change_xid'), table_name=table)
+        op.create_index(op.f(f'ix_{table}_change_xid'), table, ['change_xid'], unique=False)
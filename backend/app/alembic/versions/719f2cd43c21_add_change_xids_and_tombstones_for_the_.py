@@ -0,0 +1,91 @@
+"""Add change xids and tombstones for the delta sync
+
+Revision ID: 719f2cd43c21
+Revises: b83e5a0c6f21
+Create Date: 2026-10-19 14:55:39.473392
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel.sql.sqltypes
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '719f2cd43c21'
+down_revision = 'b83e5a0c6f21'
+branch_labels = None
+depends_on = None
+
+# Tables of the delta sync, with the columns identifying their deleted rows
+SYNCED_TABLES = {
+    'runsheet': ['id'],
+    'step_process': ['id'],
+    'sample': ['id'],
+    'link_runsheet_sample': ['runsheet_id', 'sample_id'],
+    'link_sample_step_process': ['sample_id', 'step_process_id'],
+    'link_sample_supervisor': ['sample_id', 'user_id'],
+}
+CHANGE_XID = '(pg_current_xact_id()::text::bigint)'
+
+
+def upgrade():
+    op.create_table('sync_tombstone',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('table_name', sqlmodel.sql.sqltypes.AutoString(length=255), nullable=False),
+    sa.Column('row_key', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('change_xid', sa.BigInteger(), server_default=sa.text(CHANGE_XID), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_sync_tombstone_change_xid'), 'sync_tombstone', ['change_xid'], unique=False)
+    op.create_index(op.f('ix_sync_tombstone_deleted_at'), 'sync_tombstone', ['deleted_at'], unique=False)
+
+    # Inserts get the transaction id from the column default, updates from this
+    op.execute(f"""
+        CREATE FUNCTION sync_set_change_xid() RETURNS trigger AS $$
+        BEGIN
+            NEW.change_xid := {CHANGE_XID};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    # Records the key columns named by the trigger arguments of a deleted row
+    op.execute("""
+        CREATE FUNCTION sync_add_tombstone() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO sync_tombstone (table_name, row_key)
+            SELECT TG_TABLE_NAME, jsonb_object_agg(key, value)
+            FROM jsonb_each(to_jsonb(OLD)) WHERE key = ANY(TG_ARGV);
+            RETURN OLD;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+
+    for table, key in SYNCED_TABLES.items():
+        # Existing rows predate every sync token, a constant default doesn't
+        # rewrite the table
+        op.add_column(table, sa.Column('change_xid', sa.BigInteger(), server_default='0', nullable=False))
+        op.alter_column(table, 'change_xid', server_default=sa.text(CHANGE_XID))
+        op.create_index(op.f(f'ix_{table}_change_xid'), table, ['change_xid'], unique=False)
+        op.execute(f"""
+            CREATE TRIGGER {table}_change_xid BEFORE UPDATE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION sync_set_change_xid()
+        """)
+        key_columns = ", ".join(f"'{column}'" for column in key)
+        op.execute(f"""
+            CREATE TRIGGER {table}_tombstone AFTER DELETE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION sync_add_tombstone({key_columns})
+        """)
+
+
+def downgrade():
+    for table in SYNCED_TABLES:
+        op.execute(f"DROP TRIGGER {table}_tombstone ON {table}")
+        op.execute(f"DROP TRIGGER {table}_change_xid ON {table}")
+        op.drop_index(op.f(f'ix_{table}_change_xid'), table_name=table)
+        op.drop_column(table, 'change_xid')
+    op.execute("DROP FUNCTION sync_add_tombstone()")
+    op.execute("DROP FUNCTION sync_set_change_xid()")
+    op.drop_index(op.f('ix_sync_tombstone_deleted_at'), table_name='sync_tombstone')
+    op.drop_index(op.f('ix_sync_tombstone_change_xid'), table_name='sync_tombstone')
+    op.drop_table('sync_tombstone')
@@ -0,0 +1,29 @@
+"""Record when token versions are bumped
+
+Revision ID: 8a3f6c0d2e71
+Revises: 5e8c2a7f1b94
+Create Date: 2026-10-19 22:18:53.904127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a3f6c0d2e71'
+down_revision = '5e8c2a7f1b94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('user', sa.Column('token_version_bumped_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index(op.f('ix_user_token_version_bumped_at'), 'user', ['token_version_bumped_at'], unique=False)
+    # The tokens of earlier bumps may still be valid, they stay revoked for as
+    # long as the tokens issued now
+    op.execute('UPDATE "user" SET token_version_bumped_at = now() WHERE token_version > 0')
+
+
+def downgrade():
+    op.drop_index(op.f('ix_user_token_version_bumped_at'), table_name='user')
+    op.drop_column('user', 'token_version_bumped_at')
@@ -0,0 +1,63 @@
+"""Index user email case-insensitively
+
+Revision ID: b83e5a0c6f21
+Revises: 3f2b9c1d7e40
+Create Date: 2026-10-19 16:48:37.905214
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b83e5a0c6f21'
+down_revision = '3f2b9c1d7e40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Merge the accounts whose emails only differ in case into one, preferring
+    # superusers, then active users, then the oldest account
+    op.execute("""
+        CREATE TEMPORARY TABLE user_duplicate AS
+        SELECT id, first_value(id) OVER (
+            PARTITION BY lower(email)
+            ORDER BY is_superuser DESC, is_active DESC, created_at, id
+        ) AS keep_id
+        FROM "user"
+    """)
+    op.execute("DELETE FROM user_duplicate WHERE id = keep_id")
+    for table, column in [
+        ("item", "owner_id"),
+        ("sample", "creator_id"),
+        ("runsheet", "creator_id"),
+        ("runsheet", "reviewer_id"),
+        ("step_process", "creator_id"),
+        ("step_process", "engineer_id"),
+    ]:
+        op.execute(f"""
+            UPDATE {table} SET {column} = d.keep_id
+            FROM user_duplicate d WHERE {table}.{column} = d.id
+        """)
+    op.execute("""
+        INSERT INTO link_sample_supervisor (sample_id, user_id)
+        SELECT l.sample_id, d.keep_id
+        FROM link_sample_supervisor l JOIN user_duplicate d ON l.user_id = d.id
+        ON CONFLICT DO NOTHING
+    """)
+    op.execute("""
+        DELETE FROM link_sample_supervisor l
+        USING user_duplicate d WHERE l.user_id = d.id
+    """)
+    op.execute('DELETE FROM "user" u USING user_duplicate d WHERE u.id = d.id')
+    op.execute("DROP TABLE user_duplicate")
+    op.execute('UPDATE "user" SET email = lower(email) WHERE email <> lower(email)')
+
+    op.drop_index('ix_user_email', table_name='user')
+    op.create_index('ix_user_email_lower', 'user', [sa.text('lower(email)')], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_user_email_lower', table_name='user')
+    op.create_index('ix_user_email', 'user', ['email'], unique=True)
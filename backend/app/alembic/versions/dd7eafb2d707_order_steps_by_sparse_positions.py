@@ -0,0 +1,49 @@
+"""Order steps by sparse positions
+
+Revision ID: dd7eafb2d707
+Revises: ebf55f2c008d
+Create Date: 2026-10-19 18:40:27.615093
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'dd7eafb2d707'
+down_revision = 'ebf55f2c008d'
+branch_labels = None
+depends_on = None
+
+# app.step_order.POSITION_GAP when this migration was written
+POSITION_GAP = 1024
+
+
+def upgrade():
+    op.alter_column('step_process', 'step_number', new_column_name='position', type_=sa.BigInteger(), existing_nullable=False)
+    op.execute(f"""
+        UPDATE step_process SET position = ranked.position
+        FROM (
+            SELECT id, row_number() OVER (
+                PARTITION BY runsheet_id ORDER BY position, id
+            ) * {POSITION_GAP} AS position
+            FROM step_process
+        ) AS ranked
+        WHERE step_process.id = ranked.id
+    """)
+    op.create_index('ix_step_process_runsheet_id_position', 'step_process', ['runsheet_id', 'position'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_step_process_runsheet_id_position', table_name='step_process')
+    op.execute("""
+        UPDATE step_process SET position = ranked.step_number
+        FROM (
+            SELECT id, row_number() OVER (
+                PARTITION BY runsheet_id ORDER BY position, id
+            ) - 1 AS step_number
+            FROM step_process
+        ) AS ranked
+        WHERE step_process.id = ranked.id
+    """)
+    op.alter_column('step_process', 'position', new_column_name='step_number', type_=sa.Integer(), existing_nullable=False)
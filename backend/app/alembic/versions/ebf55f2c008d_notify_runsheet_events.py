@@ -0,0 +1,66 @@
+"""Notify step completions and runsheet state transitions
+
+Revision ID: ebf55f2c008d
+Revises: 719f2cd43c21
+Create Date: 2026-10-19 17:12:08.391204
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'ebf55f2c008d'
+down_revision = '719f2cd43c21'
+branch_labels = None
+depends_on = None
+
+# Channel listened to by the API workers (see app/runsheet_events.py). Payloads
+# are delivered when the transaction commits, and must stay under 8000 bytes
+CHANNEL = 'runsheet_events'
+# Function, table, column, event payload
+NOTIFIERS = [
+    ('notify_runsheet_state', 'runsheet', 'state', """
+        'type', 'state_changed',
+        'runsheet_id', NEW.id,
+        'state', NEW.state
+    """),
+    ('notify_step_completed', 'step_process', 'completed', """
+        'type', 'step_completed',
+        'runsheet_id', NEW.runsheet_id,
+        'step_process_id', NEW.id,
+        'completed', NEW.completed,
+        'date_completed', NEW.date_completed
+    """),
+    ('notify_sample_step_completed', 'link_sample_step_process', 'completed', """
+        'type', 'sample_step_completed',
+        'runsheet_id', (
+            SELECT runsheet_id FROM step_process WHERE id = NEW.step_process_id
+        ),
+        'step_process_id', NEW.step_process_id,
+        'sample_id', NEW.sample_id,
+        'completed', NEW.completed
+    """),
+]
+
+
+def upgrade():
+    for function, table, column, payload in NOTIFIERS:
+        op.execute(f"""
+            CREATE FUNCTION {function}() RETURNS trigger AS $$
+            BEGIN
+                PERFORM pg_notify('{CHANNEL}', json_build_object({payload})::text);
+                RETURN NULL;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {table}_notify AFTER UPDATE OF {column} ON {table}
+            FOR EACH ROW WHEN (OLD.{column} IS DISTINCT FROM NEW.{column})
+            EXECUTE FUNCTION {function}()
+        """)
+
+
+def downgrade():
+    for function, table, _column, _payload in NOTIFIERS:
+        op.execute(f"DROP TRIGGER {table}_notify ON {table}")
+        op.execute(f"DROP FUNCTION {function}()")
@@ -1,8 +1,10 @@
+import math
+import time
 from collections.abc import Generator
 from typing import Annotated
 
 import jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, Response, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
 from pydantic import ValidationError
@@ -10,38 +12,80 @@ from sqlmodel import Session
 
 from app.core import security
 from app.core.config import settings
-from app.core.db import engine
+from app.core.db import RoutingSession, create_read_only_session
+from app.core.revocation import revoked_tokens
 from app.models import User
-from app.schemas.general import TokenPayload
+from app.schemas.general import TokenClaims, TokenPayload
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/login/access-token"
 )
 
 
-def get_db() -> Generator[Session, None, None]:
-    with Session(engine) as session:
+# Set on the responses of requests that wrote, for the replicas to catch up
+PRIMARY_READS_COOKIE = "primary_reads_until"
+
+
+def get_db(response: Response) -> Generator[Session, None, None]:
+    def stick_to_primary() -> None:
+        # The client sends it to every worker, unlike state kept in the worker
+        if settings.POSTGRES_REPLICA_URIS:
+            until = time.time() + settings.REPLICA_STICKY_SECONDS
+            response.set_cookie(
+                PRIMARY_READS_COOKIE,
+                f"{until:.3f}",
+                max_age=math.ceil(settings.REPLICA_STICKY_SECONDS),
+                path=settings.API_V1_STR,
+                httponly=True,
+                samesite="lax",
+            )
+
+    with RoutingSession(on_write=stick_to_primary) as session:
+        yield session
+
+
+def reads_from_primary(request: Request) -> bool:
+    try:
+        until = float(request.cookies.get(PRIMARY_READS_COOKIE, 0))
+    except ValueError:
+        return False
+    return until > time.time()
+
+
+def get_read_db(request: Request) -> Generator[Session, None, None]:
+    with create_read_only_session(reads_from_primary(request)) as session:
         yield session
 
 
 SessionDep = Annotated[Session, Depends(get_db)]
+# For routes that only read, the database rejects their writes
+ReadSessionDep = Annotated[Session, Depends(get_read_db)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
 
-def get_current_user(session: SessionDep, token: TokenDep) -> User:
+def decode_token(token: str) -> TokenPayload:
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
         )
-        token_data = TokenPayload(**payload)
+        return TokenPayload(**payload)
     except (InvalidTokenError, ValidationError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
+
+
+def get_current_user(session: SessionDep, token: TokenDep) -> User:
+    token_data = decode_token(token)
     user = session.get(User, token_data.sub)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    if token_data.ver is not None and token_data.ver != user.token_version:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Could not validate credentials",
+        )
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return user
@@ -50,9 +94,59 @@ def get_current_user(session: SessionDep, token: TokenDep) -> User:
 CurrentUser = Annotated[User, Depends(get_current_user)]
 
 
+def get_current_claims(session: ReadSessionDep, token: TokenDep) -> TokenClaims:
+    """Permissions of the current user, for routes that don't need its row.
+
+    Claims tokens are answered from the token and the in-memory revocation set,
+    other tokens load the user.
+    """
+    token_data = decode_token(token)
+    if (
+        token_data.ver is None
+        or token_data.is_active is None
+        or token_data.is_superuser is None
+        or token_data.is_reviewer is None
+    ):
+        return TokenClaims.model_validate(
+            get_current_user(session, token), from_attributes=True
+        )
+    try:
+        claims = TokenClaims.model_validate(
+            token_data.model_dump(exclude={"sub", "ver"}) | {"id": token_data.sub}
+        )
+    except ValidationError:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Could not validate credentials",
+        )
+    if revoked_tokens.is_stale():
+        # Replicas may not have the latest revocations yet
+        with create_read_only_session(read_from_primary=True) as primary_session:
+            revoked_tokens.sync(primary_session)
+    if revoked_tokens.is_revoked(claims.id, token_data.ver):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Could not validate credentials",
+        )
+    if not claims.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return claims
+
+
+CurrentClaims = Annotated[TokenClaims, Depends(get_current_claims)]
+
+
 def get_current_active_superuser(current_user: CurrentUser) -> User:
     if not current_user.is_superuser:
         raise HTTPException(
             status_code=403, detail="The user doesn't have enough privileges"
         )
     return current_user
+
+
+def get_current_superuser_claims(claims: CurrentClaims) -> TokenClaims:
+    if not claims.is_superuser:
+        raise HTTPException(
+            status_code=403, detail="The user doesn't have enough privileges"
+        )
+    return claims
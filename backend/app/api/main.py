@@ -1,6 +1,15 @@
 from fastapi import APIRouter
 
-from app.api.routes import items, login, private, users, utils
+from app.api.routes import (
+    batch,
+    items,
+    login,
+    private,
+    runsheets,
+    sync,
+    users,
+    utils,
+)
 from app.core.config import settings
 
 api_router = APIRouter()
@@ -8,6 +17,9 @@ api_router.include_router(login.router)
 api_router.include_router(users.router)
 api_router.include_router(utils.router)
 api_router.include_router(items.router)
+api_router.include_router(batch.router)
+api_router.include_router(sync.router)
+api_router.include_router(runsheets.router)
 
 
 if settings.ENVIRONMENT == "local":
@@ -0,0 +1,118 @@
+"""Batched API calls
+
+Clients on slow networks send several calls in one `POST /batch/`. The
+sub-requests run in-process against the app itself, through its middleware and
+dependencies, so each one is authenticated by `get_current_user` (with the
+batch's Authorization header unless it sets its own), limited and measured like
+a direct call. They get the batch's cookies, and the cookies they set are set on
+the batch response and sent to the sub-requests after them, so reads after a
+write stay on the primary. Consecutive GET sub-requests run concurrently, any other one runs
+alone, after the ones before it finished. Batches can't be nested.
+"""
+
+from contextvars import ContextVar
+from typing import Any
+from urllib.parse import unquote, urlsplit
+
+import anyio
+import httpx
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from app.core.config import settings
+from app.schemas.batch.batch_requests import BatchRequest, BatchSubRequest
+from app.schemas.batch.batch_returns import BatchResponse, BatchSubResponse
+
+router = APIRouter(prefix="/batch", tags=["batch"])
+
+# Set while the sub-requests of a batch run, they inherit it
+_in_batch: ContextVar[bool] = ContextVar("in_batch", default=False)
+
+
+def _is_api_call(url: str) -> bool:
+    parts = urlsplit(url)
+    # httpx resolves dot segments, which would hide the path actually called
+    segments = [unquote(segment) for segment in parts.path.split("/")]
+    return (
+        not parts.scheme
+        and not parts.netloc
+        and not {".", ".."} & set(segments)
+        and parts.path.startswith(f"{settings.API_V1_STR}/")
+        and not parts.path.startswith(f"{settings.API_V1_STR}{router.prefix}")
+    )
+
+
+def _to_sub_response(response: httpx.Response) -> BatchSubResponse:
+    body: Any = None
+    if response.content:
+        if response.headers.get("content-type", "").startswith("application/json"):
+            body = response.json()
+        else:
+            body = response.text
+    return BatchSubResponse(status=response.status_code, body=body)
+
+
+@router.post("/", response_model=BatchResponse)
+async def run_batch(
+    request: Request, response: Response, batch_in: BatchRequest
+) -> Any:
+    """
+    Run several API calls in one request.
+    """
+    if _in_batch.get():
+        raise HTTPException(status_code=400, detail="Batches can't be nested")
+    for index, sub_request in enumerate(batch_in.requests):
+        if not _is_api_call(sub_request.url):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Sub-request {index} is not a call to the API",
+            )
+
+    headers = {}
+    if "authorization" in request.headers:
+        headers["authorization"] = request.headers["authorization"]
+    cookies = dict(request.cookies)
+    responses: list[BatchSubResponse | None] = [None] * len(batch_in.requests)
+    limiter = anyio.CapacityLimiter(settings.BATCH_MAX_CONCURRENCY)
+    transport = httpx.ASGITransport(app=request.app, raise_app_exceptions=False)
+    base_url = f"{request.url.scheme}://{request.url.netloc}"
+
+    token = _in_batch.set(True)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url=base_url) as client:
+
+            async def send(index: int, sub_request: BatchSubRequest) -> None:
+                sub_headers = dict(headers)
+                if cookies:
+                    sub_headers["cookie"] = "; ".join(
+                        f"{name}={value}" for name, value in cookies.items()
+                    )
+                async with limiter:
+                    sub_response = await client.request(
+                        sub_request.method,
+                        sub_request.url,
+                        headers={**sub_headers, **sub_request.headers},
+                        json=sub_request.body,
+                    )
+                cookies.update(sub_response.cookies)
+                for set_cookie in sub_response.headers.get_list("set-cookie"):
+                    response.headers.append("set-cookie", set_cookie)
+                responses[index] = _to_sub_response(sub_response)
+
+            async def send_reads(reads: list[tuple[int, BatchSubRequest]]) -> None:
+                async with anyio.create_task_group() as task_group:
+                    for index, sub_request in reads:
+                        task_group.start_soon(send, index, sub_request)
+
+            reads: list[tuple[int, BatchSubRequest]] = []
+            for index, sub_request in enumerate(batch_in.requests):
+                if sub_request.method == "GET":
+                    reads.append((index, sub_request))
+                    continue
+                await send_reads(reads)
+                reads = []
+                await send(index, sub_request)
+            await send_reads(reads)
+    finally:
+        _in_batch.reset(token)
+
+    return BatchResponse(responses=responses)
@@ -4,10 +4,11 @@ from typing import Any
 from fastapi import APIRouter, HTTPException
 from sqlmodel import func, select
 
-from app.api.deps import CurrentUser, SessionDep
+from app import crud
+from app.api.deps import CurrentClaims, CurrentUser, ReadSessionDep, SessionDep
 from app.models import Item
 from app.schemas.general import Message
-from app.schemas.item.item_creation import ItemCreate
+from app.schemas.item.item_creation import ItemCreate, ItemsCreate
 from app.schemas.item.item_returns import ItemPublic, ItemsPublic
 from app.schemas.item.item_updating import ItemUpdate
 
@@ -16,7 +17,10 @@ router = APIRouter(prefix="/items", tags=["items"])
 
 @router.get("/", response_model=ItemsPublic)
 def read_items(
-    session: SessionDep, current_user: CurrentUser, skip: int = 0, limit: int = 100
+    session: ReadSessionDep,
+    current_user: CurrentClaims,
+    skip: int = 0,
+    limit: int = 100,
 ) -> Any:
     """
     Retrieve items.
@@ -46,7 +50,9 @@ def read_items(
 
 
 @router.get("/{id}", response_model=ItemPublic)
-def read_item(session: SessionDep, current_user: CurrentUser, id: uuid.UUID) -> Any:
+def read_item(
+    session: ReadSessionDep, current_user: CurrentClaims, id: uuid.UUID
+) -> Any:
     """
     Get item by ID.
     """
@@ -65,11 +71,20 @@ def create_item(
     """
     Create new item.
     """
-    item = Item.model_validate(item_in, update={"owner_id": current_user.id})
-    session.add(item)
-    session.commit()
-    session.refresh(item)
-    return item
+    return crud.create_item(session=session, item_in=item_in, owner_id=current_user.id)
+
+
+@router.post("/bulk", response_model=ItemsPublic)
+def create_items_bulk(
+    *, session: SessionDep, current_user: CurrentUser, items_in: ItemsCreate
+) -> Any:
+    """
+    Create many items at once.
+    """
+    items = crud.create_items(
+        session=session, items_in=items_in.data, owner_id=current_user.id
+    )
+    return ItemsPublic(data=items, count=len(items))
 
 
 @router.put("/{id}", response_model=ItemPublic)
@@ -92,7 +107,6 @@ def update_item(
     item.sqlmodel_update(update_dict)
     session.add(item)
     session.commit()
-    session.refresh(item)
     return item
 
 
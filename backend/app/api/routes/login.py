@@ -9,7 +9,6 @@ from app import crud
 from app.api.deps import CurrentUser, SessionDep, get_current_active_superuser
 from app.core import security
 from app.core.config import settings
-from app.core.security import get_password_hash
 from app.schemas.general import Message, NewPassword, Token
 from app.schemas.user.user_returns import UserPublic
 from app.utils import (
@@ -37,9 +36,17 @@ def login_access_token(
     elif not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    claims = None
+    if settings.ACCESS_TOKEN_CLAIMS:
+        claims = {
+            "is_active": user.is_active,
+            "is_superuser": user.is_superuser,
+            "is_reviewer": user.is_reviewer,
+            "ver": user.token_version,
+        }
     return Token(
         access_token=security.create_access_token(
-            user.id, expires_delta=access_token_expires
+            user.id, expires_delta=access_token_expires, claims=claims
         )
     )
 
@@ -64,15 +71,13 @@ def recover_password(email: str, session: SessionDep) -> Message:
             status_code=404,
             detail="The user with this email does not exist in the system.",
         )
-    password_reset_token = generate_password_reset_token(email=email)
-    email_data = generate_reset_password_email(
-        email_to=user.email, email=email, token=password_reset_token
-    )
     send_email(
+        session=session,
         email_to=user.email,
-        subject=email_data.subject,
-        html_content=email_data.html_content,
+        email="password_recovery",
+        params={"email": email},
     )
+    session.commit()
     return Message(message="Password recovery email sent")
 
 
@@ -92,10 +97,7 @@ def reset_password(session: SessionDep, body: NewPassword) -> Message:
         )
     elif not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    hashed_password = get_password_hash(password=body.new_password)
-    user.hashed_password = hashed_password
-    session.add(user)
-    session.commit()
+    crud.update_password(session=session, db_user=user, password=body.new_password)
     return Message(message="Password updated successfully")
 
 
@@ -6,13 +6,14 @@ from pydantic import BaseModel
 from app.api.deps import SessionDep
 from app.core.security import get_password_hash
 from app.models import User
+from app.schemas.user.user_base import NormalizedEmail
 from app.schemas.user.user_returns import UserPublic
 
 router = APIRouter(tags=["private"], prefix="/private")
 
 
 class PrivateUserCreate(BaseModel):
-    email: str
+    email: NormalizedEmail
     password: str
     name: str
     is_verified: bool = False
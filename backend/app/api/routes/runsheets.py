@@ -0,0 +1,155 @@
+import json
+import time
+import uuid
+from collections.abc import AsyncIterator
+from typing import Any
+
+import anyio
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import undefer_group
+from sqlmodel import Session
+
+from app import step_order
+from app.api.deps import CurrentUser, ReadSessionDep, SessionDep, get_current_claims
+from app.core.config import settings
+from app.core.deadlines import get_time_left
+from app.models import DETAIL_COLUMNS, Runsheet, StepProcess, User
+from app.runsheet_events import Event, hub
+from app.schemas.step_process.step_process_base import StepPlacement
+from app.schemas.step_process.step_process_creation import StepProcessCreate
+from app.schemas.step_process.step_process_returns import StepProcessPublic
+from app.schemas.step_process.step_process_updating import StepProcessMove
+
+router = APIRouter(prefix="/runsheets", tags=["runsheets"])
+
+KEEPALIVE = ": keepalive\n\n"
+
+
+def format_event(event: Event) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+async def stream_events(runsheet_id: uuid.UUID) -> AsyncIterator[str]:
+    # Ends a second before the request deadline, EventSource clients reconnect
+    ends_at = time.monotonic() + (get_time_left() or 0) - 1
+    try:
+        async with hub.subscribe(
+            runsheet_id, timeout=ends_at - time.monotonic()
+        ) as events:
+            yield format_event({"type": "ready", "runsheet_id": str(runsheet_id)})
+            while (time_left := ends_at - time.monotonic()) > 0:
+                event: Event | None = None
+                with anyio.move_on_after(
+                    min(time_left, settings.RUNSHEET_EVENTS_KEEPALIVE_SECONDS)
+                ):
+                    try:
+                        event = await events.receive()
+                    except anyio.EndOfStream:
+                        return
+                yield KEEPALIVE if event is None else format_event(event)
+    except TimeoutError:
+        # The listener is down, the client retries
+        return
+
+
+@router.get(
+    "/{id}/events",
+    dependencies=[Depends(get_current_claims)],
+    response_class=StreamingResponse,
+)
+def runsheet_events(session: ReadSessionDep, id: uuid.UUID) -> StreamingResponse:
+    """
+    Stream the step completions and state transitions of a runsheet as
+    server-sent events. Load the runsheet after the `ready` and `resync` events,
+    and apply the other events to it.
+    """
+    if not session.get(Runsheet, id):
+        raise HTTPException(status_code=404, detail="Runsheet not found")
+    # Shared with the claims check. Dependencies may only be closed once the
+    # response streamed, so it returns its connection now
+    session.close()
+    return StreamingResponse(
+        stream_events(id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _get_editable_runsheet(
+    session: Session, current_user: User, runsheet_id: uuid.UUID
+) -> Runsheet:
+    runsheet = session.get(Runsheet, runsheet_id)
+    if not runsheet:
+        raise HTTPException(status_code=404, detail="Runsheet not found")
+    if not current_user.is_superuser and (runsheet.creator_id != current_user.id):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    return runsheet
+
+
+def _check_neighbour(
+    session: Session, step: StepProcess, placement: StepPlacement
+) -> None:
+    neighbour_id = placement.before_id or placement.after_id
+    if neighbour_id is None:
+        return
+    if neighbour_id == step.id:
+        raise HTTPException(status_code=400, detail="A step can't be its own neighbour")
+    neighbour = session.get(StepProcess, neighbour_id)
+    if not neighbour or neighbour.runsheet_id != step.runsheet_id:
+        raise HTTPException(status_code=404, detail="Step not found")
+
+
+def _place_step(session: Session, step: StepProcess, placement: StepPlacement) -> None:
+    _check_neighbour(session, step, placement)
+    rebalance_due = step_order.place_step(
+        session=session,
+        step=step,
+        before_id=placement.before_id,
+        after_id=placement.after_id,
+    )
+    session.add(step)
+    session.commit()
+    if rebalance_due:
+        step_order.schedule_rebalance(session=session, runsheet_id=step.runsheet_id)
+        session.commit()
+
+
+@router.post("/{id}/steps", response_model=StepProcessPublic)
+def create_step(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    id: uuid.UUID,
+    step_in: StepProcessCreate,
+) -> Any:
+    """
+    Add a step to a runsheet, before or after one of its steps, or last.
+    """
+    _get_editable_runsheet(session, current_user, id)
+    step = StepProcess.model_validate(
+        step_in.model_dump(exclude={"before_id", "after_id"}),
+        update={"runsheet_id": id, "creator_id": current_user.id},
+    )
+    _place_step(session, step, step_in)
+    return step
+
+
+@router.put("/{id}/steps/{step_id}/position", response_model=StepProcessPublic)
+def move_step(
+    *,
+    session: SessionDep,
+    current_user: CurrentUser,
+    id: uuid.UUID,
+    step_id: uuid.UUID,
+    move_in: StepProcessMove,
+) -> Any:
+    """
+    Move a step of a runsheet before or after another of its steps, or last.
+    """
+    _get_editable_runsheet(session, current_user, id)
+    step = session.get(StepProcess, step_id, options=[undefer_group(DETAIL_COLUMNS)])
+    if not step or step.runsheet_id != id:
+        raise HTTPException(status_code=404, detail="Step not found")
+    _place_step(session, step, move_in)
+    return step
@@ -0,0 +1,62 @@
+from datetime import datetime, timezone
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.api.deps import ReadSessionDep, get_current_claims
+from app.schemas.sync.sync_returns import SyncChanges, SyncDeletion
+from app.sync import (
+    FIRST_TABLE,
+    SyncPage,
+    decode_token,
+    encode_token,
+    get_snapshot_xmin,
+    is_expired,
+    read_page,
+)
+
+router = APIRouter(prefix="/sync", tags=["sync"])
+
+
+@router.get("/", dependencies=[Depends(get_current_claims)], response_model=SyncChanges)
+def sync_changes(session: ReadSessionDep, since: str | None = None) -> Any:
+    """
+    Get the runsheets, steps, samples and links changed since a sync token, all
+    of them without one. While `has_more` is set, sync again with the returned
+    token to get the rest.
+
+    Rows aren't scoped to the caller, every active user can read every runsheet,
+    step and sample.
+    """
+    if since is None:
+        # Taken before the queries, rows committed while they run are sent again
+        xmin = get_snapshot_xmin(session)
+        issued_at = datetime.now(timezone.utc)
+        page = SyncPage(since=0, table=FIRST_TABLE)
+    else:
+        try:
+            xmin, issued_at, next_page = decode_token(since)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid sync token")
+        if is_expired(issued_at):
+            raise HTTPException(
+                status_code=410, detail="The sync token expired, sync without it"
+            )
+        if next_page is None:
+            page = SyncPage(since=xmin, table=0)
+            xmin = get_snapshot_xmin(session)
+            issued_at = datetime.now(timezone.utc)
+        else:
+            page = next_page
+
+    changes, next_page = read_page(session, page)
+    deleted = [
+        SyncDeletion(table=tombstone.table_name, key=tombstone.row_key)
+        for tombstone in changes.pop("deleted")
+    ]
+    return SyncChanges(
+        token=encode_token(xmin, issued_at, next_page),
+        has_more=next_page is not None,
+        deleted=deleted,
+        **changes,
+    )
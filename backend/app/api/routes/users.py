@@ -6,28 +6,31 @@ from sqlmodel import col, delete, func, select
 
 from app import crud
 from app.api.deps import (
+    CurrentClaims,
     CurrentUser,
+    ReadSessionDep,
     SessionDep,
     get_current_active_superuser,
+    get_current_superuser_claims,
 )
 from app.core.config import settings
-from app.core.security import get_password_hash, verify_password
+from app.core.security import verify_password
 from app.models import Item, User
 from app.schemas.general import Message
 from app.schemas.user.user_creation import UserCreate, UserRegister
 from app.schemas.user.user_returns import UserPublic, UsersPublic
 from app.schemas.user.user_updating import UpdatePassword, UserUpdate, UserUpdateMe
-from app.utils import generate_new_account_email, send_email
+from app.utils import send_email
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
 @router.get(
     "/",
-    dependencies=[Depends(get_current_active_superuser)],
+    dependencies=[Depends(get_current_superuser_claims)],
     response_model=UsersPublic,
 )
-def read_users(session: SessionDep, skip: int = 0, limit: int = 100) -> Any:
+def read_users(session: ReadSessionDep, skip: int = 0, limit: int = 100) -> Any:
     """
     Retrieve users.
     """
@@ -57,14 +60,13 @@ def create_user(*, session: SessionDep, user_in: UserCreate) -> Any:
 
     user = crud.create_user(session=session, user_create=user_in)
     if settings.emails_enabled and user_in.email:
-        email_data = generate_new_account_email(
-            email_to=user_in.email, username=user_in.email, password=user_in.password
-        )
         send_email(
+            session=session,
             email_to=user_in.email,
-            subject=email_data.subject,
-            html_content=email_data.html_content,
+            email="new_account",
+            params={"username": user_in.email},
         )
+        session.commit()
     return user
 
 
@@ -86,7 +88,6 @@ def update_user_me(
     current_user.sqlmodel_update(user_data)
     session.add(current_user)
     session.commit()
-    session.refresh(current_user)
     return current_user
 
 
@@ -103,10 +104,9 @@ def update_password_me(
         raise HTTPException(
             status_code=400, detail="New password cannot be the same as the current one"
         )
-    hashed_password = get_password_hash(body.new_password)
-    current_user.hashed_password = hashed_password
-    session.add(current_user)
-    session.commit()
+    crud.update_password(
+        session=session, db_user=current_user, password=body.new_password
+    )
     return Message(message="Password updated successfully")
 
 
@@ -127,8 +127,7 @@ def delete_user_me(session: SessionDep, current_user: CurrentUser) -> Any:
         raise HTTPException(
             status_code=403, detail="Super users are not allowed to delete themselves"
         )
-    session.delete(current_user)
-    session.commit()
+    crud.delete_user(session=session, db_user=current_user)
     return Message(message="User deleted successfully")
 
 
@@ -150,13 +149,13 @@ def register_user(session: SessionDep, user_in: UserRegister) -> Any:
 
 @router.get("/{user_id}", response_model=UserPublic)
 def read_user_by_id(
-    user_id: uuid.UUID, session: SessionDep, current_user: CurrentUser
+    user_id: uuid.UUID, session: ReadSessionDep, current_user: CurrentClaims
 ) -> Any:
     """
     Get a specific user by id.
     """
     user = session.get(User, user_id)
-    if user == current_user:
+    if user and user.id == current_user.id:
         return user
     if not current_user.is_superuser:
         raise HTTPException(
@@ -214,6 +213,5 @@ def delete_user(
         )
     statement = delete(Item).where(col(Item.owner_id) == user_id)
     session.exec(statement)  # type: ignore
-    session.delete(user)
-    session.commit()
+    crud.delete_user(session=session, db_user=user)
     return Message(message="User deleted successfully")
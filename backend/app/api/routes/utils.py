@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Depends
 from pydantic.networks import EmailStr
 
-from app.api.deps import get_current_active_superuser
+from app.api.deps import SessionDep, get_current_active_superuser
 from app.schemas.general import Message
-from app.utils import generate_test_email, send_email
+from app.utils import send_email
 
 router = APIRouter(prefix="/utils", tags=["utils"])
 
@@ -13,16 +13,12 @@ router = APIRouter(prefix="/utils", tags=["utils"])
     dependencies=[Depends(get_current_active_superuser)],
     status_code=201,
 )
-def test_email(email_to: EmailStr) -> Message:
+def test_email(email_to: EmailStr, session: SessionDep) -> Message:
     """
     Test emails.
     """
-    email_data = generate_test_email(email_to=email_to)
-    send_email(
-        email_to=email_to,
-        subject=email_data.subject,
-        html_content=email_data.html_content,
-    )
+    send_email(session=session, email_to=email_to, email="test_email")
+    session.commit()
     return Message(message="Test email sent")
 
 
@@ -1,11 +1,192 @@
-from sqlmodel import Session, create_engine, select
+import os
+import random
+from collections.abc import Callable, Generator
+from contextlib import contextmanager
+from typing import Any
+
+from sqlalchemy import Connection, Engine, NullPool, event, make_url
+from sqlalchemy.orm import ORMExecuteState
+from sqlmodel import Session, create_engine, select, text
 
 from app import crud
 from app.core.config import settings
+from app.core.metrics import instrument_engine
+from app.core.timing import track_query_timings
 from app.models import User
 from app.schemas.user.user_creation import UserCreate
 
-engine = create_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+# The engine and its pool belong to a single process. It is created on first use,
+# after `uvicorn --workers` has started the worker processes, and disposed by
+# the app lifespan on shutdown so draining workers close their connections.
+_engine: Engine | None = None
+# Engines of the read replicas, managed like the primary one
+_replica_engines: list[Engine] | None = None
+
+
+def create_db_engine(url: str | None = None) -> Engine:
+    engine = create_engine(url or str(settings.SQLALCHEMY_DATABASE_URI))
+    instrument_engine(engine)
+    track_query_timings(engine)
+    return engine
+
+
+def get_engine() -> Engine:
+    global _engine
+    if _engine is None:
+        _engine = create_db_engine()
+    return _engine
+
+
+def get_replica_engines() -> list[Engine]:
+    global _replica_engines
+    if _replica_engines is None:
+        _replica_engines = [
+            create_db_engine(str(url)) for url in settings.POSTGRES_REPLICA_URIS
+        ]
+    return _replica_engines
+
+
+def dispose_engine() -> None:
+    global _engine, _replica_engines
+    for engine in [_engine, *(_replica_engines or [])]:
+        if engine is not None:
+            engine.dispose()
+    _engine = None
+    _replica_engines = None
+
+
+def _forget_parent_pool() -> None:
+    # A forked child must not reuse, nor close, the sockets of its parent's pools
+    for engine in [_engine, *(_replica_engines or [])]:
+        if engine is not None:
+            engine.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_forget_parent_pool)
+
+
+class RoutingSession(Session):
+    """Sends read-only sessions to a random replica and the others to the primary.
+
+    Read-only sessions created with `read_from_primary` use the primary too, so
+    users see their own writes. `on_write` is called whenever the session commits
+    a transaction that wrote. Without `POSTGRES_REPLICA_URIS` everything goes to
+    the primary.
+    """
+
+    def __init__(
+        self,
+        *,
+        read_only: bool = False,
+        read_from_primary: bool = False,
+        on_write: Callable[[], None] | None = None,
+    ) -> None:
+        # Objects keep their state on commit, flushes already fetch the values
+        # generated by the database with RETURNING, so no refresh is needed
+        super().__init__(
+            get_engine(),
+            info={
+                "read_only": read_only,
+                "read_from_primary": read_from_primary,
+                "on_write": on_write,
+            },
+            expire_on_commit=False,
+        )
+        self._routed_bind: Engine | None = None
+
+    def get_bind(self, mapper: Any = None, **kwargs: Any) -> Any:
+        if self._routed_bind is None:
+            engine = get_engine()
+            replicas = get_replica_engines()
+            if (
+                self.info["read_only"]
+                and replicas
+                and not self.info["read_from_primary"]
+            ):
+                engine = random.choice(replicas)
+            if self.info["read_only"]:
+                # Transactions start with BEGIN READ ONLY, the flag is reset when
+                # the connection goes back to the pool
+                engine = engine.execution_options(postgresql_readonly=True)
+            self._routed_bind = engine
+        return self._routed_bind
+
+
+# A commit only counts as a write if the transaction flushed changes or ran an
+# INSERT, UPDATE or DELETE statement
+@event.listens_for(Session, "after_flush")
+def _record_flush(session: Session, _flush_context: Any) -> None:
+    # Still the state before the flush, objects assigned their own values are
+    # dirty without being modified
+    if (
+        session.new
+        or session.deleted
+        or any(session.is_modified(instance) for instance in session.dirty)
+    ):
+        session.info["wrote"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _record_statement(orm_execute_state: ORMExecuteState) -> None:
+    if (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_write(session: Session) -> None:
+    on_write = session.info.get("on_write")
+    if session.info.pop("wrote", False) and on_write:
+        on_write()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_write(session: Session) -> None:
+    session.info.pop("wrote", None)
+
+
+def create_read_only_session(read_from_primary: bool = False) -> Session:
+    """A session whose transactions are read-only, served by a replica if any.
+
+    Like every session, it only checks out a connection when it runs its first
+    query, and returns it when the transaction ends.
+    """
+    return RoutingSession(read_only=True, read_from_primary=read_from_primary)
+
+
+@contextmanager
+def _maintenance_connection() -> Generator[Connection, None, None]:
+    url = make_url(str(settings.SQLALCHEMY_DATABASE_URI)).set(database="postgres")
+    engine = create_engine(url, isolation_level="AUTOCOMMIT", poolclass=NullPool)
+    with engine.connect() as connection:
+        yield connection
+
+
+def database_exists(name: str) -> bool:
+    with _maintenance_connection() as connection:
+        statement = text("SELECT 1 FROM pg_database WHERE datname = :name")
+        return connection.execute(statement, {"name": name}).first() is not None
+
+
+def create_database(name: str, *, template: str | None = None) -> None:
+    """Create the database `name`, as a copy of `template` if given.
+
+    Copying a migrated database is much faster than running the migrations, but
+    nobody else may be connected to the template while it is copied.
+    """
+    statement = f'CREATE DATABASE "{name}"'
+    if template:
+        statement += f' TEMPLATE "{template}"'
+    with _maintenance_connection() as connection:
+        connection.execute(text(statement))
+
+
+def drop_database(name: str) -> None:
+    with _maintenance_connection() as connection:
+        connection.execute(text(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)'))
 
 
 # make sure all SQLModel models are imported (app.models) before initializing DB
@@ -0,0 +1,132 @@
+"""Request deadlines
+
+Every request gets a deadline, looked up by route id, then by route group (see
+app/core/limits.py) in `REQUEST_DEADLINES_SECONDS`, defaulting to
+`REQUEST_DEADLINE_SECONDS`. Connections checked out while serving the request
+have their session `statement_timeout` set to the deadline, so Postgres cancels
+a runaway query and its connection goes back to the pool. The value is cached
+per pooled connection and only sent when it changes, most requests find it set
+by the previous request of their group. Transactions begun with less than half
+of the deadline left also `SET LOCAL statement_timeout` to the time left.
+Requests past their deadline are answered with 504.
+"""
+
+import time
+from contextvars import ContextVar
+from typing import Any
+
+import anyio
+from fastapi import Request
+from psycopg.errors import QueryCanceled
+from sqlalchemy import Connection, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, SessionTransaction
+from sqlalchemy.pool import ConnectionPoolEntry, Pool, PoolProxiedConnection
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import DEADLINES_EXCEEDED
+from app.core.routing import resolve_route_id, route_group
+
+_deadline: ContextVar[float | None] = ContextVar("deadline", default=None)
+_deadline_seconds: ContextVar[float | None] = ContextVar(
+    "deadline_seconds", default=None
+)
+
+
+def get_deadline_seconds(scope: Scope) -> float:
+    deadlines = settings.REQUEST_DEADLINES_SECONDS
+    route_id = resolve_route_id(scope)
+    if route_id in deadlines:
+        return deadlines[route_id]
+    return deadlines.get(route_group(scope) or "", settings.REQUEST_DEADLINE_SECONDS)
+
+
+def get_time_left() -> float | None:
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def _to_timeout(seconds: float) -> int:
+    return max(1, int(seconds * 1000))
+
+
+@event.listens_for(Pool, "checkout")
+def _set_session_statement_timeout(
+    dbapi_connection: Any,
+    connection_record: ConnectionPoolEntry,
+    _connection_proxy: PoolProxiedConnection,
+) -> None:
+    seconds = _deadline_seconds.get()
+    timeout = None if seconds is None else _to_timeout(seconds)
+    if connection_record.info.get("statement_timeout") == timeout:
+        return
+    # Outside of a transaction, so that no rollback undoes it
+    autocommit = dbapi_connection.autocommit
+    dbapi_connection.autocommit = True
+    try:
+        with dbapi_connection.cursor() as cursor:
+            cursor.execute(f"SET statement_timeout = {timeout or 'DEFAULT'}")
+    finally:
+        dbapi_connection.autocommit = autocommit
+    connection_record.info["statement_timeout"] = timeout
+
+
+@event.listens_for(Session, "after_begin")
+def _set_statement_timeout(
+    _session: Session, _transaction: SessionTransaction, connection: Connection
+) -> None:
+    seconds, time_left = _deadline_seconds.get(), get_time_left()
+    if seconds is not None and time_left is not None and time_left < seconds / 2:
+        timeout = _to_timeout(time_left)
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout}")
+
+
+def _deadline_exceeded_response() -> Response:
+    return JSONResponse(
+        {"detail": "The request took too long, please retry later"},
+        status_code=504,
+    )
+
+
+async def query_canceled_handler(request: Request, exc: Exception) -> Response:
+    """Answer 504 when Postgres canceled a statement for its timeout."""
+    if isinstance(exc, OperationalError) and isinstance(exc.orig, QueryCanceled):
+        DEADLINES_EXCEEDED.labels(resolve_route_id(request.scope)).inc()
+        return _deadline_exceeded_response()
+    raise exc
+
+
+class DeadlineMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        seconds = get_deadline_seconds(scope)
+        token = _deadline.set(time.monotonic() + seconds)
+        seconds_token = _deadline_seconds.set(seconds)
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            # Sync path operations can't be interrupted, they are canceled when
+            # their thread returns, at the latest when a query times out
+            with anyio.move_on_after(seconds) as cancel_scope:
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            _deadline.reset(token)
+            _deadline_seconds.reset(seconds_token)
+        if cancel_scope.cancelled_caught:
+            DEADLINES_EXCEEDED.labels(resolve_route_id(scope)).inc()
+            if not response_started:
+                await _deadline_exceeded_response()(scope, receive, send)
@@ -0,0 +1,95 @@
+"""Per route group concurrency limits
+
+Each worker serves at most `CONCURRENCY_LIMITS[group]` requests of a group at
+once. Further requests wait in a queue of `CONCURRENCY_QUEUE_SIZES[group]`, and
+are answered with 503 and a `Retry-After` header when the queue is full or they
+waited `CONCURRENCY_QUEUE_TIMEOUT_SECONDS`. A login storm then fills the `auth`
+queue instead of the threadpool, and reads keep being served.
+
+Routes are grouped by their id in `ROUTE_GROUPS` (see app/core/routing.py),
+other GET routes are `reads`.
+Routes without a group, or whose group has no limit, are not limited.
+"""
+
+import time
+
+import anyio
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import REQUEST_QUEUE_DURATION, REQUESTS_SHED
+from app.core.routing import route_group
+from app.core.timing import record_queue_time
+
+
+class ConcurrencyLimiter:
+    def __init__(self, limit: int, queue_size: int) -> None:
+        self.semaphore = anyio.Semaphore(limit)
+        self.queue_size = queue_size
+        self.waiting = 0
+
+    async def acquire(self, timeout: float) -> float | None:
+        """Wait for a slot, returning the time waited, or None when shed."""
+        try:
+            self.semaphore.acquire_nowait()
+            return 0.0
+        except anyio.WouldBlock:
+            pass
+        if self.waiting >= self.queue_size:
+            return None
+        self.waiting += 1
+        start = time.perf_counter()
+        try:
+            with anyio.move_on_after(timeout):
+                await self.semaphore.acquire()
+                return time.perf_counter() - start
+            return None
+        finally:
+            self.waiting -= 1
+
+    def release(self) -> None:
+        self.semaphore.release()
+
+
+class ConcurrencyLimitMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.limiters: dict[str, ConcurrencyLimiter] = {}
+
+    def _get_limiter(self, group: str | None) -> ConcurrencyLimiter | None:
+        if group is None or group not in settings.CONCURRENCY_LIMITS:
+            return None
+        if group not in self.limiters:
+            self.limiters[group] = ConcurrencyLimiter(
+                settings.CONCURRENCY_LIMITS[group],
+                settings.CONCURRENCY_QUEUE_SIZES.get(group, 0),
+            )
+        return self.limiters[group]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        group = route_group(scope)
+        limiter = self._get_limiter(group)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        waited = await limiter.acquire(settings.CONCURRENCY_QUEUE_TIMEOUT_SECONDS)
+        if waited is None:
+            REQUESTS_SHED.labels(group).inc()
+            response = JSONResponse(
+                {"detail": "The server is busy, please retry later"},
+                status_code=503,
+                headers={"Retry-After": str(settings.CONCURRENCY_RETRY_AFTER_SECONDS)},
+            )
+            await response(scope, receive, send)
+            return
+        REQUEST_QUEUE_DURATION.labels(group).observe(waited)
+        record_queue_time(waited)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
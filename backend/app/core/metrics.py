@@ -0,0 +1,158 @@
+"""Prometheus metrics
+
+Outside the local environment `/metrics` requires `METRICS_TOKEN` as a bearer
+token.
+
+With several workers (`uvicorn --workers 4`) set `PROMETHEUS_MULTIPROC_DIR`
+to an empty directory shared by all of them. Each worker then writes its samples
+there and `/metrics` aggregates them, no matter which worker serves the scrape.
+"""
+
+import os
+import secrets
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import Engine, event
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.routing import resolve_route_id
+
+MULTIPROCESS_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if MULTIPROCESS_DIR:
+    os.makedirs(MULTIPROCESS_DIR, exist_ok=True)
+
+REQUESTS = Counter(
+    "http_requests_total",
+    "Total HTTP requests by route and status code.",
+    ["method", "route", "status"],
+)
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route.",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being served by route.",
+    ["method", "route"],
+    multiprocess_mode="livesum",
+)
+REQUEST_QUEUE_DURATION = Histogram(
+    "http_request_queue_seconds",
+    "Time requests waited for a slot of their route group.",
+    ["group"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS_SHED = Counter(
+    "http_requests_shed_total",
+    "Requests answered with 503 because their route group was saturated.",
+    ["group"],
+)
+DEADLINES_EXCEEDED = Counter(
+    "http_request_deadlines_exceeded_total",
+    "Requests answered with 504 because they ran past their deadline.",
+    ["route"],
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Open database connections in the pool.",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Database connections currently checked out of the pool.",
+    multiprocess_mode="livesum",
+)
+RUNSHEET_EVENT_SUBSCRIBERS = Gauge(
+    "runsheet_event_subscribers",
+    "Clients subscribed to the live events of a runsheet.",
+    multiprocess_mode="livesum",
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "Time spent hashing or verifying passwords.",
+    ["operation"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1),
+)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Track the connection pool of `engine` in the pool gauges."""
+    event.listen(engine, "connect", lambda *_: DB_POOL_CONNECTIONS.inc())
+    event.listen(engine, "close", lambda *_: DB_POOL_CONNECTIONS.dec())
+    event.listen(engine, "close_detached", lambda *_: DB_POOL_CONNECTIONS.dec())
+    event.listen(engine, "checkout", lambda *_: DB_POOL_CHECKED_OUT.inc())
+    event.listen(engine, "checkin", lambda *_: DB_POOL_CHECKED_OUT.dec())
+
+
+class PrometheusMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route_id = resolve_route_id(scope)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method, route_id)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_DURATION.labels(method, route_id).observe(
+                time.perf_counter() - start
+            )
+            REQUESTS.labels(method, route_id, str(status_code)).inc()
+            in_progress.dec()
+
+
+def _is_scraper(request: Request) -> bool:
+    if settings.ENVIRONMENT == "local":
+        return True
+    if not settings.METRICS_TOKEN:
+        return False
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    return scheme.lower() == "bearer" and secrets.compare_digest(
+        token.encode(), settings.METRICS_TOKEN.encode()
+    )
+
+
+def metrics(request: Request) -> Response:
+    if not _is_scraper(request):
+        return Response(status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    registry = REGISTRY
+    if MULTIPROCESS_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)  # type: ignore[no-untyped-call]
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def mark_process_dead() -> None:
+    """Drop the live gauges of this worker from the shared registry."""
+    if MULTIPROCESS_DIR:
+        multiprocess.mark_process_dead(os.getpid())  # type: ignore[no-untyped-call]
@@ -0,0 +1,179 @@
+"""On-demand profiling of single requests
+
+Requests sent with an `X-Profile` header run under a sampling profiler that
+records the stacks of all threads every `PROFILE_INTERVAL_MS`, which covers sync
+path operations running in the threadpool as well as the event loop. In the
+local environment anyone can profile a request, everywhere else only superusers
+can.
+
+The stacks are written in the folded format (`frame;frame;frame count`) read by
+flamegraph.pl and speedscope, to `PROFILE_DIR/<route id>-<timestamp>.folded`.
+The response names the file in an `X-Profile-File` header, and only the newest
+`PROFILE_MAX_FILES` files are kept. One request is profiled at a time per
+worker, and the stacks of concurrent requests of the same worker show up in the
+profile too.
+"""
+
+import logging
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from types import FrameType
+
+import anyio
+import jwt
+from anyio import to_thread
+from jwt.exceptions import InvalidTokenError
+from sqlmodel import Session
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.db import get_engine
+from app.core.routing import resolve_route_id
+from app.core.security import ALGORITHM
+from app.models import User
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "x-profile"
+# Leaf frames of threads waiting for work, left out of the profile
+IDLE_FRAMES = {("threading.py", "wait"), ("selectors.py", "select")}
+
+
+def _format_frame(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+
+
+def _is_idle(frame: FrameType) -> bool:
+    code = frame.f_code
+    return (Path(code.co_filename).name, code.co_name) in IDLE_FRAMES
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True
+        )
+
+    def _sample(self) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == self._thread.ident or _is_idle(frame):
+                continue
+            stack: list[str] = []
+            current: FrameType | None = frame
+            while current is not None:
+                stack.append(_format_frame(current))
+                current = current.f_back
+            stack.append(names.get(ident, str(ident)))
+            self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self._sample()
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+_profiling = threading.Lock()
+
+
+def _is_superuser(authorization: str | None) -> bool:
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer":
+        return False
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+        user_id = uuid.UUID(payload["sub"])
+    except (InvalidTokenError, KeyError, ValueError):
+        return False
+    with Session(get_engine()) as session:
+        user = session.get(User, user_id)
+    version = payload.get("ver")
+    return bool(
+        user
+        and user.is_active
+        and user.is_superuser
+        and (version is None or version == user.token_version)
+    )
+
+
+def _save_profile(path: Path, folded: str) -> None:
+    """Write a profile, deleting the oldest ones past `PROFILE_MAX_FILES`."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(folded)
+    # Names end with the timestamp of the request
+    profiles = sorted(
+        path.parent.glob("*.folded"), key=lambda p: p.stem.rsplit("-", 1)[-1]
+    )
+    for old in profiles[: -settings.PROFILE_MAX_FILES]:
+        old.unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if PROFILE_HEADER not in headers or not await self._allowed(headers):
+            await self.app(scope, receive, send)
+            return
+        if not _profiling.acquire(blocking=False):
+            logger.warning("Not profiling, another request is being profiled")
+            await self.app(scope, receive, send)
+            return
+
+        route_id = resolve_route_id(scope)
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        path = Path(settings.PROFILE_DIR) / f"{route_id}-{timestamp}.folded"
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Profile-File", path.name)
+            await send(message)
+
+        profiler = SamplingProfiler(settings.PROFILE_INTERVAL_MS / 1000)
+        start, cpu_start = time.perf_counter(), time.process_time()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
+            wall_time = time.perf_counter() - start
+            cpu_time = time.process_time() - cpu_start
+            _profiling.release()
+            with anyio.CancelScope(shield=True):
+                await to_thread.run_sync(_save_profile, path, profiler.folded())
+            logger.info(
+                f"Profiled {route_id}: {wall_time * 1000:.1f} ms wall, "
+                f"{cpu_time * 1000:.1f} ms CPU, {profiler.samples} samples "
+                f"written to {path}"
+            )
+
+    async def _allowed(self, headers: Headers) -> bool:
+        if settings.ENVIRONMENT == "local":
+            return True
+        return await to_thread.run_sync(_is_superuser, headers.get("authorization"))
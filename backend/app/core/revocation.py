@@ -0,0 +1,81 @@
+"""Revocation of access tokens carrying signed claims.
+
+Claims tokens embed the `token_version` of their user, which is bumped whenever
+the signed claims stop being true: deactivation, privilege changes and password
+changes. Deleting a user records its id in `revoked_user`, revoking all of its
+tokens. Each worker keeps the versions bumped and the users deleted since the
+oldest valid token was issued in memory, reloaded from the primary database
+every `TOKEN_REVOCATION_SYNC_SECONDS`, so checking a token doesn't query the
+database. Requests wait for the first load, later ones don't wait for reloads.
+"""
+
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import Session, col, select
+
+from app.core.config import settings
+from app.models import RevokedUser, User
+
+
+class RevocationSet:
+    def __init__(self) -> None:
+        self._versions: dict[uuid.UUID, int] = {}
+        self._deleted: set[uuid.UUID] = set()
+        self._synced_at: float | None = None
+        self._lock = threading.Lock()
+
+    def is_stale(self) -> bool:
+        return (
+            self._synced_at is None
+            or time.monotonic() - self._synced_at
+            > settings.TOKEN_REVOCATION_SYNC_SECONDS
+        )
+
+    def sync(self, session: Session) -> None:
+        """Reload the versions from the database, unless another thread is and
+        they were loaded before."""
+        first = self._synced_at is None
+        if not self._lock.acquire(blocking=first):
+            return
+        try:
+            if first and self._synced_at is not None:
+                # Loaded by the thread it waited for
+                return
+            # Tokens issued before an older bump or deletion are expired by now
+            expired = datetime.now(timezone.utc) - timedelta(
+                minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
+            )
+            statement = select(User.id, User.token_version).where(
+                col(User.token_version_bumped_at) > expired
+            )
+            self._versions = dict(session.exec(statement).all())
+            deleted = select(RevokedUser.user_id).where(
+                col(RevokedUser.revoked_at) > expired
+            )
+            self._deleted = set(session.exec(deleted).all())
+            self._synced_at = time.monotonic()
+        finally:
+            self._lock.release()
+
+    def revoke(self, user_id: uuid.UUID, version: int) -> None:
+        """Revoke the tokens older than `version` in this worker right away, the
+        others see it on their next sync."""
+        self._versions[user_id] = max(version, self._versions.get(user_id, 0))
+
+    def revoke_user(self, user_id: uuid.UUID) -> None:
+        """Revoke all the tokens of a deleted user in this worker right away."""
+        self._deleted.add(user_id)
+
+    def is_revoked(self, user_id: uuid.UUID, version: int) -> bool:
+        return user_id in self._deleted or version < self._versions.get(user_id, 0)
+
+    def clear(self) -> None:
+        self._versions = {}
+        self._deleted = set()
+        self._synced_at = None
+
+
+revoked_tokens = RevocationSet()
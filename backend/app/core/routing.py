@@ -0,0 +1,44 @@
+from starlette.routing import Match
+from starlette.types import Scope
+
+UNMATCHED_ROUTE_ID = "unmatched"
+
+# Route groups share concurrency limits and deadlines (see app/core/limits.py)
+ROUTE_GROUPS = {
+    "items-create_items_bulk": "bulk",
+    "login-login_access_token": "auth",
+    "login-recover_password": "auth",
+    "login-reset_password": "auth",
+    "runsheets-runsheet_events": "events",
+    "sync-sync_changes": "sync",
+    "users-register_user": "auth",
+    "users-update_password_me": "auth",
+}
+READ_METHODS = {"GET", "HEAD"}
+
+
+def resolve_route_id(scope: Scope) -> str:
+    """Return the operation id of the route that will handle the request.
+
+    This is the id generated by `custom_generate_unique_id` (e.g.
+    `users-read_users`), so it can be used by middleware before routing happens.
+    Unknown paths share a single id to keep metric labels bounded. The result is
+    stored in the scope, so every middleware after the first one gets it for free.
+    """
+    route_id: str | None = scope.get("route_id")
+    if route_id is None:
+        route_id = UNMATCHED_ROUTE_ID
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                route_id = getattr(route, "unique_id", None) or route.name
+                break
+        scope["route_id"] = route_id
+    return route_id
+
+
+def route_group(scope: Scope) -> str | None:
+    group = ROUTE_GROUPS.get(resolve_route_id(scope))
+    if group is None and scope["method"] in READ_METHODS:
+        return "reads"
+    return group
@@ -1,3 +1,6 @@
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
 from datetime import datetime, timedelta, timezone
 from typing import Any
 
@@ -5,23 +8,59 @@ import jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
+from app.core.metrics import PASSWORD_HASH_DURATION
+from app.core.timing import record_hash_time
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes with another scheme or cost than configured verify, but are flagged by
+# `needs_update()` so they can be replaced on the next login
+pwd_context = CryptContext(
+    schemes=settings.PASSWORD_HASH_SCHEMES,
+    deprecated="auto",
+    bcrypt__rounds=settings.password_bcrypt_rounds,
+    bcrypt__min_rounds=settings.password_bcrypt_rounds,
+    bcrypt__max_rounds=settings.password_bcrypt_rounds,
+)
 
 
 ALGORITHM = "HS256"
 
 
-def create_access_token(subject: str | Any, expires_delta: timedelta) -> str:
+def create_access_token(
+    subject: str | Any,
+    expires_delta: timedelta,
+    claims: dict[str, Any] | None = None,
+) -> str:
     expire = datetime.now(timezone.utc) + expires_delta
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode = {**(claims or {}), "exp": expire, "sub": str(subject)}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
+@contextmanager
+def _time_hashing(operation: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        PASSWORD_HASH_DURATION.labels(operation).observe(duration)
+        record_hash_time(duration)
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    with _time_hashing("verify"):
+        return pwd_context.verify(plain_password, hashed_password)
+
+
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """Verify the password, also returning a new hash if the current one uses an
+    outdated scheme or cost."""
+    with _time_hashing("verify"):
+        return pwd_context.verify_and_update(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    with _time_hashing("hash"):
+        return pwd_context.hash(password)
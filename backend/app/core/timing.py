@@ -0,0 +1,129 @@
+"""Per-request timings
+
+`ServerTimingMiddleware` collects, for every request, how many SQL statements
+ran, how long they took, how long was spent hashing passwords and how long the
+request waited for a slot of its route group (see app/core/limits.py). The
+totals are sent back in the `Server-Timing` header, so a slow endpoint shows
+whether it is waiting on the database, on bcrypt, in the queue or on Python
+code (`app` minus the rest). The hashing time is left out on `auth` routes,
+where it would tell whether an account exists.
+"""
+
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import Engine, event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.routing import resolve_route_id, route_group
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RequestTimings:
+    route_id: str
+    route_group: str | None = None
+    query_count: int = 0
+    db_time: float = 0.0
+    slowest_query_time: float = 0.0
+    slowest_statement: str | None = None
+    hash_time: float = 0.0
+    queue_time: float = 0.0
+
+
+_request_timings: ContextVar[RequestTimings | None] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def get_request_timings() -> RequestTimings | None:
+    return _request_timings.get()
+
+
+def record_hash_time(duration: float) -> None:
+    timings = _request_timings.get()
+    if timings:
+        timings.hash_time += duration
+
+
+def record_queue_time(duration: float) -> None:
+    timings = _request_timings.get()
+    if timings:
+        timings.queue_time += duration
+
+
+def _before_cursor_execute(conn: Any, *_args: Any) -> None:
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn: Any, _cursor: Any, statement: str, *_args: Any) -> None:
+    duration = time.perf_counter() - conn.info["query_start_time"].pop()
+    timings = _request_timings.get()
+    if timings:
+        timings.query_count += 1
+        timings.db_time += duration
+        if duration > timings.slowest_query_time:
+            timings.slowest_query_time = duration
+            timings.slowest_statement = statement
+    if duration * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+        route_id = timings.route_id if timings else "-"
+        logger.warning(
+            f"Slow query ({duration * 1000:.1f} ms) in {route_id}: {statement}"
+        )
+
+
+def track_query_timings(engine: Engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _format_server_timing(timings: RequestTimings, total: float) -> str:
+    entries = [
+        f'db;dur={timings.db_time * 1000:.1f};desc="{timings.query_count} queries"',
+        f"db-slowest;dur={timings.slowest_query_time * 1000:.1f}",
+    ]
+    if timings.route_group != "auth":
+        entries.append(f"hash;dur={timings.hash_time * 1000:.1f}")
+    entries += [
+        f"queue;dur={timings.queue_time * 1000:.1f}",
+        f"app;dur={total * 1000:.1f}",
+    ]
+    return ", ".join(entries)
+
+
+class ServerTimingMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings(
+            route_id=resolve_route_id(scope), route_group=route_group(scope)
+        )
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and (
+                settings.server_timing_enabled
+            ):
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    _format_server_timing(timings, time.perf_counter() - start),
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_timings.reset(token)
@@ -1,11 +1,23 @@
 import uuid
+from datetime import datetime, timezone
 from typing import Any
 
-from sqlmodel import Session, select
+from sqlalchemy.orm import selectinload, undefer, undefer_group
+from sqlmodel import Session, func, insert, select
 
-from app.core.security import get_password_hash, verify_password
-from app.models import Item, User
+from app.core.revocation import revoked_tokens
+from app.core.security import get_password_hash, verify_and_update_password
+from app.models import (
+    DETAIL_COLUMNS,
+    Item,
+    RevokedUser,
+    Runsheet,
+    Sample,
+    StepProcess,
+    User,
+)
 from app.schemas.item.item_creation import ItemCreate
+from app.schemas.sample.sample_creation import SampleCreate
 from app.schemas.user.user_creation import UserCreate
 from app.schemas.user.user_updating import UserUpdate
 
@@ -16,26 +28,56 @@ def create_user(*, session: Session, user_create: UserCreate) -> User:
     )
     session.add(db_obj)
     session.commit()
-    session.refresh(db_obj)
     return db_obj
 
 
+# Changes that make the claims signed into access tokens false
+TOKEN_REVOKING_FIELDS = {"password", "is_active", "is_superuser", "is_reviewer"}
+
+
 def update_user(*, session: Session, db_user: User, user_in: UserUpdate) -> Any:
     user_data = user_in.model_dump(exclude_unset=True)
-    extra_data = {}
+    extra_data: dict[str, Any] = {}
     if "password" in user_data:
         password = user_data["password"]
         hashed_password = get_password_hash(password)
         extra_data["hashed_password"] = hashed_password
+    revoke = any(
+        field == "password" or getattr(db_user, field) != user_data[field]
+        for field in TOKEN_REVOKING_FIELDS & user_data.keys()
+    )
+    if revoke:
+        extra_data["token_version"] = db_user.token_version + 1
+        extra_data["token_version_bumped_at"] = datetime.now(timezone.utc)
     db_user.sqlmodel_update(user_data, update=extra_data)
     session.add(db_user)
     session.commit()
-    session.refresh(db_user)
+    if revoke:
+        revoked_tokens.revoke(db_user.id, db_user.token_version)
     return db_user
 
 
+def update_password(*, session: Session, db_user: User, password: str) -> None:
+    """Set a new password, revoking the access tokens issued before."""
+    db_user.hashed_password = get_password_hash(password)
+    db_user.token_version += 1
+    db_user.token_version_bumped_at = datetime.now(timezone.utc)
+    session.add(db_user)
+    session.commit()
+    revoked_tokens.revoke(db_user.id, db_user.token_version)
+
+
+def delete_user(*, session: Session, db_user: User) -> None:
+    """Delete a user, revoking the access tokens issued to it."""
+    user_id = db_user.id
+    session.delete(db_user)
+    session.add(RevokedUser(user_id=user_id))
+    session.commit()
+    revoked_tokens.revoke_user(user_id)
+
+
 def get_user_by_email(*, session: Session, email: str) -> User | None:
-    statement = select(User).where(User.email == email)
+    statement = select(User).where(func.lower(User.email) == email.lower())
     session_user = session.exec(statement).first()
     return session_user
 
@@ -44,8 +86,16 @@ def authenticate(*, session: Session, email: str, password: str) -> User | None:
     db_user = get_user_by_email(session=session, email=email)
     if not db_user:
         return None
-    if not verify_password(password, db_user.hashed_password):
+    verified, updated_hash = verify_and_update_password(
+        password, db_user.hashed_password
+    )
+    if not verified:
         return None
+    if updated_hash:
+        # The hash used an outdated scheme or cost, store one with the current
+        db_user.hashed_password = updated_hash
+        session.add(db_user)
+        session.commit()
     return db_user
 
 
@@ -53,5 +103,58 @@ def create_item(*, session: Session, item_in: ItemCreate, owner_id: uuid.UUID) -
     db_item = Item.model_validate(item_in, update={"owner_id": owner_id})
     session.add(db_item)
     session.commit()
-    session.refresh(db_item)
     return db_item
+
+
+def create_items(
+    *, session: Session, items_in: list[ItemCreate], owner_id: uuid.UUID
+) -> list[Item]:
+    """Insert the items in batched multi-row INSERT ... RETURNING statements."""
+    rows = [
+        Item.model_validate(item_in, update={"owner_id": owner_id}).model_dump()
+        for item_in in items_in
+    ]
+    items = list(session.scalars(insert(Item).returning(Item), rows))
+    session.commit()
+    return items
+
+
+def create_samples(
+    *, session: Session, samples_in: list[SampleCreate], creator_id: uuid.UUID
+) -> list[Sample]:
+    """Insert the samples in batched multi-row INSERT ... RETURNING statements."""
+    rows = [
+        Sample.model_validate(sample_in, update={"creator_id": creator_id}).model_dump()
+        for sample_in in samples_in
+    ]
+    # Bulk INSERT ... RETURNING ignores undefer_group, name the deferred columns
+    statement = (
+        insert(Sample)
+        .returning(Sample)
+        .options(
+            undefer(Sample.description),  # type: ignore[arg-type]
+            undefer(Sample.notes),  # type: ignore[arg-type]
+        )
+    )
+    samples = list(session.scalars(statement, rows))
+    session.commit()
+    return samples
+
+
+def get_runsheet_detail(*, session: Session, runsheet_id: uuid.UUID) -> Runsheet | None:
+    """Load a runsheet with its steps and samples, including their long texts."""
+    steps = selectinload(Runsheet.step_processes)  # type: ignore[arg-type]
+    step_samples = steps.selectinload(StepProcess.samples)  # type: ignore[arg-type]
+    samples = selectinload(Runsheet.samples)  # type: ignore[arg-type]
+    statement = (
+        select(Runsheet)
+        .where(Runsheet.id == runsheet_id)
+        # Chained, as undefer_group() in a loader's options() is not applied
+        .options(
+            undefer_group(DETAIL_COLUMNS),
+            steps.undefer_group(DETAIL_COLUMNS),
+            step_samples.undefer_group(DETAIL_COLUMNS),
+            samples.undefer_group(DETAIL_COLUMNS),
+        )
+    )
+    return session.exec(statement).one_or_none()
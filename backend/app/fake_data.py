@@ -0,0 +1,321 @@
+"""Generate a realistic, reproducible fab data set for load and performance tests.
+
+    python app/fake_data.py --scale 1 --seed 42 --truncate
+
+Scale 1 is 10k users, 100k items, 100k samples (wafers and the dice cut from
+them), 20k runsheets with 10 steps each and about 1M link rows. Rows are written
+with `COPY ... FROM STDIN`, so tens of millions of rows load in minutes.
+"""
+
+import argparse
+import itertools
+import logging
+import random
+import uuid
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import Connection, text
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.db import get_engine, init_db
+from app.core.security import get_password_hash
+from app.enums.material import Material
+from app.enums.runsheet_state import RunsheetState
+from app.enums.sample_type import SampleType
+from app.enums.step_system import StepSystem
+from app.step_order import POSITION_GAP
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FAKE_PASSWORD = "fake-data-password"
+
+FAKE_TABLES = [
+    "link_sample_step_process",
+    "link_runsheet_sample",
+    "link_sample_supervisor",
+    "step_process",
+    "runsheet",
+    "sample",
+    "item",
+    "job",
+    '"user"',
+]
+
+Row = dict[str, Any]
+
+
+@dataclass
+class Volumes:
+    users: int
+    items: int
+    samples: int
+    runsheets: int
+    steps_per_runsheet: int = 10
+    samples_per_step: int = 4
+    dice_per_wafer: int = 9
+
+    @classmethod
+    def from_scale(cls, scale: float) -> "Volumes":
+        return cls(
+            users=max(int(10_000 * scale), 10),
+            items=max(int(100_000 * scale), 100),
+            samples=max(int(100_000 * scale), 50),
+            runsheets=max(int(20_000 * scale), 10),
+        )
+
+
+def fake_user_email(random_seed: int, index: int) -> str:
+    return f"fake-{random_seed}-{index}@example.com"
+
+
+def is_reviewer(user_index: int) -> bool:
+    """One user in ten reviews runsheets."""
+    return user_index % 10 == 0
+
+
+def is_engineer(user_index: int) -> bool:
+    """Half of the users run steps."""
+    return user_index % 2 == 1
+
+
+def copy_rows(connection: Connection, table: str, rows: Iterable[Row]) -> int:
+    """COPY `rows` into `table`, taking the column names from the first row."""
+    iterator = iter(rows)
+    first = next(iterator, None)
+    if first is None:
+        return 0
+    columns = list(first)
+    raw_connection: Any = connection.connection.driver_connection
+    count = 0
+    with raw_connection.cursor() as cursor:
+        with cursor.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN") as copy:
+            for row in itertools.chain([first], iterator):
+                copy.write_row([row[column] for column in columns])
+                count += 1
+    logger.info(f"Copied {count} rows into {table}")
+    return count
+
+
+class FakeDataGenerator:
+    """Row generators for every table.
+
+    Everything but the timestamps, which spread over the year before generation,
+    is deterministic for a given `random_seed`.
+
+    Values of enum columns are written by name, which is how SQLAlchemy stores
+    them. Runsheets cycle through every `RunsheetState` and their steps through
+    every `StepSystem`; steps are completed according to the runsheet state.
+    """
+
+    def __init__(self, volumes: Volumes, random_seed: int = 42) -> None:
+        self.volumes = volumes
+        self.random_seed = random_seed
+        self.rng = random.Random(random_seed)
+        self.now = datetime.now(timezone.utc)
+        self.hashed_password = get_password_hash(FAKE_PASSWORD)
+        self.user_ids = self.new_ids(volumes.users)
+        self.reviewer_ids = [
+            user_id for i, user_id in enumerate(self.user_ids) if is_reviewer(i)
+        ]
+        self.engineer_ids = [
+            user_id for i, user_id in enumerate(self.user_ids) if is_engineer(i)
+        ]
+        self.sample_ids = self.new_ids(volumes.samples)
+        self.runsheet_ids = self.new_ids(volumes.runsheets)
+        self.runsheet_states = list(RunsheetState)
+        # Samples are laid out as a wafer followed by its dice, so consecutive
+        # samples on a runsheet mostly share a genealogy
+        per_runsheet = max(volumes.samples // volumes.runsheets, 1)
+        self.runsheet_samples = {
+            runsheet_id: [
+                self.sample_ids[(i * per_runsheet + j) % volumes.samples]
+                for j in range(per_runsheet)
+            ]
+            for i, runsheet_id in enumerate(self.runsheet_ids)
+        }
+        self.steps: list[tuple[uuid.UUID, uuid.UUID, bool]] = []
+
+    def new_ids(self, count: int) -> list[uuid.UUID]:
+        return [
+            uuid.UUID(int=self.rng.getrandbits(128), version=4) for _ in range(count)
+        ]
+
+    def timestamps(self) -> Row:
+        created_at = self.now - timedelta(seconds=self.rng.randint(0, 365 * 86400))
+        return {"created_at": created_at, "updated_at": created_at}
+
+    def runsheet_state(self, index: int) -> RunsheetState:
+        return self.runsheet_states[index % len(self.runsheet_states)]
+
+    def users(self) -> Iterator[Row]:
+        for i, user_id in enumerate(self.user_ids):
+            yield {
+                "id": user_id,
+                "email": fake_user_email(self.random_seed, i),
+                "name": f"User {i}",
+                "hashed_password": self.hashed_password,
+                "is_active": True,
+                "is_superuser": False,
+                "is_reviewer": is_reviewer(i),
+                **self.timestamps(),
+            }
+
+    def items(self) -> Iterator[Row]:
+        for i, item_id in enumerate(self.new_ids(self.volumes.items)):
+            yield {
+                "id": item_id,
+                "title": f"Item {i}",
+                "description": f"Fake item {i}",
+                "owner_id": self.rng.choice(self.user_ids),
+            }
+
+    def samples(self) -> Iterator[Row]:
+        family_size = self.volumes.dice_per_wafer + 1
+        wafer_id = None
+        material = Material.other
+        for i, sample_id in enumerate(self.sample_ids):
+            if i % family_size == 0:
+                wafer_id = sample_id
+                material = self.rng.choice(list(Material))
+                sample_type, parent_sample_id = SampleType.wafer, None
+            else:
+                sample_type, parent_sample_id = SampleType.dice, wafer_id
+            yield {
+                "id": sample_id,
+                "citic_id": f"FAKE-{self.random_seed}-S-{i:08d}",
+                "name": f"{sample_type.value.capitalize()} {i}",
+                "description": "Sample description " * 20,
+                "exist": self.rng.random() < 0.95,
+                "location": self.rng.choice(["Cleanroom", "Storage", "Lab 2"]),
+                "type": sample_type.name,
+                "material": material.name,
+                "parent_sample_id": parent_sample_id,
+                "creator_id": self.rng.choice(self.user_ids),
+                **self.timestamps(),
+            }
+
+    def runsheets(self) -> Iterator[Row]:
+        for i, runsheet_id in enumerate(self.runsheet_ids):
+            yield {
+                "id": runsheet_id,
+                "citic_id": f"FAKE-{self.random_seed}-R-{i:08d}",
+                "material": self.rng.choice(list(Material)).name,
+                "description": "Runsheet description " * 20,
+                "state": self.runsheet_state(i).name,
+                "reviewer_id": self.rng.choice(self.reviewer_ids),
+                "creator_id": self.rng.choice(self.user_ids),
+                **self.timestamps(),
+            }
+
+    def runsheet_sample_links(self) -> Iterator[Row]:
+        for runsheet_id, sample_ids in self.runsheet_samples.items():
+            for sample_id in sample_ids:
+                yield {"runsheet_id": runsheet_id, "sample_id": sample_id}
+
+    def sample_supervisor_links(self) -> Iterator[Row]:
+        for sample_id in self.sample_ids:
+            yield {"sample_id": sample_id, "user_id": self.rng.choice(self.user_ids)}
+
+    def step_processes(self) -> Iterator[Row]:
+        systems = list(StepSystem)
+        steps_per_runsheet = self.volumes.steps_per_runsheet
+        for i, runsheet_id in enumerate(self.runsheet_ids):
+            state = self.runsheet_state(i)
+            if state == RunsheetState.finished:
+                completed_steps = steps_per_runsheet
+            elif state == RunsheetState.running:
+                completed_steps = self.rng.randint(0, steps_per_runsheet - 1)
+            else:
+                completed_steps = 0
+            for step_number in range(steps_per_runsheet):
+                step_id = self.new_ids(1)[0]
+                completed = step_number < completed_steps
+                self.steps.append((step_id, runsheet_id, completed))
+                yield {
+                    "id": step_id,
+                    "position": (step_number + 1) * POSITION_GAP,
+                    "title": f"Step {step_number}",
+                    "details": "Step details " * 40,
+                    "system": systems[(i + step_number) % len(systems)].name,
+                    "machine_time": round(self.rng.random() * 120, 1),
+                    "engineer_time": round(self.rng.random() * 60, 1),
+                    "completed": completed,
+                    "date_completed": self.now if completed else None,
+                    "engineer_id": self.rng.choice(self.engineer_ids),
+                    "runsheet_id": runsheet_id,
+                    "creator_id": self.rng.choice(self.user_ids),
+                    **self.timestamps(),
+                }
+
+    def sample_step_process_links(self) -> Iterator[Row]:
+        samples_per_step = self.volumes.samples_per_step
+        for step_id, runsheet_id, completed in self.steps:
+            for sample_id in self.runsheet_samples[runsheet_id][:samples_per_step]:
+                yield {
+                    "sample_id": sample_id,
+                    "step_process_id": step_id,
+                    "completed": completed,
+                }
+
+
+def generate(volumes: Volumes, random_seed: int = 42, truncate: bool = False) -> None:
+    if settings.ENVIRONMENT == "production":
+        raise RuntimeError("Refusing to generate fake data in production")
+    generator = FakeDataGenerator(volumes, random_seed)
+    engine = get_engine()
+    with engine.begin() as connection:
+        if truncate:
+            connection.execute(text(f"TRUNCATE {', '.join(FAKE_TABLES)} CASCADE"))
+        copy_rows(connection, '"user"', generator.users())
+        copy_rows(connection, "item", generator.items())
+        copy_rows(connection, "sample", generator.samples())
+        copy_rows(connection, "runsheet", generator.runsheets())
+        copy_rows(connection, "link_runsheet_sample", generator.runsheet_sample_links())
+        copy_rows(
+            connection, "link_sample_supervisor", generator.sample_supervisor_links()
+        )
+        copy_rows(connection, "step_process", generator.step_processes())
+        copy_rows(
+            connection,
+            "link_sample_step_process",
+            generator.sample_step_process_links(),
+        )
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE"))
+    with Session(engine) as session:
+        init_db(session)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate fake fab data")
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="Multiplier of the base volumes (default: 1.0)",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=42,
+        help="Random seed, the same seed and scale generate the same data",
+    )
+    parser.add_argument(
+        "--truncate",
+        action="store_true",
+        help="Delete all existing data first, including users",
+    )
+    args = parser.parse_args()
+    volumes = Volumes.from_scale(args.scale)
+    logger.info(f"Generating fake data: {volumes}")
+    generate(volumes, random_seed=args.seed, truncate=args.truncate)
+    logger.info("Fake data generated")
+
+
+if __name__ == "__main__":
+    main()
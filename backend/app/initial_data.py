@@ -2,15 +2,20 @@ import logging
 
 from sqlmodel import Session
 
-from app.core.db import engine, init_db
+from app.core.db import get_engine, init_db
+from app.jobs import schedule_job_pruning
+from app.sync import schedule_tombstone_pruning
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 def init() -> None:
-    with Session(engine) as session:
+    with Session(get_engine()) as session:
         init_db(session)
+        schedule_tombstone_pruning(session=session)
+        schedule_job_pruning(session=session)
+        session.commit()
 
 
 def main() -> None:
@@ -0,0 +1,143 @@
+"""Background jobs
+
+Jobs are rows in the `job` table. Request handlers enqueue them inside their own
+transaction and `app/worker.py` claims and runs them with
+`SELECT ... FOR UPDATE SKIP LOCKED`, so several workers can share the table
+without handing out the same job twice. Done and failed jobs are deleted after
+`JOBS_RETENTION_DAYS`.
+"""
+
+import logging
+import uuid
+from collections.abc import Callable
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlmodel import Session, and_, col, delete, or_, select
+
+from app.core.config import settings
+from app.core.db import get_engine
+from app.enums.job_status import JobStatus
+from app.models import Job
+
+logger = logging.getLogger(__name__)
+
+PRUNE_TASK = "prune_jobs"
+
+TaskHandler = Callable[[dict[str, Any]], None]
+
+_tasks: dict[str, TaskHandler] = {}
+
+
+def task(name: str) -> Callable[[TaskHandler], TaskHandler]:
+    """Register the decorated function as the handler for jobs named `name`."""
+
+    def decorator(func: TaskHandler) -> TaskHandler:
+        _tasks[name] = func
+        return func
+
+    return decorator
+
+
+def enqueue(
+    *,
+    session: Session,
+    task: str,
+    payload: dict[str, Any],
+    max_attempts: int | None = None,
+    run_at: datetime | None = None,
+) -> Job:
+    """Add a job to the session, it is queued when the caller commits."""
+    job = Job(
+        task=task,
+        payload=payload,
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        run_at=run_at or datetime.now(timezone.utc),
+    )
+    session.add(job)
+    session.flush()
+    return job
+
+
+def claim_jobs(*, session: Session, limit: int) -> list[uuid.UUID]:
+    """Lock up to `limit` due jobs, mark them as running and return their ids.
+
+    Jobs still marked as running after `JOBS_LOCK_TIMEOUT_SECONDS` belong to a
+    worker that died mid-job and are claimed again.
+    """
+    now = datetime.now(timezone.utc)
+    stale = now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT_SECONDS)
+    statement = (
+        select(Job)
+        .where(
+            or_(
+                and_(Job.status == JobStatus.queued, Job.run_at <= now),
+                and_(Job.status == JobStatus.running, Job.locked_at < stale),  # type: ignore[operator]
+            )
+        )
+        .order_by(Job.run_at)  # type: ignore[arg-type]
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    jobs = session.exec(statement).all()
+    job_ids = []
+    for job in jobs:
+        job.status = JobStatus.running
+        job.locked_at = now
+        job.attempts += 1
+        session.add(job)
+        job_ids.append(job.id)
+    session.commit()
+    return job_ids
+
+
+def compute_backoff(attempts: int) -> timedelta:
+    delay = settings.JOBS_BACKOFF_BASE_SECONDS * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, settings.JOBS_BACKOFF_MAX_SECONDS))
+
+
+def run_job(*, session: Session, job: Job) -> None:
+    """Run a claimed job and record the outcome, rescheduling it on failure."""
+    handler = _tasks.get(job.task)
+    try:
+        if handler is None:
+            raise LookupError(f"No handler registered for task {job.task!r}")
+        handler(job.payload)
+    except Exception as e:
+        logger.exception(f"Job {job.id} ({job.task}) failed on attempt {job.attempts}")
+        job.last_error = repr(e)[:2048]
+        if job.attempts >= job.max_attempts:
+            job.status = JobStatus.failed
+        else:
+            job.status = JobStatus.queued
+            job.run_at = datetime.now(timezone.utc) + compute_backoff(job.attempts)
+    else:
+        job.status = JobStatus.done
+        job.last_error = None
+    job.locked_at = None
+    session.add(job)
+    session.commit()
+
+
+def schedule_job_pruning(*, session: Session, run_at: datetime | None = None) -> None:
+    """Queue the pruning of finished jobs, unless it is already queued."""
+    statement = select(Job.id).where(
+        Job.task == PRUNE_TASK, Job.status == JobStatus.queued
+    )
+    if session.exec(statement).first() is None:
+        enqueue(session=session, task=PRUNE_TASK, payload={}, run_at=run_at)
+
+
+@task(PRUNE_TASK)
+def prune_jobs(_payload: dict[str, Any]) -> None:
+    now = datetime.now(timezone.utc)
+    retention = timedelta(days=settings.JOBS_RETENTION_DAYS)
+    with Session(get_engine()) as session:
+        statement = delete(Job).where(
+            col(Job.status).in_([JobStatus.done, JobStatus.failed]),
+            col(Job.run_at) < now - retention,
+        )
+        result = session.exec(statement)  # type: ignore[call-overload]
+        logger.info(f"Pruned {result.rowcount} finished jobs")
+        schedule_job_pruning(session=session, run_at=now + timedelta(days=1))
+        session.commit()
@@ -1,33 +1,75 @@
-import sentry_sdk
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from anyio import to_thread
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
+from sqlalchemy.exc import OperationalError
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
+from app.core import metrics
 from app.core.config import settings
+from app.core.db import dispose_engine, get_engine
+from app.core.deadlines import DeadlineMiddleware, query_canceled_handler
+from app.core.limits import ConcurrencyLimitMiddleware
+from app.core.profiling import ProfilingMiddleware
+from app.core.timing import ServerTimingMiddleware
+from app.runsheet_events import hub
+from app.utils import load_email_templates
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
     return f"{route.tags[0]}-{route.name}"
 
 
-if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
-    sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    # Runs in each worker process, so pools are never shared across processes
+    to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+    get_engine()
+    load_email_templates()
+    async with hub.run():
+        yield
+    dispose_engine()
+    metrics.mark_process_dead()
+
 
-app = FastAPI(
-    title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json",
-    generate_unique_id_function=custom_generate_unique_id,
-)
+def create_app() -> FastAPI:
+    if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
+        import sentry_sdk
 
-# Set all CORS enabled origins
-if settings.all_cors_origins:
-    app.add_middleware(
-        CORSMiddleware,
-        allow_origins=settings.all_cors_origins,
-        allow_credentials=True,
-        allow_methods=["*"],
-        allow_headers=["*"],
+        sentry_sdk.init(dsn=str(settings.SENTRY_DSN), enable_tracing=True)
+
+    app = FastAPI(
+        title=settings.PROJECT_NAME,
+        openapi_url=f"{settings.API_V1_STR}/openapi.json",
+        generate_unique_id_function=custom_generate_unique_id,
+        lifespan=lifespan,
     )
 
-app.include_router(api_router, prefix=settings.API_V1_STR)
+    # Inside the CORS middleware, so 503 and 504 responses carry its headers.
+    # The deadline starts once the request got a slot of its route group
+    app.add_middleware(DeadlineMiddleware)
+    app.add_middleware(ConcurrencyLimitMiddleware)
+    app.add_exception_handler(OperationalError, query_canceled_handler)
+
+    # Set all CORS enabled origins
+    if settings.all_cors_origins:
+        app.add_middleware(
+            CORSMiddleware,
+            allow_origins=settings.all_cors_origins,
+            allow_credentials=True,
+            allow_methods=["*"],
+            allow_headers=["*"],
+        )
+
+    app.add_middleware(ServerTimingMiddleware)
+    app.add_middleware(ProfilingMiddleware)
+
+    if settings.METRICS_ENABLED:
+        app.add_middleware(metrics.PrometheusMiddleware)
+        app.add_route("/metrics", metrics.metrics, include_in_schema=False)
+
+    app.include_router(api_router, prefix=settings.API_V1_STR)
+    return app
@@ -4,13 +4,27 @@ Database table inferred from class name.
 WARNING: server_default=sa.text('now()')  # Added manually in migrations when using TimestampMixin
 """
 import uuid
-from datetime import datetime
-from typing import Optional
-
-from sqlalchemy import Boolean, Column, DateTime, false
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    false,
+    func,
+    text,
+)
 from sqlalchemy import Enum as SQLEnum
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import declared_attr, deferred
 from sqlmodel import Field, Relationship, SQLModel
 
+from app.core.ids import uuid7
+from app.enums.job_status import JobStatus
 from app.enums.material import Material
 from app.enums.runsheet_state import RunsheetState
 from app.enums.sample_type import SampleType
@@ -22,31 +36,60 @@ from app.schemas.sample.sample_base import SampleBase
 from app.schemas.step_process.step_process_base import StepProcessBase
 from app.schemas.user.user_base import UserBase
 
+# Long free text columns, only loaded on access or when the group is undeferred
+DETAIL_COLUMNS = "detail"
+
+
+def defer_detail_columns(*names: str) -> Any:
+    """Mapper arguments deferring the named columns into the DETAIL_COLUMNS group"""
+    def mapper_args(cls: Any) -> dict[str, Any]:
+        return {"properties": {name: deferred(cls.__table__.c[name], group=DETAIL_COLUMNS) for name in names}}
+    return declared_attr.directive(mapper_args)
+
+
+# Id of the transaction that last wrote the row, set by a trigger on update (see app/sync.py)
+def change_xid_field() -> Any:
+    return Field(default=None, sa_column=Column(BigInteger, nullable=False, server_default=text("(pg_current_xact_id()::text::bigint)")))
+
+
+def change_xid_index(table: str, *key: str) -> Index:
+    """Index the sync pages are read through, in change then primary key order"""
+    return Index(f"ix_{table}_change_xid", "change_xid", *key)
+
 
 # PIVOT TABLES
 class SampleSupervisorLink(SQLModel, table=True):
     __tablename__ = "link_sample_supervisor"
+    __table_args__ = (change_xid_index("link_sample_supervisor", "sample_id", "user_id"),)
     sample_id: uuid.UUID = Field(foreign_key="sample.id", primary_key=True)
     user_id: uuid.UUID = Field(foreign_key="user.id", primary_key=True)
+    change_xid: int | None = change_xid_field()
 
 
 class SampleStepProcessLink(SQLModel, table=True):
     __tablename__ = "link_sample_step_process"
+    __table_args__ = (change_xid_index("link_sample_step_process", "sample_id", "step_process_id"),)
     sample_id: uuid.UUID = Field(foreign_key="sample.id", primary_key=True)
     step_process_id: uuid.UUID = Field(foreign_key="step_process.id", primary_key=True)
     completed: bool = Field(default=False, sa_column=Column(Boolean(), nullable=False, server_default=false()))
+    change_xid: int | None = change_xid_field()
 
 
 class RunsheetSampleLink(SQLModel, table=True):
     __tablename__ = "link_runsheet_sample"
+    __table_args__ = (change_xid_index("link_runsheet_sample", "sample_id", "runsheet_id"),)
     sample_id: uuid.UUID = Field(foreign_key="sample.id", primary_key=True)
     runsheet_id: uuid.UUID = Field(foreign_key="runsheet.id", primary_key=True)
+    change_xid: int | None = change_xid_field()
 
 
 # USER
 class User(TimestampMixin, UserBase, table=True):
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    id: uuid.UUID = Field(default_factory=uuid7, primary_key=True)
     hashed_password: str
+    # Bumped to revoke the access tokens issued before (see app/core/revocation.py)
+    token_version: int = Field(default=0, sa_column=Column(Integer(), nullable=False, server_default="0"))
+    token_version_bumped_at: datetime | None = Field(default=None, sa_column=Column(DateTime(timezone=True), nullable=True, index=True))
 
     items: list["Item"] = Relationship(back_populates="owner", cascade_delete=True)
 
@@ -73,16 +116,30 @@ class User(TimestampMixin, UserBase, table=True):
         return f"<User id={self.id} email={self.email} name={self.name}>"
 
 
+# Every email lookup compares lowercase, see crud.get_user_by_email
+Index("ix_user_email_lower", func.lower(User.email), unique=True)
+
+
+# REVOKED USER
+# Id of a deleted user whose claims tokens are revoked (see app/core/revocation.py)
+class RevokedUser(SQLModel, table=True):
+    __tablename__ = "revoked_user"
+    user_id: uuid.UUID = Field(primary_key=True)
+    revoked_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_column=Column(DateTime(timezone=True), nullable=False, index=True))
+
+
 # ITEM
 class Item(ItemBase, table=True):
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    id: uuid.UUID = Field(default_factory=uuid7, primary_key=True)
     owner_id: uuid.UUID = Field(foreign_key="user.id", nullable=False, ondelete="CASCADE")
     owner: User | None = Relationship(back_populates="items")
 
 
 # SAMPLE
 class Sample(TimestampMixin, SampleBase, table=True):
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    __table_args__ = (change_xid_index("sample", "id"),)
+    __mapper_args__ = defer_detail_columns("description", "notes")
+    id: uuid.UUID = Field(default_factory=uuid7, primary_key=True)
     description: str | None = Field(default=None, max_length=2048)
     notes: str | None = Field(default=None, max_length=2048)
 
@@ -90,6 +147,7 @@ class Sample(TimestampMixin, SampleBase, table=True):
     location: str | None = Field(default=None, max_length=255)
     type: SampleType = Field(default=SampleType.other, sa_column=SQLEnum(SampleType))
     material: Material = Field(default=Material.other, sa_column=SQLEnum(Material))
+    change_xid: int | None = change_xid_field()
 
     # Relationships
     parent_sample_id: uuid.UUID | None = Field(default=None, foreign_key="sample.id", nullable=True)
@@ -135,15 +193,18 @@ class Sample(TimestampMixin, SampleBase, table=True):
 
 # RUNSHEET
 class Runsheet(TimestampMixin, RunsheetBase, table=True):
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    __table_args__ = (change_xid_index("runsheet", "id"),)
+    __mapper_args__ = defer_detail_columns("description")
+    id: uuid.UUID = Field(default_factory=uuid7, primary_key=True)
     material: Material = Field(default=Material.other, sa_column=SQLEnum(Material))
     description: str | None = Field(default=None, max_length=1024)
     state: RunsheetState = Field(default=RunsheetState.edit, sa_column=SQLEnum(RunsheetState))
+    change_xid: int | None = change_xid_field()
 
     # Relationships
     reviewer_id: uuid.UUID | None = Field(foreign_key="user.id", nullable=True, ondelete="SET NULL")
     reviewer: User | None = Relationship(back_populates="runsheets_reviewed", sa_relationship_kwargs={"foreign_keys": "[Runsheet.reviewer_id]"})
-    step_processes: list["StepProcess"] = Relationship(back_populates="runsheet", cascade_delete=True)
+    step_processes: list["StepProcess"] = Relationship(back_populates="runsheet", cascade_delete=True, sa_relationship_kwargs={"order_by": "StepProcess.position"})
     samples: list["Sample"] = Relationship(
         back_populates="runsheets",
         link_model=RunsheetSampleLink,
@@ -166,8 +227,11 @@ class Runsheet(TimestampMixin, RunsheetBase, table=True):
 # STEP PROCESS
 class StepProcess(TimestampMixin, StepProcessBase, table=True):
     __tablename__ = "step_process"
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
-    step_number: int = Field(default=0)
+    __table_args__ = (Index("ix_step_process_runsheet_id_position", "runsheet_id", "position"), change_xid_index("step_process", "id"))
+    __mapper_args__ = defer_detail_columns("details", "notes")
+    id: uuid.UUID = Field(default_factory=uuid7, primary_key=True)
+    # Sparse ordering key within the runsheet (see app/step_order.py)
+    position: int = Field(default=0, sa_column=Column(BigInteger, nullable=False))
     details: str = Field(default=None, max_length=2048)
     notes: str | None = Field(default=None, max_length=2048)
 
@@ -176,6 +240,7 @@ class StepProcess(TimestampMixin, StepProcessBase, table=True):
     engineer_time: float = Field(default=0.0)
     date_completed: datetime | None = Field(default=None, sa_column=Column(DateTime(timezone=True)))
     completed: bool = Field(default=False)
+    change_xid: int | None = change_xid_field()
 
     # Relationships
     engineer_id: uuid.UUID | None = Field(foreign_key="user.id", nullable=True, ondelete="SET NULL")
@@ -198,4 +263,34 @@ class StepProcess(TimestampMixin, StepProcessBase, table=True):
 
     # String representation
     def __repr__(self) -> str:
-        return f"<StepProcess id={self.id} step_number={self.step_number} title={self.title} completed={self.completed}>"
+        return f"<StepProcess id={self.id} position={self.position} title={self.title} completed={self.completed}>"
+
+
+# SYNC TOMBSTONE
+# Key of a deleted row, written by a trigger so delta syncs see the deletion
+class SyncTombstone(SQLModel, table=True):
+    __tablename__ = "sync_tombstone"
+    __table_args__ = (change_xid_index("sync_tombstone", "id"),)
+    id: int | None = Field(default=None, sa_column=Column(BigInteger, primary_key=True))
+    table_name: str = Field(max_length=255)
+    row_key: dict[str, Any] = Field(sa_column=Column(JSONB, nullable=False))
+    change_xid: int | None = change_xid_field()
+    deleted_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_column=Column(DateTime(timezone=True), nullable=False, index=True, server_default=func.now()))
+
+
+# JOB
+class Job(TimestampMixin, table=True):
+    __table_args__ = (Index("ix_job_status_run_at", "status", "run_at"),)
+    id: uuid.UUID = Field(default_factory=uuid7, primary_key=True)
+    task: str = Field(max_length=255)
+    payload: dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSONB, nullable=False))
+    status: JobStatus = Field(default=JobStatus.queued)
+    attempts: int = Field(default=0)
+    max_attempts: int = Field(default=5)
+    run_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_column=Column(DateTime(timezone=True), nullable=False))
+    locked_at: datetime | None = Field(default=None, sa_column=Column(DateTime(timezone=True)))
+    last_error: str | None = Field(default=None, max_length=2048)
+
+    # String representation
+    def __repr__(self) -> str:
+        return f"<Job id={self.id} task={self.task} status={self.status} attempts={self.attempts}>"
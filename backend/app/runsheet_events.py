@@ -0,0 +1,144 @@
+"""Live runsheet events
+
+Triggers publish step completions and runsheet state transitions on the
+`runsheet_events` channel with `pg_notify`, delivered when their transaction
+commits. Each worker listens to the channel on a single connection, opened for
+its first subscriber, and fans the events out to the subscribers of their
+runsheet, streamed by `GET /runsheets/{id}/events`, so clients stop polling.
+
+A subscriber falling `RUNSHEET_EVENTS_BUFFER_SIZE` events behind is dropped, its
+client reconnects and reloads the runsheet. Events committed while the listener
+reconnects are lost, so its subscribers then get a `resync` event. Malformed
+notifications are logged and skipped.
+"""
+
+import json
+import logging
+import uuid
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+import anyio
+import psycopg
+from anyio.abc import TaskGroup
+from anyio.streams.memory import MemoryObjectReceiveStream, MemoryObjectSendStream
+from sqlalchemy import make_url
+
+from app.core.config import settings
+from app.core.metrics import RUNSHEET_EVENT_SUBSCRIBERS
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "runsheet_events"
+
+Event = dict[str, Any]
+
+
+def get_listener_conninfo() -> str:
+    # Replicas don't deliver notifications, the listener connects to the primary
+    url = make_url(str(settings.SQLALCHEMY_DATABASE_URI)).set(drivername="postgresql")
+    return url.render_as_string(hide_password=False)
+
+
+class RunsheetEventHub:
+    def __init__(self) -> None:
+        self._subscribers: dict[uuid.UUID, set[MemoryObjectSendStream[Event]]] = {}
+        self._task_group: TaskGroup | None = None
+        self._listening: anyio.Event | None = None
+
+    @asynccontextmanager
+    async def run(self) -> AsyncIterator[None]:
+        """Serve subscribers while in the context, entered by the app lifespan."""
+        async with anyio.create_task_group() as task_group:
+            self._task_group = task_group
+            try:
+                yield
+            finally:
+                task_group.cancel_scope.cancel()
+                self._task_group = None
+                self._listening = None
+
+    @asynccontextmanager
+    async def subscribe(
+        self, runsheet_id: uuid.UUID, timeout: float | None = None
+    ) -> AsyncIterator[MemoryObjectReceiveStream[Event]]:
+        """Receive the events of a runsheet committed once the context is entered.
+
+        Raise `TimeoutError` if the listener isn't connected within `timeout`
+        seconds.
+        """
+        if self._task_group is None:
+            raise RuntimeError("The runsheet event hub is not running")
+        if self._listening is None:
+            self._listening = anyio.Event()
+            self._task_group.start_soon(self._listen)
+        send, receive = anyio.create_memory_object_stream[Event](
+            settings.RUNSHEET_EVENTS_BUFFER_SIZE
+        )
+        self._subscribers.setdefault(runsheet_id, set()).add(send)
+        RUNSHEET_EVENT_SUBSCRIBERS.inc()
+        try:
+            with anyio.fail_after(timeout):
+                await self._listening.wait()
+            yield receive
+        finally:
+            subscribers = self._subscribers.get(runsheet_id, set())
+            subscribers.discard(send)
+            if not subscribers:
+                self._subscribers.pop(runsheet_id, None)
+            RUNSHEET_EVENT_SUBSCRIBERS.dec()
+            send.close()
+            receive.close()
+
+    async def _listen(self) -> None:
+        reconnecting = False
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(
+                    get_listener_conninfo(), autocommit=True
+                ) as connection:
+                    await connection.execute(f"LISTEN {CHANNEL}")
+                    if self._listening is not None:
+                        self._listening.set()
+                    if reconnecting:
+                        for runsheet_id in list(self._subscribers):
+                            self.dispatch(
+                                {"type": "resync", "runsheet_id": str(runsheet_id)}
+                            )
+                    async for notify in connection.notifies():
+                        self._dispatch_payload(notify.payload)
+            except psycopg.OperationalError:
+                logger.exception("Runsheet events listener lost its connection")
+            except Exception:
+                logger.exception("Runsheet events listener failed")
+            if self._listening is not None and self._listening.is_set():
+                # New subscribers wait for the listener to be back
+                self._listening = anyio.Event()
+                reconnecting = True
+            await anyio.sleep(settings.RUNSHEET_EVENTS_RECONNECT_SECONDS)
+
+    def _dispatch_payload(self, payload: str) -> None:
+        try:
+            self.dispatch(json.loads(payload))
+        except (ValueError, TypeError, AttributeError):
+            logger.exception(f"Skipping malformed runsheet event {payload!r}")
+
+    def dispatch(self, event: Event) -> None:
+        if event.get("runsheet_id") is None:
+            return
+        runsheet_id = uuid.UUID(event["runsheet_id"])
+        for send in list(self._subscribers.get(runsheet_id, ())):
+            self._send(send, event)
+
+    def _send(self, send: MemoryObjectSendStream[Event], event: Event) -> None:
+        try:
+            send.send_nowait(event)
+        except anyio.WouldBlock:
+            # Too far behind, its stream ends once it got the queued events
+            send.close()
+        except (anyio.BrokenResourceError, anyio.ClosedResourceError):
+            pass
+
+
+hub = RunsheetEventHub()
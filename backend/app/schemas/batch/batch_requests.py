@@ -0,0 +1,16 @@
+from typing import Any, Literal
+
+from sqlmodel import Field, SQLModel
+
+
+# A call to another API route, sent within a batch
+class BatchSubRequest(SQLModel):
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"] = "GET"
+    url: str = Field(min_length=1, max_length=2048)
+    headers: dict[str, str] = Field(default_factory=dict)
+    body: Any = None
+
+
+# Sub-requests to run, answered in the same order
+class BatchRequest(SQLModel):
+    requests: list[BatchSubRequest] = Field(min_length=1, max_length=20)
@@ -0,0 +1,13 @@
+from typing import Any
+
+from sqlmodel import SQLModel
+
+
+# Response of a sub-request, the body is decoded when it is JSON
+class BatchSubResponse(SQLModel):
+    status: int
+    body: Any = None
+
+
+class BatchResponse(SQLModel):
+    responses: list[BatchSubResponse]
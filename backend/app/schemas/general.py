@@ -1,3 +1,4 @@
+import uuid
 from datetime import datetime, timezone
 
 from sqlalchemy.dialects.postgresql import TIMESTAMP
@@ -42,6 +43,19 @@ class Token(SQLModel):
 # Contents of JWT token
 class TokenPayload(SQLModel):
     sub: str | None = None
+    # Signed claims, only present with ACCESS_TOKEN_CLAIMS
+    is_active: bool | None = None
+    is_superuser: bool | None = None
+    is_reviewer: bool | None = None
+    ver: int | None = None
+
+
+# Permissions of the current user, read from the token or the database
+class TokenClaims(SQLModel):
+    id: uuid.UUID
+    is_active: bool
+    is_superuser: bool
+    is_reviewer: bool
 
 
 class NewPassword(SQLModel):
@@ -1,6 +1,13 @@
+from sqlmodel import Field, SQLModel
+
 from .item_base import ItemBase
 
 
 # Properties to receive on item creation
 class ItemCreate(ItemBase):
     pass
+
+
+# Items to create at once
+class ItemsCreate(SQLModel):
+    data: list[ItemCreate] = Field(min_length=1, max_length=1000)
@@ -0,0 +1,19 @@
+import uuid
+from datetime import datetime
+
+from app.enums.material import Material
+from app.enums.runsheet_state import RunsheetState
+
+from .runsheet_base import RunsheetBase
+
+
+# Properties to return via API, id is always required
+class RunsheetPublic(RunsheetBase):
+    id: uuid.UUID
+    material: Material
+    description: str | None
+    state: RunsheetState
+    reviewer_id: uuid.UUID | None
+    creator_id: uuid.UUID
+    created_at: datetime
+    updated_at: datetime
@@ -0,0 +1,18 @@
+import uuid
+
+from sqlmodel import Field
+
+from app.enums.material import Material
+from app.enums.sample_type import SampleType
+
+from .sample_base import SampleBase
+
+
+# Properties to receive on sample creation
+class SampleCreate(SampleBase):
+    description: str | None = Field(default=None, max_length=2048)
+    notes: str | None = Field(default=None, max_length=2048)
+    location: str | None = Field(default=None, max_length=255)
+    type: SampleType = SampleType.other
+    material: Material = Material.other
+    parent_sample_id: uuid.UUID | None = None
@@ -0,0 +1,22 @@
+import uuid
+from datetime import datetime
+
+from app.enums.material import Material
+from app.enums.sample_type import SampleType
+
+from .sample_base import SampleBase
+
+
+# Properties to return via API, id is always required
+class SamplePublic(SampleBase):
+    id: uuid.UUID
+    description: str | None
+    notes: str | None
+    exist: bool
+    location: str | None
+    type: SampleType
+    material: Material
+    parent_sample_id: uuid.UUID | None
+    creator_id: uuid.UUID
+    created_at: datetime
+    updated_at: datetime
@@ -1,6 +1,22 @@
+import uuid
+
+from pydantic import model_validator
 from sqlmodel import Field, SQLModel
+from typing_extensions import Self
 
 
 # Shared properties
 class StepProcessBase(SQLModel):
     title: str = Field(default=None, max_length=255)
+
+
+# Where to place a step in its runsheet, last when no neighbour is given
+class StepPlacement(SQLModel):
+    before_id: uuid.UUID | None = None
+    after_id: uuid.UUID | None = None
+
+    @model_validator(mode="after")
+    def _check_single_neighbour(self) -> Self:
+        if self.before_id is not None and self.after_id is not None:
+            raise ValueError("Place the step before or after a step, not both")
+        return self
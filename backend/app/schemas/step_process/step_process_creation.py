@@ -0,0 +1,18 @@
+import uuid
+
+from sqlmodel import Field
+
+from app.enums.step_system import StepSystem
+
+from .step_process_base import StepPlacement, StepProcessBase
+
+
+# Properties to receive on step creation
+class StepProcessCreate(StepPlacement, StepProcessBase):
+    title: str = Field(max_length=255)
+    details: str = Field(max_length=2048)
+    notes: str | None = Field(default=None, max_length=2048)
+    system: StepSystem = StepSystem.other
+    machine_time: float = 0.0
+    engineer_time: float = 0.0
+    engineer_id: uuid.UUID | None = None
@@ -0,0 +1,24 @@
+import uuid
+from datetime import datetime
+
+from app.enums.step_system import StepSystem
+
+from .step_process_base import StepProcessBase
+
+
+# Properties to return via API, id is always required
+class StepProcessPublic(StepProcessBase):
+    id: uuid.UUID
+    position: int
+    details: str | None
+    notes: str | None
+    system: StepSystem
+    machine_time: float
+    engineer_time: float
+    date_completed: datetime | None
+    completed: bool
+    engineer_id: uuid.UUID | None
+    runsheet_id: uuid.UUID
+    creator_id: uuid.UUID
+    created_at: datetime
+    updated_at: datetime
@@ -0,0 +1,6 @@
+from .step_process_base import StepPlacement
+
+
+# Properties to receive on step move
+class StepProcessMove(StepPlacement):
+    pass
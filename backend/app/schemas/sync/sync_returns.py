@@ -0,0 +1,45 @@
+import uuid
+from typing import Any
+
+from sqlmodel import SQLModel
+
+from app.schemas.runsheet.runsheet_returns import RunsheetPublic
+from app.schemas.sample.sample_returns import SamplePublic
+from app.schemas.step_process.step_process_returns import StepProcessPublic
+
+
+class RunsheetSampleLinkPublic(SQLModel):
+    runsheet_id: uuid.UUID
+    sample_id: uuid.UUID
+
+
+class SampleStepProcessLinkPublic(SQLModel):
+    sample_id: uuid.UUID
+    step_process_id: uuid.UUID
+    completed: bool
+
+
+class SampleSupervisorLinkPublic(SQLModel):
+    sample_id: uuid.UUID
+    user_id: uuid.UUID
+
+
+# Key columns of a deleted row, by table name
+class SyncDeletion(SQLModel):
+    table: str
+    key: dict[str, Any]
+
+
+# Rows changed since a sync token, apply the deletions first as a row may have
+# been deleted and created again. `token` is the `since` of the next sync, or of
+# the next page while `has_more` is set
+class SyncChanges(SQLModel):
+    token: str
+    has_more: bool
+    runsheets: list[RunsheetPublic]
+    step_processes: list[StepProcessPublic]
+    samples: list[SamplePublic]
+    runsheet_samples: list[RunsheetSampleLinkPublic]
+    sample_step_processes: list[SampleStepProcessLinkPublic]
+    sample_supervisors: list[SampleSupervisorLinkPublic]
+    deleted: list[SyncDeletion]
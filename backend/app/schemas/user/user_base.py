@@ -1,11 +1,16 @@
+from typing import Annotated
+
 import sqlalchemy as sa
-from pydantic import EmailStr
+from pydantic import AfterValidator, EmailStr
 from sqlmodel import Field, SQLModel
 
+# Emails are stored lowercase, and looked up case-insensitively
+NormalizedEmail = Annotated[EmailStr, AfterValidator(str.lower)]
+
 
 # Shared properties
 class UserBase(SQLModel):
-    email: EmailStr = Field(unique=True, index=True, max_length=255)
+    email: NormalizedEmail = Field(max_length=255)
     is_active: bool = True
     is_superuser: bool = False
     is_reviewer: bool = Field(default=False, sa_column=sa.Column(sa.Boolean(), nullable=False, server_default=sa.false()))
@@ -1,7 +1,6 @@
-from pydantic import EmailStr
 from sqlmodel import Field, SQLModel
 
-from .user_base import UserBase
+from .user_base import NormalizedEmail, UserBase
 
 
 # Properties to receive via API on creation
@@ -10,6 +9,6 @@ class UserCreate(UserBase):
 
 
 class UserRegister(SQLModel):
-    email: EmailStr = Field(max_length=255)
+    email: NormalizedEmail = Field(max_length=255)
     password: str = Field(min_length=8, max_length=128)
     name: str | None = Field(default=None, max_length=255)
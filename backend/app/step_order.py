@@ -0,0 +1,153 @@
+"""Step ordering
+
+The steps of a runsheet are ordered by `position`, spaced `POSITION_GAP` apart.
+A step inserted or moved between two others takes the middle of their gap, so
+only its own row is written, however many steps follow it. Each placement in a
+gap halves it. Once a gap is smaller than `MIN_GAP` a background job spreads the
+positions of the runsheet evenly again. A step placed in a gap that ran out
+before the job could run rebalances the runsheet right away.
+
+Placements and rebalances of a runsheet hold a transaction-level advisory lock
+on it, so concurrent edits never pick the same position.
+"""
+
+import logging
+import uuid
+from typing import Any
+
+from sqlmodel import Session, col, func, select, text, update
+
+from app import jobs
+from app.core.db import get_engine
+from app.enums.job_status import JobStatus
+from app.models import Job, StepProcess
+
+logger = logging.getLogger(__name__)
+
+POSITION_GAP = 1024
+MIN_GAP = 8
+REBALANCE_TASK = "rebalance_step_positions"
+
+
+def lock_steps(*, session: Session, runsheet_id: uuid.UUID) -> None:
+    """Serialize the placements in a runsheet until the transaction ends."""
+    statement = text("SELECT pg_advisory_xact_lock(hashtextextended(:key, 0))")
+    session.execute(statement, {"key": f"step_order:{runsheet_id}"})
+
+
+def _get_gap(
+    *,
+    session: Session,
+    step: StepProcess,
+    before_id: uuid.UUID | None,
+    after_id: uuid.UUID | None,
+) -> tuple[int, int | None]:
+    """Positions around the place of `step`, the upper one is None for the end."""
+    positions = select(StepProcess.position).where(
+        StepProcess.runsheet_id == step.runsheet_id, StepProcess.id != step.id
+    )
+    if after_id is not None:
+        lower = session.exec(positions.where(StepProcess.id == after_id)).one()
+        upper = session.exec(
+            positions.where(col(StepProcess.position) > lower)
+            .order_by(col(StepProcess.position))
+            .limit(1)
+        ).first()
+        return lower, upper
+    if before_id is not None:
+        upper = session.exec(positions.where(StepProcess.id == before_id)).one()
+        previous = session.exec(
+            positions.where(col(StepProcess.position) < upper)
+            .order_by(col(StepProcess.position).desc())
+            .limit(1)
+        ).first()
+        return previous or 0, upper
+    last: int | None = session.exec(
+        select(func.max(StepProcess.position)).where(
+            StepProcess.runsheet_id == step.runsheet_id, StepProcess.id != step.id
+        )
+    ).one()
+    return last or 0, None
+
+
+def place_step(
+    *,
+    session: Session,
+    step: StepProcess,
+    before_id: uuid.UUID | None = None,
+    after_id: uuid.UUID | None = None,
+) -> bool:
+    """Set the position of `step` right before or after another step of its
+    runsheet, or last. Return whether the runsheet is due for a rebalance.
+
+    The neighbour must be a step of the runsheet, other than `step`. The lock is
+    held until the caller commits.
+    """
+    lock_steps(session=session, runsheet_id=step.runsheet_id)
+    lower, upper = _get_gap(
+        session=session, step=step, before_id=before_id, after_id=after_id
+    )
+    if upper is None:
+        step.position = lower + POSITION_GAP
+        return False
+    if upper - lower < 2:
+        logger.info(f"Rebalancing the steps of runsheet {step.runsheet_id} inline")
+        rebalance(session=session, runsheet_id=step.runsheet_id)
+        lower, upper = _get_gap(
+            session=session, step=step, before_id=before_id, after_id=after_id
+        )
+        assert upper is not None
+    step.position = (lower + upper) // 2
+    return min(step.position - lower, upper - step.position) < MIN_GAP
+
+
+def rebalance(*, session: Session, runsheet_id: uuid.UUID) -> None:
+    """Space the steps of a runsheet `POSITION_GAP` apart, in the same order.
+
+    Only the steps whose position changes are written.
+    """
+    ranked = (
+        select(
+            StepProcess.id,
+            (
+                func.row_number().over(
+                    order_by=(col(StepProcess.position), col(StepProcess.id))
+                )
+                * POSITION_GAP
+            ).label("position"),
+        )
+        .where(StepProcess.runsheet_id == runsheet_id)
+        .subquery()
+    )
+    statement = (
+        update(StepProcess)
+        .where(
+            col(StepProcess.id) == ranked.c.id,
+            col(StepProcess.position) != ranked.c.position,
+        )
+        .values(position=ranked.c.position)
+        .execution_options(synchronize_session=False)
+    )
+    session.exec(statement)  # type: ignore[call-overload]
+
+
+def schedule_rebalance(*, session: Session, runsheet_id: uuid.UUID) -> None:
+    """Queue the rebalance of a runsheet, unless it is already queued. The caller
+    commits the job."""
+    payload = {"runsheet_id": str(runsheet_id)}
+    statement = select(Job.id).where(
+        Job.task == REBALANCE_TASK,
+        Job.status == JobStatus.queued,
+        Job.payload == payload,
+    )
+    if session.exec(statement).first() is None:
+        jobs.enqueue(session=session, task=REBALANCE_TASK, payload=payload)
+
+
+@jobs.task(REBALANCE_TASK)
+def rebalance_steps(payload: dict[str, Any]) -> None:
+    runsheet_id = uuid.UUID(payload["runsheet_id"])
+    with Session(get_engine()) as session:
+        lock_steps(session=session, runsheet_id=runsheet_id)
+        rebalance(session=session, runsheet_id=runsheet_id)
+        session.commit()
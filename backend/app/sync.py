@@ -0,0 +1,182 @@
+"""Delta sync
+
+Clients keep a local copy of the runsheets, steps, samples and their links, and
+fetch what changed since their previous sync with `GET /sync/?since=<token>`.
+
+Synced rows store in `change_xid` the id of the transaction that last wrote them
+(a column default on insert, a trigger on update), and deleted rows leave their
+key in `sync_tombstone`. A sync token holds the oldest transaction still running
+when the sync started (its snapshot xmin): every earlier transaction was finished
+and sent, so the next sync returns what that transaction and later ones wrote,
+through the `change_xid` indexes. `updated_at` couldn't serve as the cursor, it
+is set when a transaction starts and transactions commit out of order. Rows may
+be sent twice, clients upsert them.
+
+A sync returns at most `SYNC_PAGE_SIZE` rows. When more changed, its token is a
+continuation, `has_more` is set and clients sync again with it until it isn't.
+Pages go through the tables in `SYNCED_TABLES` order, deletions first, each in
+`(change_xid, primary key)` order from the row after the last one served, so a
+transaction that wrote more rows than a page still spans several pages. Every
+page of a sync reads the rows changed since its first token, and its last token
+holds the snapshot xmin taken by its first page.
+
+Tombstones are pruned after `SYNC_TOMBSTONE_RETENTION_DAYS` by a daily job, and
+older tokens are refused so their clients sync from scratch.
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import inspect, tuple_
+from sqlalchemy.orm import undefer_group
+from sqlmodel import Session, SQLModel, col, delete, select, text
+
+from app import jobs
+from app.core.config import settings
+from app.core.db import get_engine
+from app.enums.job_status import JobStatus
+from app.models import (
+    DETAIL_COLUMNS,
+    Job,
+    Runsheet,
+    RunsheetSampleLink,
+    Sample,
+    SampleStepProcessLink,
+    SampleSupervisorLink,
+    StepProcess,
+    SyncTombstone,
+)
+
+logger = logging.getLogger(__name__)
+
+PRUNE_TASK = "prune_sync_tombstones"
+
+# Synced tables by the name of their rows in the response, in page order
+SYNCED_TABLES: dict[str, type[SQLModel]] = {
+    "deleted": SyncTombstone,
+    "runsheets": Runsheet,
+    "step_processes": StepProcess,
+    "samples": Sample,
+    "runsheet_samples": RunsheetSampleLink,
+    "sample_step_processes": SampleStepProcessLink,
+    "sample_supervisors": SampleSupervisorLink,
+}
+# A sync without token starts after the deletions
+FIRST_TABLE = 1
+
+
+@dataclass(frozen=True)
+class SyncPage:
+    """Where the next page of a sync starts."""
+
+    since: int
+    table: int
+    # Change xid and primary key of the last row served, empty at the table start
+    after: tuple[Any, ...] = ()
+
+
+def _key(model: type[SQLModel]) -> list[Any]:
+    # The columns of the index its pages are read through
+    mapper = inspect(model)
+    assert mapper is not None
+    return [col(model.change_xid), *mapper.primary_key]  # type: ignore[attr-defined]
+
+
+def encode_token(xmin: int, issued_at: datetime, page: SyncPage | None = None) -> str:
+    token = f"{xmin}.{int(issued_at.timestamp())}"
+    if page is None:
+        return token
+    return ".".join([token, str(page.since), str(page.table), *map(str, page.after)])
+
+
+def decode_token(token: str) -> tuple[int, datetime, SyncPage | None]:
+    """Return the xmin, issue time and next page of a token, ValueError when
+    malformed."""
+    xmin, issued_at, *rest = token.split(".")
+    page = None
+    if rest:
+        since, table, *after = rest
+        models = list(SYNCED_TABLES.values())
+        if not 0 <= int(table) < len(models):
+            raise ValueError("Unknown synced table")
+        model = models[int(table)]
+        types = [column.type.python_type for column in _key(model)]
+        after_key: tuple[Any, ...] = ()
+        if after:
+            after_key = tuple(
+                type_(value) for type_, value in zip(types, after, strict=True)
+            )
+        page = SyncPage(since=int(since), table=int(table), after=after_key)
+    return int(xmin), datetime.fromtimestamp(int(issued_at), timezone.utc), page
+
+
+def is_expired(issued_at: datetime) -> bool:
+    retention = timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    return issued_at < datetime.now(timezone.utc) - retention
+
+
+def read_page(
+    session: Session, page: SyncPage
+) -> tuple[dict[str, list[Any]], SyncPage | None]:
+    """Rows of a page by table name, and where the next page starts if any."""
+    rows_left = settings.SYNC_PAGE_SIZE
+    changes: dict[str, list[Any]] = {name: [] for name in SYNCED_TABLES}
+    for index, (name, model) in enumerate(SYNCED_TABLES.items()):
+        if index < page.table:
+            continue
+        key = _key(model)
+        statement = (
+            select(model)
+            .where(key[0] >= page.since)
+            .order_by(*key)
+            .limit(rows_left + 1)
+            .options(undefer_group(DETAIL_COLUMNS))
+        )
+        if index == page.table and page.after:
+            statement = statement.where(tuple_(*key) > tuple_(*page.after))
+        rows = list(session.exec(statement).all())
+        if len(rows) > rows_left:
+            changes[name] = rows[:rows_left]
+            after = ()
+            if rows_left:
+                last = rows[rows_left - 1]
+                after = tuple(getattr(last, column.key) for column in key)
+            return changes, SyncPage(since=page.since, table=index, after=after)
+        changes[name] = rows
+        rows_left -= len(rows)
+    return changes, None
+
+
+def get_snapshot_xmin(session: Session) -> int:
+    statement = text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+    xmin: int = session.execute(statement).scalar_one()
+    return xmin
+
+
+def schedule_tombstone_pruning(
+    *, session: Session, run_at: datetime | None = None
+) -> None:
+    """Queue the pruning of old tombstones, unless it is already queued."""
+    statement = select(Job.id).where(
+        Job.task == PRUNE_TASK, Job.status == JobStatus.queued
+    )
+    if session.exec(statement).first() is None:
+        jobs.enqueue(session=session, task=PRUNE_TASK, payload={}, run_at=run_at)
+
+
+@jobs.task(PRUNE_TASK)
+def prune_tombstones(_payload: dict[str, Any]) -> None:
+    now = datetime.now(timezone.utc)
+    # A day past the retention, as the deletions sent to a token may have been
+    # made by transactions that started before it was issued
+    retention = timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS + 1)
+    with Session(get_engine()) as session:
+        statement = delete(SyncTombstone).where(
+            SyncTombstone.deleted_at < now - retention  # type: ignore[arg-type]
+        )
+        result = session.exec(statement)  # type: ignore[call-overload]
+        logger.info(f"Pruned {result.rowcount} sync tombstones")
+        schedule_tombstone_pruning(session=session, run_at=now + timedelta(days=1))
+        session.commit()
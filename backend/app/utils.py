@@ -1,17 +1,22 @@
 import logging
+from collections.abc import Callable, Iterable
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
+from functools import cache
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-import emails  # type: ignore
 import jwt
-from jinja2 import Template
 from jwt.exceptions import InvalidTokenError
+from sqlmodel import Session
 
+from app import jobs
 from app.core import security
 from app.core.config import settings
 
+if TYPE_CHECKING:
+    from jinja2 import Environment
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -22,24 +27,70 @@ class EmailData:
     subject: str
 
 
+# Templates are compiled once per process and their bytecode is cached on disk,
+# so rendering an email doesn't read or parse the HTML file again. Jinja is only
+# imported when the first template is needed.
+@cache
+def get_email_templates() -> "Environment":
+    from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+    return Environment(
+        loader=FileSystemLoader(Path(__file__).parent / "email-templates" / "build"),
+        bytecode_cache=FileSystemBytecodeCache(),
+        auto_reload=settings.ENVIRONMENT == "local",
+    )
+
+
+def load_email_templates() -> None:
+    email_templates = get_email_templates()
+    for template_name in email_templates.list_templates(extensions=["html"]):
+        email_templates.get_template(template_name)
+
+
 def render_email_template(*, template_name: str, context: dict[str, Any]) -> str:
-    template_str = (
-        Path(__file__).parent / "email-templates" / "build" / template_name
-    ).read_text()
-    html_content = Template(template_str).render(context)
-    return html_content
+    return get_email_templates().get_template(template_name).render(context)
+
+
+def render_email_templates(
+    *, template_name: str, contexts: Iterable[dict[str, Any]]
+) -> list[str]:
+    """Render the same template once per context, e.g. for digest emails."""
+    template = get_email_templates().get_template(template_name)
+    return [template.render(context) for context in contexts]
 
 
 def send_email(
     *,
+    session: Session,
     email_to: str,
-    subject: str = "",
-    html_content: str = "",
+    email: str,
+    params: dict[str, Any] | None = None,
 ) -> None:
+    """Queue an email for delivery by the background worker.
+
+    The job stores the name of the email in `EMAILS` and its parameters, and the
+    worker renders it, so passwords and tokens never sit in the `job` table. The
+    caller commits the job.
+    """
     assert settings.emails_enabled, "no provided configuration for email variables"
+    jobs.enqueue(
+        session=session,
+        task="send_email",
+        payload={"email_to": email_to, "email": email, "params": params or {}},
+    )
+
+
+@jobs.task("send_email")
+def deliver_email(payload: dict[str, Any]) -> None:
+    # Imported here as the email stack is slow to import and only the worker sends
+    import emails  # type: ignore
+
+    email_data = EMAILS[payload["email"]](
+        email_to=payload["email_to"], **payload["params"]
+    )
     message = emails.Message(
-        subject=subject,
-        html=html_content,
+        subject=email_data.subject,
+        html=email_data.html_content,
         mail_from=(settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
     )
     smtp_options = {"host": settings.SMTP_HOST, "port": settings.SMTP_PORT}
@@ -51,8 +102,10 @@ def send_email(
         smtp_options["user"] = settings.SMTP_USER
     if settings.SMTP_PASSWORD:
         smtp_options["password"] = settings.SMTP_PASSWORD
-    response = message.send(to=email_to, smtp=smtp_options)
+    response = message.send(to=payload["email_to"], smtp=smtp_options)
     logger.info(f"send email result: {response}")
+    if not response.success:
+        raise RuntimeError(f"Email delivery failed: {response.error or response}")
 
 
 def generate_test_email(email_to: str) -> EmailData:
@@ -82,24 +135,29 @@ def generate_reset_password_email(email_to: str, email: str, token: str) -> Emai
     return EmailData(html_content=html_content, subject=subject)
 
 
-def generate_new_account_email(
-    email_to: str, username: str, password: str
-) -> EmailData:
+def generate_new_account_email(email_to: str, username: str) -> EmailData:
     project_name = settings.PROJECT_NAME
     subject = f"{project_name} - New account for user {username}"
+    token = generate_password_reset_token(email=username)
     html_content = render_email_template(
         template_name="new_account.html",
         context={
             "project_name": settings.PROJECT_NAME,
             "username": username,
-            "password": password,
             "email": email_to,
-            "link": settings.FRONTEND_HOST,
+            "valid_hours": settings.EMAIL_RESET_TOKEN_EXPIRE_HOURS,
+            "link": f"{settings.FRONTEND_HOST}/reset-password?token={token}",
         },
     )
     return EmailData(html_content=html_content, subject=subject)
 
 
+def generate_password_recovery_email(email_to: str, email: str) -> EmailData:
+    # The token is created when the email is rendered, by the worker
+    token = generate_password_reset_token(email=email)
+    return generate_reset_password_email(email_to=email_to, email=email, token=token)
+
+
 def generate_password_reset_token(email: str) -> str:
     delta = timedelta(hours=settings.EMAIL_RESET_TOKEN_EXPIRE_HOURS)
     now = datetime.now(timezone.utc)
@@ -121,3 +179,11 @@ def verify_password_reset_token(token: str) -> str | None:
         return str(decoded_token["sub"])
     except InvalidTokenError:
         return None
+
+
+# Emails that can be queued with `send_email`, rendered by the worker
+EMAILS: dict[str, Callable[..., EmailData]] = {
+    "test_email": generate_test_email,
+    "new_account": generate_new_account_email,
+    "password_recovery": generate_password_recovery_email,
+}
@@ -0,0 +1,66 @@
+import logging
+import signal
+import threading
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from types import FrameType
+
+from sqlalchemy import Engine
+from sqlmodel import Session
+
+from app import step_order, sync, utils  # noqa: F401  Registers the tasks
+from app.core.config import settings
+from app.core.db import dispose_engine, get_engine
+from app.jobs import claim_jobs, run_job
+from app.models import Job
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def process_job(db_engine: Engine, job_id: uuid.UUID) -> None:
+    with Session(db_engine) as session:
+        job = session.get(Job, job_id)
+        if job:
+            run_job(session=session, job=job)
+
+
+def work(db_engine: Engine, stop: threading.Event) -> None:
+    concurrency = settings.JOBS_CONCURRENCY
+    poll_interval = settings.JOBS_POLL_INTERVAL_SECONDS
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        running: set[Future[None]] = set()
+        while not stop.is_set():
+            free_slots = concurrency - len(running)
+            if free_slots <= 0:
+                _, running = wait(
+                    running, timeout=poll_interval, return_when=FIRST_COMPLETED
+                )
+                continue
+            with Session(db_engine) as session:
+                job_ids = claim_jobs(session=session, limit=free_slots)
+            for job_id in job_ids:
+                running.add(executor.submit(process_job, db_engine, job_id))
+            if not job_ids:
+                stop.wait(poll_interval)
+            running = {future for future in running if not future.done()}
+        wait(running)
+
+
+def main() -> None:
+    stop = threading.Event()
+
+    def handle_signal(signum: int, _frame: FrameType | None) -> None:
+        logger.info(f"Received signal {signum}, finishing running jobs")
+        stop.set()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+    logger.info(f"Starting job worker with concurrency {settings.JOBS_CONCURRENCY}")
+    work(get_engine(), stop)
+    dispose_engine()
+    logger.info("Job worker stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,433 @@
+"""Endpoint micro-benchmarks
+
+Seeds a dedicated database (see `seed.py`), times the key request paths, along
+with the peak memory they allocate, and writes the results as JSON so two commits
+can be compared:
+
+    python -m benchmarks run --output base.json
+    python -m benchmarks run --output head.json --skip-seed
+    python -m benchmarks compare base.json head.json
+
+`python -m benchmarks keys` inserts the same rows into tables keyed by UUIDv4 and
+by UUIDv7, reporting the insert throughput and primary key index size of each.
+"""
+
+import argparse
+import json
+import logging
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import uuid
+from collections.abc import Callable, Generator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import selectinload, undefer_group
+from sqlmodel import Session, select, text
+
+from app import crud
+from app.core.config import settings
+from app.core.db import get_engine
+from app.core.ids import uuid7
+from app.fake_data import Volumes
+from app.main import create_app
+from app.models import DETAIL_COLUMNS, Item, Runsheet, Sample, User
+from app.schemas.item.item_creation import ItemCreate
+from app.schemas.sample.sample_creation import SampleCreate
+from benchmarks.seed import BENCHMARK_PASSWORD, is_seeded, seed
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+API = settings.API_V1_STR
+
+
+@dataclass
+class CaseResult:
+    name: str
+    runs: int
+    min_ms: float
+    median_ms: float
+    p95_ms: float
+    max_ms: float
+    peak_kib: float
+
+
+def time_case(name: str, func: Callable[[], Any], repeat: int) -> CaseResult:
+    func()  # Warm up caches and the connection pool
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    p95 = statistics.quantiles(durations, n=20)[-1] if repeat > 1 else durations[0]
+    # Traced separately, tracemalloc slows the allocations down
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result = CaseResult(
+        name=name,
+        runs=repeat,
+        min_ms=round(min(durations), 3),
+        median_ms=round(statistics.median(durations), 3),
+        p95_ms=round(p95, 3),
+        max_ms=round(max(durations), 3),
+        peak_kib=round(peak / 1024, 1),
+    )
+    logger.info(
+        f"{name}: median {result.median_ms} ms, p95 {result.p95_ms} ms, "
+        f"peak {result.peak_kib} KiB"
+    )
+    return result
+
+
+def get(client: TestClient, url: str, headers: dict[str, str]) -> None:
+    response = client.get(url, headers=headers)
+    response.raise_for_status()
+
+
+def login(client: TestClient, username: str, password: str) -> dict[str, str]:
+    response = client.post(
+        f"{API}/login/access-token",
+        data={"username": username, "password": password},
+    )
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def load_runsheet_detail(runsheet_id: Any) -> None:
+    with Session(get_engine()) as session:
+        crud.get_runsheet_detail(session=session, runsheet_id=runsheet_id)
+
+
+def list_runsheets(undeferred: bool = False) -> None:
+    """Load a page of runsheets with their samples, as a listing would."""
+    samples = selectinload(Runsheet.samples)  # type: ignore[arg-type]
+    options = [samples]
+    if undeferred:
+        options = [undefer_group(DETAIL_COLUMNS), samples.undefer_group(DETAIL_COLUMNS)]
+    with Session(get_engine()) as session:
+        statement = select(Runsheet).limit(100).options(*options)
+        session.exec(statement).all()
+
+
+def list_samples(undeferred: bool = False) -> None:
+    # Unordered, the plan is a sequential scan with and without the long texts
+    with Session(get_engine()) as session:
+        statement = select(Sample).limit(1000)
+        if undeferred:
+            statement = statement.options(undefer_group(DETAIL_COLUMNS))
+        session.exec(statement).all()
+
+
+@contextmanager
+def rolled_back_session() -> Generator[Session, None, None]:
+    """A session whose commits are undone once it closes, so the insert cases
+    leave the benchmark database as seeded. Its commits release savepoints,
+    without waiting for the WAL flush of a real commit."""
+    with get_engine().connect() as connection:
+        transaction = connection.begin()
+        with Session(
+            bind=connection, join_transaction_mode="create_savepoint"
+        ) as session:
+            yield session
+        transaction.rollback()
+
+
+def new_items_in(count: int) -> list[ItemCreate]:
+    return [ItemCreate(title=f"Bulk item {i}") for i in range(count)]
+
+
+def create_item_each(owner_id: Any, count: int) -> None:
+    """One commit per item, as `POST /items/` does."""
+    items_in = new_items_in(count)
+    with rolled_back_session() as session:
+        for item_in in items_in:
+            crud.create_item(session=session, item_in=item_in, owner_id=owner_id)
+
+
+def bulk_insert_items(owner_id: Any, count: int) -> None:
+    items_in = new_items_in(count)
+    with rolled_back_session() as session:
+        session.add_all(
+            Item.model_validate(item_in, update={"owner_id": owner_id})
+            for item_in in items_in
+        )
+        session.commit()
+
+
+def create_items(owner_id: Any, count: int) -> None:
+    items_in = new_items_in(count)
+    with rolled_back_session() as session:
+        crud.create_items(session=session, items_in=items_in, owner_id=owner_id)
+
+
+def new_samples_in(count: int) -> list[SampleCreate]:
+    prefix = uuid.uuid4().hex
+    return [
+        SampleCreate(citic_id=f"{prefix}-{i}", description="Bulk sample")
+        for i in range(count)
+    ]
+
+
+def bulk_insert_samples(creator_id: Any, count: int) -> None:
+    samples_in = new_samples_in(count)
+    with rolled_back_session() as session:
+        session.add_all(
+            Sample.model_validate(sample_in, update={"creator_id": creator_id})
+            for sample_in in samples_in
+        )
+        session.commit()
+
+
+def create_samples(creator_id: Any, count: int) -> None:
+    samples_in = new_samples_in(count)
+    with rolled_back_session() as session:
+        crud.create_samples(
+            session=session, samples_in=samples_in, creator_id=creator_id
+        )
+
+
+def run_cases(volumes: Volumes, repeat: int) -> list[CaseResult]:
+    with Session(get_engine()) as session:
+        user = session.exec(select(User).where(User.is_reviewer)).first()
+        runsheet = session.exec(select(Runsheet).offset(volumes.runsheets // 2)).first()
+    assert user and runsheet, "The benchmark database is not seeded"
+
+    results = []
+    with TestClient(create_app()) as client:
+        superuser = login(
+            client, settings.FIRST_SUPERUSER, settings.FIRST_SUPERUSER_PASSWORD
+        )
+        results.append(
+            time_case(
+                "login",
+                lambda: login(client, user.email, BENCHMARK_PASSWORD),
+                repeat,
+            )
+        )
+        for skip in (0, volumes.users - 100):
+            results.append(
+                time_case(
+                    f"read_users_skip_{skip}",
+                    partial(
+                        get, client, f"{API}/users/?skip={skip}&limit=100", superuser
+                    ),
+                    repeat,
+                )
+            )
+        for skip in (0, volumes.items // 2, volumes.items - 100):
+            results.append(
+                time_case(
+                    f"read_items_skip_{skip}",
+                    partial(
+                        get, client, f"{API}/items/?skip={skip}&limit=100", superuser
+                    ),
+                    repeat,
+                )
+            )
+    results.append(
+        time_case("runsheet_detail", lambda: load_runsheet_detail(runsheet.id), repeat)
+    )
+    # The undeferred cases load the long texts, as every listing did before they
+    # were deferred
+    for undeferred in (False, True):
+        suffix = "_undeferred" if undeferred else ""
+        results.append(
+            time_case(
+                f"list_runsheets_with_samples{suffix}",
+                partial(list_runsheets, undeferred),
+                repeat,
+            )
+        )
+        results.append(
+            time_case(
+                f"list_samples_1000{suffix}",
+                partial(list_samples, undeferred),
+                repeat,
+            )
+        )
+    # A commit per row and the ORM unit of work, against the bulk INSERT ...
+    # RETURNING of `crud.create_items` and `crud.create_samples`
+    for name, insert_rows in [
+        ("create_item_each", create_item_each),
+        ("bulk_insert_items", bulk_insert_items),
+        ("create_items", create_items),
+        ("bulk_insert_samples", bulk_insert_samples),
+        ("create_samples", create_samples),
+    ]:
+        results.append(
+            time_case(f"{name}_1000", partial(insert_rows, user.id, 1000), repeat)
+        )
+    return results
+
+
+def insert_keys(
+    table: str, new_id: Callable[[], uuid.UUID], rows: int, batch_size: int
+) -> dict[str, Any]:
+    with get_engine().connect() as connection:
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {table}")
+        connection.exec_driver_sql(
+            f"CREATE TABLE {table} (id uuid PRIMARY KEY, created_at timestamptz "
+            "NOT NULL DEFAULT now(), payload text NOT NULL)"
+        )
+        connection.commit()
+        statement = text(f"INSERT INTO {table} (id, payload) VALUES (:id, :payload)")
+        start = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            batch = min(batch_size, rows - offset)
+            connection.execute(
+                statement, [{"id": new_id(), "payload": "x" * 64} for _ in range(batch)]
+            )
+            connection.commit()
+        elapsed = time.perf_counter() - start
+        index_bytes = connection.execute(
+            text("SELECT pg_relation_size(:index)"), {"index": f"{table}_pkey"}
+        ).scalar_one()
+        connection.exec_driver_sql(f"DROP TABLE {table}")
+        connection.commit()
+    return {
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(rows / elapsed),
+        "index_bytes": index_bytes,
+    }
+
+
+def keys(args: argparse.Namespace) -> int:
+    """Compare random (UUIDv4) and time-ordered (UUIDv7) primary keys."""
+    report: dict[str, Any] = {
+        "revision": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "results": {},
+    }
+    for name, new_id in (("uuid4", uuid.uuid4), ("uuid7", uuid7)):
+        result = insert_keys(f"benchmark_keys_{name}", new_id, args.rows, args.batch)
+        report["results"][name] = result
+        logger.info(
+            f"{name}: {result['rows_per_second']} rows/s, "
+            f"primary key index {result['index_bytes'] / 2**20:.1f} MiB"
+        )
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output)
+    else:
+        sys.stdout.write(output + "\n")
+    return 0
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args: argparse.Namespace) -> int:
+    volumes = Volumes.from_scale(args.scale)
+    with Session(get_engine()) as session:
+        seeded = is_seeded(session, volumes)
+    if not args.skip_seed or not seeded:
+        logger.info(f"Seeding benchmark data: {volumes}")
+        seed(volumes)
+    report = {
+        "revision": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "scale": args.scale,
+        "volumes": asdict(volumes),
+        "results": [asdict(result) for result in run_cases(volumes, args.repeat)],
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output)
+    else:
+        sys.stdout.write(output + "\n")
+    return 0
+
+
+def compare(args: argparse.Namespace) -> int:
+    """Compare median timings, failing when a case got slower than the threshold."""
+    base = json.loads(Path(args.base).read_text())
+    head = json.loads(Path(args.head).read_text())
+    base_results = {result["name"]: result for result in base["results"]}
+    regressions = 0
+    logger.info(f"{'case':<28} {'base ms':>10} {'head ms':>10} {'change':>8}")
+    for result in head["results"]:
+        name = result["name"]
+        if name not in base_results:
+            logger.info(f"{name:<28} {'-':>10} {result['median_ms']:>10.2f} {'new':>8}")
+            continue
+        before = base_results[name]["median_ms"]
+        after = result["median_ms"]
+        change = (after - before) / before if before else 0.0
+        marker = ""
+        if change > args.threshold:
+            regressions += 1
+            marker = "  REGRESSION"
+        logger.info(
+            f"{name:<28} {before:>10.2f} {after:>10.2f} {change:>+8.1%}{marker}"
+        )
+    return 1 if regressions else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Seed the database and time cases")
+    run_parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="Fraction of the full data set to seed (default: 1.0)",
+    )
+    run_parser.add_argument("--repeat", type=int, default=20)
+    run_parser.add_argument("--output", help="Write the JSON report to this file")
+    run_parser.add_argument(
+        "--skip-seed",
+        action="store_true",
+        help="Reuse the existing data if it matches the requested scale",
+    )
+    run_parser.set_defaults(func=run)
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two reports")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("head")
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Relative median slowdown reported as a regression (default: 0.2)",
+    )
+    compare_parser.set_defaults(func=compare)
+
+    keys_parser = subparsers.add_parser(
+        "keys", help="Compare UUIDv4 and UUIDv7 primary keys"
+    )
+    keys_parser.add_argument("--rows", type=int, default=500_000)
+    keys_parser.add_argument("--batch", type=int, default=1000)
+    keys_parser.add_argument("--output", help="Write the JSON report to this file")
+    keys_parser.set_defaults(func=keys)
+
+    args = parser.parse_args()
+    result: int = args.func(args)
+    return result
+
+
+if __name__ == "__main__":
+    sys.exit(main())
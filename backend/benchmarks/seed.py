@@ -0,0 +1,30 @@
+"""Seed the benchmark database with the fake data set from `app/fake_data.py`."""
+
+import logging
+
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.db import create_database, database_exists
+from app.fake_data import FAKE_PASSWORD, Volumes, generate
+from app.models import Runsheet
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_PASSWORD = FAKE_PASSWORD
+
+
+def create_benchmark_database() -> None:
+    if not database_exists(settings.POSTGRES_DB):
+        logger.info(f"Creating database {settings.POSTGRES_DB}")
+        create_database(settings.POSTGRES_DB)
+
+
+def is_seeded(session: Session, volumes: Volumes) -> bool:
+    runsheets = session.exec(select(func.count()).select_from(Runsheet)).one()
+    return runsheets == volumes.runsheets
+
+
+def seed(volumes: Volumes, random_seed: int = 42) -> None:
+    generate(volumes, random_seed=random_seed, truncate=True)
@@ -0,0 +1,312 @@
+"""Replay a typical shift against a running stack.
+
+Virtual users log in with the accounts created by `app/fake_data.py` and work
+through their profile until the shift ends:
+
+- engineers poll their work queue and open entries of it
+- reviewers update the entries they review
+- admins page through the user list
+
+Every shift starts with all users logging in at once, like a shift change. At the
+end, p50/p95/p99 latencies and error rates are reported per route:
+
+    python -m loadtest --base-url http://localhost:8000 --duration 120
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from app.core.config import settings
+from app.fake_data import FAKE_PASSWORD, fake_user_email, is_engineer, is_reviewer
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+API = settings.API_V1_STR
+
+
+@dataclass
+class RouteStats:
+    durations: list[float] = field(default_factory=list)
+    errors: int = 0
+
+    def summary(self, route: str, elapsed: float) -> dict[str, Any]:
+        durations = sorted(self.durations)
+        if len(durations) > 1:
+            percentiles = statistics.quantiles(durations, n=100)
+            p50, p95, p99 = percentiles[49], percentiles[94], percentiles[98]
+        else:
+            p50 = p95 = p99 = durations[0] if durations else 0.0
+        return {
+            "route": route,
+            "requests": len(durations),
+            "errors": self.errors,
+            "error_rate": round(self.errors / len(durations), 4) if durations else 0,
+            "rps": round(len(durations) / elapsed, 2),
+            "p50_ms": round(p50, 2),
+            "p95_ms": round(p95, 2),
+            "p99_ms": round(p99, 2),
+        }
+
+
+class VirtualUser:
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        stats: dict[str, RouteStats],
+        email: str,
+        password: str,
+        think_time: float,
+    ) -> None:
+        self.client = client
+        self.stats = stats
+        self.email = email
+        self.password = password
+        self.think_time = think_time
+        self.headers: dict[str, str] = {}
+        self.item_ids: list[str] = []
+
+    async def request(
+        self, method: str, route: str, url: str, **kwargs: Any
+    ) -> httpx.Response | None:
+        """Send a request, recording its latency under the templated `route`."""
+        stats = self.stats[f"{method} {route}"]
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(
+                method, url, headers=self.headers, **kwargs
+            )
+        except httpx.HTTPError:
+            response = None
+        stats.durations.append((time.perf_counter() - start) * 1000)
+        if response is None or response.is_error:
+            stats.errors += 1
+            return None
+        return response
+
+    async def login(self) -> bool:
+        self.headers = {}
+        response = await self.request(
+            "POST",
+            "/login/access-token",
+            f"{API}/login/access-token",
+            data={"username": self.email, "password": self.password},
+        )
+        if response is None:
+            return False
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return True
+
+    async def think(self) -> None:
+        await asyncio.sleep(random.expovariate(1 / self.think_time))
+
+    async def ensure_items(self) -> None:
+        if self.item_ids:
+            return
+        for i in range(3):
+            response = await self.request(
+                "POST",
+                "/items/",
+                f"{API}/items/",
+                json={"title": f"Load test item {i}"},
+            )
+            if response is not None:
+                self.item_ids.append(response.json()["id"])
+
+    async def engineer(self) -> None:
+        """Poll the work queue and open one of its entries."""
+        await self.ensure_items()
+        await self.request("GET", "/users/me", f"{API}/users/me")
+        await self.request("GET", "/items/", f"{API}/items/", params={"limit": 20})
+        if self.item_ids:
+            item_id = random.choice(self.item_ids)
+            await self.request("GET", "/items/{id}", f"{API}/items/{item_id}")
+
+    async def reviewer(self) -> None:
+        """Open an entry under review and move it forward."""
+        await self.ensure_items()
+        await self.request("GET", "/items/", f"{API}/items/", params={"limit": 20})
+        if self.item_ids:
+            item_id = random.choice(self.item_ids)
+            await self.request("GET", "/items/{id}", f"{API}/items/{item_id}")
+            await self.request(
+                "PUT",
+                "/items/{id}",
+                f"{API}/items/{item_id}",
+                json={"description": f"Reviewed at {time.time():.0f}"},
+            )
+
+    async def admin(self) -> None:
+        """Page through the user list."""
+        skip = random.randrange(0, 10) * 100
+        await self.request(
+            "GET", "/users/", f"{API}/users/", params={"skip": skip, "limit": 100}
+        )
+
+    async def run(self, action: Callable[[], Awaitable[None]], until: float) -> None:
+        while time.monotonic() < until:
+            await action()
+            await self.think()
+
+
+@dataclass
+class Profile:
+    name: str
+    emails: list[str]
+    password: str
+    action: Callable[[VirtualUser], Callable[[], Awaitable[None]]]
+
+
+def build_profiles(args: argparse.Namespace) -> list[Profile]:
+    def accounts(role: Callable[[int], bool], count: int) -> list[str]:
+        indexes = [i for i in range(args.fake_users) if role(i)]
+        return [fake_user_email(args.seed, i) for i in indexes[:count]]
+
+    return [
+        Profile(
+            "engineer",
+            accounts(is_engineer, args.engineers),
+            FAKE_PASSWORD,
+            lambda user: user.engineer,
+        ),
+        Profile(
+            "reviewer",
+            accounts(is_reviewer, args.reviewers),
+            FAKE_PASSWORD,
+            lambda user: user.reviewer,
+        ),
+        Profile(
+            "admin",
+            [settings.FIRST_SUPERUSER] * args.admins,
+            settings.FIRST_SUPERUSER_PASSWORD,
+            lambda user: user.admin,
+        ),
+    ]
+
+
+async def run_shift(
+    users: list[tuple[VirtualUser, Profile]], duration: float
+) -> tuple[int, int]:
+    """Log every user in at once, then replay their profiles for `duration`."""
+    logins = await asyncio.gather(*(user.login() for user, _ in users))
+    active = [pair for pair, logged_in in zip(users, logins, strict=True) if logged_in]
+    until = time.monotonic() + duration
+    await asyncio.gather(
+        *(user.run(profile.action(user), until) for user, profile in active)
+    )
+    return len(active), len(users)
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    stats: dict[str, RouteStats] = defaultdict(RouteStats)
+    limits = httpx.Limits(max_connections=args.max_connections)
+    async with httpx.AsyncClient(
+        base_url=args.base_url, limits=limits, timeout=args.timeout
+    ) as client:
+        profiles = build_profiles(args)
+        users = [
+            (
+                VirtualUser(client, stats, email, profile.password, args.think_time),
+                profile,
+            )
+            for profile in profiles
+            for email in profile.emails
+        ]
+        mix = ", ".join(f"{len(p.emails)} {p.name}s" for p in profiles)
+        logger.info(f"Replaying {args.shifts} shifts of {args.duration}s with {mix}")
+        start = time.monotonic()
+        for shift in range(args.shifts):
+            active, total = await run_shift(users, args.duration)
+            logger.info(f"Shift {shift + 1}: {active}/{total} users logged in")
+        elapsed = time.monotonic() - start
+    routes = [stats[route].summary(route, elapsed) for route in sorted(stats)]
+    return {
+        "base_url": args.base_url,
+        "elapsed_seconds": round(elapsed, 1),
+        "routes": routes,
+    }
+
+
+def log_report(report: dict[str, Any]) -> None:
+    logger.info(
+        f"{'route':<32} {'requests':>8} {'errors':>7} {'rps':>7} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    )
+    for route in report["routes"]:
+        logger.info(
+            f"{route['route']:<32} {route['requests']:>8} "
+            f"{route['error_rate']:>7.1%} {route['rps']:>7.1f} "
+            f"{route['p50_ms']:>8.1f} {route['p95_ms']:>8.1f} {route['p99_ms']:>8.1f}"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m loadtest")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument(
+        "--duration", type=float, default=60, help="Seconds per shift (default: 60)"
+    )
+    parser.add_argument(
+        "--shifts",
+        type=int,
+        default=2,
+        help="Number of shifts, each starting with a login burst (default: 2)",
+    )
+    parser.add_argument("--engineers", type=int, default=80)
+    parser.add_argument("--reviewers", type=int, default=15)
+    parser.add_argument("--admins", type=int, default=5)
+    parser.add_argument(
+        "--think-time",
+        type=float,
+        default=1.0,
+        help="Mean pause between actions of a user in seconds (default: 1.0)",
+    )
+    parser.add_argument("--max-connections", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument(
+        "--fake-users",
+        type=int,
+        default=10_000,
+        help="Users created by app/fake_data.py (10k per unit of --scale)",
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the fake data")
+    parser.add_argument(
+        "--max-error-rate",
+        type=float,
+        default=0.01,
+        help="Exit with an error when a route fails more often (default: 0.01)",
+    )
+    parser.add_argument("--output", help="Also write the report as JSON to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    log_report(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+    failing = [
+        route["route"]
+        for route in report["routes"]
+        if route["error_rate"] > args.max_error_rate
+    ]
+    if failing:
+        logger.error(f"Error rate above {args.max_error_rate:.1%}: {failing}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
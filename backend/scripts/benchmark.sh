@@ -0,0 +1,13 @@
+#! /usr/bin/env bash
+
+set -e
+set -x
+
+# Benchmarks seed and truncate their own database, never the development one
+export POSTGRES_DB="${BENCHMARK_DB:-app_benchmark}"
+# Time logins with the production password hashing cost
+export PASSWORD_BCRYPT_ROUNDS="${PASSWORD_BCRYPT_ROUNDS:-12}"
+
+python -c "from benchmarks.seed import create_benchmark_database; create_benchmark_database()"
+alembic upgrade head
+python -m benchmarks "$@"
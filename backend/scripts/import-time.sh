@@ -0,0 +1,9 @@
+#! /usr/bin/env bash
+
+set -e
+
+# List the slowest imports of a module (default: app.main), cumulative time first
+python -X importtime -c "import ${1:-app.main}" 2>&1 >/dev/null \
+    | grep "^import time:" \
+    | sort --field-separator="|" --key=2 --numeric-sort --reverse \
+    | head -n "${2:-30}"
@@ -0,0 +1,173 @@
+import uuid
+from collections.abc import Generator
+from unittest.mock import patch
+
+import anyio
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.deps import PRIMARY_READS_COOKIE
+from app.core.config import settings
+from app.core.revocation import revoked_tokens
+from app.main import create_app
+from tests.utils.utils import get_superuser_token_headers
+
+API = settings.API_V1_STR
+
+
+@pytest.fixture(autouse=True)
+def serial_batches() -> Generator[None, None, None]:
+    # The sessions of a test share its connection, which can't run concurrently
+    with patch("app.core.config.settings.BATCH_MAX_CONCURRENCY", 1):
+        yield
+
+
+def test_batch_runs_sub_requests_in_order(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    data = {
+        "requests": [
+            {"url": f"{API}/users/me"},
+            {"method": "POST", "url": f"{API}/items/", "body": {"title": "Batched"}},
+            {"url": f"{API}/items/?limit=1000"},
+        ]
+    }
+    r = client.post(f"{API}/batch/", headers=superuser_token_headers, json=data)
+    assert r.status_code == 200
+    me, created, items = r.json()["responses"]
+    assert me["status"] == 200
+    assert me["body"]["email"] == settings.FIRST_SUPERUSER
+    assert created["status"] == 200
+    assert created["body"]["title"] == "Batched"
+    assert items["status"] == 200
+    assert created["body"]["id"] in [item["id"] for item in items["body"]["data"]]
+
+
+def test_sub_requests_are_authenticated_one_by_one(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    data = {
+        "requests": [
+            {"url": f"{API}/users/me"},
+            {"url": f"{API}/users/me", "headers": normal_user_token_headers},
+        ]
+    }
+    r = client.post(f"{API}/batch/", json=data)
+    assert r.status_code == 200
+    anonymous, user = r.json()["responses"]
+    assert anonymous["status"] == 401
+    assert user["status"] == 200
+    assert user["body"]["email"] == settings.EMAIL_TEST_USER
+
+
+def test_failed_sub_request_does_not_fail_the_batch(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    data = {
+        "requests": [
+            {"url": f"{API}/items/{uuid.uuid4()}"},
+            {"url": f"{API}/users/me"},
+        ]
+    }
+    r = client.post(f"{API}/batch/", headers=superuser_token_headers, json=data)
+    assert r.status_code == 200
+    missing, me = r.json()["responses"]
+    assert missing == {"status": 404, "body": {"detail": "Item not found"}}
+    assert me["status"] == 200
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/docs",
+        f"http://example.com{API}/users/me",
+        f"{API}/batch/",
+        f"{API}/./batch/",
+        f"{API}/items/../batch/",
+        f"{API}/%2e/batch/",
+    ],
+)
+def test_batch_only_calls_the_api(
+    client: TestClient, superuser_token_headers: dict[str, str], url: str
+) -> None:
+    data = {"requests": [{"url": url}]}
+    r = client.post(f"{API}/batch/", headers=superuser_token_headers, json=data)
+    assert r.status_code == 400
+    assert r.json() == {"detail": "Sub-request 0 is not a call to the API"}
+
+
+def test_batch_refuses_nested_batches(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    nested = {"requests": [{"url": f"{API}/users/me"}]}
+    data = {"requests": [{"method": "POST", "url": f"{API}/batch/", "body": nested}]}
+    with patch("app.api.routes.batch._is_api_call", return_value=True):
+        r = client.post(f"{API}/batch/", headers=superuser_token_headers, json=data)
+    assert r.status_code == 200
+    assert r.json()["responses"] == [
+        {"status": 400, "body": {"detail": "Batches can't be nested"}}
+    ]
+
+
+def test_reads_run_concurrently_between_writes() -> None:
+    events: list[str] = []
+    app = create_app()
+
+    @app.get(f"{API}/test/read/{{name}}", tags=["test"])
+    async def read(name: str) -> None:
+        events.append(f"start {name}")
+        await anyio.sleep(0.05)
+        events.append(f"end {name}")
+
+    @app.post(f"{API}/test/write/{{name}}", tags=["test"])
+    async def write(name: str) -> None:
+        events.append(f"write {name}")
+
+    data = {
+        "requests": [
+            {"url": f"{API}/test/read/a"},
+            {"url": f"{API}/test/read/b"},
+            {"method": "POST", "url": f"{API}/test/write/c"},
+            {"url": f"{API}/test/read/d"},
+        ]
+    }
+    with (
+        patch("app.core.config.settings.BATCH_MAX_CONCURRENCY", 8),
+        TestClient(app) as client,
+    ):
+        r = client.post(f"{API}/batch/", json=data)
+    assert r.status_code == 200
+    assert [response["status"] for response in r.json()["responses"]] == [200] * 4
+    assert set(events[:2]) == {"start a", "start b"}
+    assert set(events[2:4]) == {"end a", "end b"}
+    assert events[4:] == ["write c", "start d", "end d"]
+
+
+@pytest.mark.usefixtures("replica")
+def test_batch_reads_stick_to_primary_after_a_write() -> None:
+    url = f"{API}/users/me"
+    with TestClient(create_app()) as client:
+        # Claims tokens don't load the user, which the replica doesn't have
+        revoked_tokens.clear()
+        with patch("app.core.config.settings.ACCESS_TOKEN_CLAIMS", True):
+            headers = get_superuser_token_headers(client)
+        client.cookies.clear()
+        name = client.get(url, headers=headers).json()["name"]
+        read = {"requests": [{"url": f"{API}/users/"}]}
+        r = client.post(f"{API}/batch/", headers=headers, json=read)
+        assert r.json()["responses"][0]["body"]["count"] == 0
+
+        write = {
+            "requests": [
+                {"method": "PATCH", "url": url, "body": {"name": "Sticky"}},
+                {"url": f"{API}/users/"},
+            ]
+        }
+        r = client.post(f"{API}/batch/", headers=headers, json=write)
+        assert PRIMARY_READS_COOKIE in r.cookies
+        # The read after the write in the same batch goes to the primary
+        assert r.json()["responses"][1]["body"]["count"] > 0
+        r = client.post(f"{API}/batch/", headers=headers, json=read)
+        assert r.json()["responses"][0]["body"]["count"] > 0
+
+        client.patch(url, headers=headers, json={"name": name})
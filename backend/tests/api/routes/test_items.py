@@ -1,9 +1,10 @@
 import uuid
 
 from fastapi.testclient import TestClient
-from sqlmodel import Session
+from sqlmodel import Session, col, func, select
 
 from app.core.config import settings
+from app.models import Item
 from tests.utils.item import create_random_item
 
 
@@ -24,6 +25,38 @@ def test_create_item(
     assert "owner_id" in content
 
 
+def test_create_items_bulk(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    data = {"data": [{"title": f"Item {i}"} for i in range(50)]}
+    response = client.post(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=superuser_token_headers,
+        json=data,
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["count"] == 50
+    assert [item["title"] for item in content["data"]] == [
+        item["title"] for item in data["data"]
+    ]
+    ids = [uuid.UUID(item["id"]) for item in content["data"]]
+    statement = select(func.count()).select_from(Item).where(col(Item.id).in_(ids))
+    assert db.exec(statement).one() == 50
+
+
+def test_create_items_bulk_too_many(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    data = {"data": [{"title": f"Item {i}"} for i in range(1001)]}
+    response = client.post(
+        f"{settings.API_V1_STR}/items/bulk",
+        headers=superuser_token_headers,
+        json=data,
+    )
+    assert response.status_code == 422
+
+
 def test_read_item(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
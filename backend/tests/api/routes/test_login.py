@@ -1,11 +1,20 @@
+from collections.abc import Generator
+from datetime import datetime, timezone
 from unittest.mock import patch
 
+import jwt
+import pytest
 from fastapi.testclient import TestClient
-from sqlmodel import Session
+from sqlmodel import Session, col, delete
 
+from app import crud
+from app.core import security
 from app.core.config import settings
+from app.core.db import get_engine
+from app.core.revocation import revoked_tokens
 from app.core.security import verify_password
 from app.crud import create_user
+from app.models import RevokedUser, User
 from app.schemas.user.user_creation import UserCreate
 from app.utils import generate_password_reset_token
 from tests.utils.user import user_authentication_headers
@@ -116,3 +125,111 @@ def test_reset_password_invalid_token(
     assert "detail" in response
     assert r.status_code == 400
     assert response["detail"] == "Invalid token"
+
+
+def create_claims_user(client: TestClient, db: Session) -> tuple[str, dict[str, str]]:
+    email = random_email()
+    password = random_lower_string()
+    user = create_user(
+        session=db, user_create=UserCreate(email=email, password=password)
+    )
+    with patch("app.core.config.settings.ACCESS_TOKEN_CLAIMS", True):
+        headers = user_authentication_headers(
+            client=client, email=email, password=password
+        )
+    return str(user.id), headers
+
+
+def test_access_token_claims(client: TestClient, db: Session) -> None:
+    _, headers = create_claims_user(client, db)
+    token = headers["Authorization"].removeprefix("Bearer ")
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[security.ALGORITHM])
+    assert payload["is_active"] is True
+    assert payload["is_superuser"] is False
+    assert payload["is_reviewer"] is False
+    assert payload["ver"] == 0
+
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=headers)
+    assert r.status_code == 200
+    r = client.get(f"{settings.API_V1_STR}/users/", headers=headers)
+    assert r.status_code == 403
+
+
+def test_access_token_claims_revoked_on_deactivation(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    user_id, headers = create_claims_user(client, db)
+    r = client.patch(
+        f"{settings.API_V1_STR}/users/{user_id}",
+        headers=superuser_token_headers,
+        json={"is_active": False},
+    )
+    assert r.status_code == 200
+
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=headers)
+    assert r.status_code == 403
+    r = client.post(f"{settings.API_V1_STR}/login/test-token", headers=headers)
+    assert r.status_code == 403
+
+
+@pytest.fixture
+def committed_claims_user(
+    client: TestClient,
+) -> Generator[tuple[str, dict[str, str]], None, None]:
+    # Other workers load the revocations committed on the primary
+    with Session(get_engine()) as session:
+        user_id, headers = create_claims_user(client, session)
+        yield user_id, headers
+        user = session.get(User, user_id)
+        if user:
+            session.delete(user)
+        session.exec(delete(RevokedUser).where(col(RevokedUser.user_id) == user_id))  # type: ignore[call-overload]
+        session.commit()
+
+
+def test_access_token_claims_revoked_by_other_worker(
+    client: TestClient, committed_claims_user: tuple[str, dict[str, str]]
+) -> None:
+    user_id, headers = committed_claims_user
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=headers)
+    assert r.status_code == 200
+    # Another worker bumps the version, this one only sees it once synced
+    with Session(get_engine()) as session:
+        user = session.get(User, user_id)
+        assert user
+        user.token_version += 1
+        user.token_version_bumped_at = datetime.now(timezone.utc)
+        session.add(user)
+        session.commit()
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=headers)
+    assert r.status_code == 200
+
+    revoked_tokens.clear()
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=headers)
+    assert r.status_code == 403
+
+
+def test_access_token_claims_deletion_seen_by_other_worker(
+    client: TestClient, committed_claims_user: tuple[str, dict[str, str]]
+) -> None:
+    user_id, headers = committed_claims_user
+    with Session(get_engine()) as session:
+        user = session.get(User, user_id)
+        assert user
+        crud.delete_user(session=session, db_user=user)
+    revoked_tokens.clear()
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=headers)
+    assert r.status_code == 403
+
+
+def test_access_token_claims_revoked_on_deletion(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    user_id, headers = create_claims_user(client, db)
+    r = client.delete(
+        f"{settings.API_V1_STR}/users/{user_id}", headers=superuser_token_headers
+    )
+    assert r.status_code == 200
+
+    r = client.get(f"{settings.API_V1_STR}/items/", headers=headers)
+    assert r.status_code == 403
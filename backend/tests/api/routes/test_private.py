@@ -9,7 +9,7 @@ def test_create_user(client: TestClient, db: Session) -> None:
     r = client.post(
         f"{settings.API_V1_STR}/private/users/",
         json={
-            "email": "pollo@listo.com",
+            "email": "Pollo@Listo.com",
             "password": "password123",
             "name": "Pollo Listo",
         },
@@ -0,0 +1,340 @@
+import json
+import uuid
+from collections.abc import Generator
+from unittest.mock import patch
+
+import anyio
+import pytest
+from anyio import to_thread
+from fastapi.testclient import TestClient
+from sqlmodel import Session, col, select, text
+
+from app.core.config import settings
+from app.core.db import get_engine
+from app.enums.runsheet_state import RunsheetState
+from app.models import Job, Runsheet, StepProcess
+from app.runsheet_events import CHANNEL, RunsheetEventHub
+from app.step_order import MIN_GAP, POSITION_GAP, REBALANCE_TASK
+from tests.utils.runsheet import create_random_runsheet, delete_runsheet
+
+API = settings.API_V1_STR
+
+
+@pytest.fixture
+def committed_runsheet_id() -> Generator[uuid.UUID, None, None]:
+    # Notifications are only delivered once their transaction commits
+    with Session(get_engine()) as session:
+        runsheet_id = create_random_runsheet(session)
+        yield runsheet_id
+        delete_runsheet(session, runsheet_id)
+
+
+def complete_first_step_and_start(runsheet_id: uuid.UUID) -> uuid.UUID:
+    with Session(get_engine()) as session:
+        step = session.exec(
+            select(StepProcess).where(StepProcess.runsheet_id == runsheet_id)
+        ).one()
+        step.completed = True
+        runsheet = session.get_one(Runsheet, runsheet_id)
+        runsheet.state = RunsheetState.running
+        session.add_all([step, runsheet])
+        session.commit()
+        return step.id
+
+
+def test_hub_fans_out_committed_changes(committed_runsheet_id: uuid.UUID) -> None:
+    async def scenario() -> None:
+        hub = RunsheetEventHub()
+        async with (
+            hub.run(),
+            hub.subscribe(committed_runsheet_id) as first,
+            hub.subscribe(committed_runsheet_id) as second,
+            hub.subscribe(uuid.uuid4()) as other,
+        ):
+            step_id = await to_thread.run_sync(
+                complete_first_step_and_start, committed_runsheet_id
+            )
+            for events in [first, second]:
+                with anyio.fail_after(5):
+                    received = [await events.receive(), await events.receive()]
+                assert {event["type"] for event in received} == {
+                    "step_completed",
+                    "state_changed",
+                }
+                step_event = next(
+                    event for event in received if event["type"] == "step_completed"
+                )
+                assert step_event["step_process_id"] == str(step_id)
+                assert step_event["completed"] is True
+            assert other.statistics().current_buffer_used == 0
+
+    anyio.run(scenario)
+
+
+def test_hub_drops_subscribers_falling_behind() -> None:
+    async def scenario() -> None:
+        hub = RunsheetEventHub()
+        runsheet_id = uuid.uuid4()
+        event = {"type": "state_changed", "runsheet_id": str(runsheet_id)}
+        with patch("app.core.config.settings.RUNSHEET_EVENTS_BUFFER_SIZE", 1):
+            async with hub.run(), hub.subscribe(runsheet_id) as events:
+                hub.dispatch(event)
+                hub.dispatch(event)
+                assert await events.receive() == event
+                with pytest.raises(anyio.EndOfStream):
+                    await events.receive()
+
+    anyio.run(scenario)
+
+
+def notify(*payloads: str) -> None:
+    with Session(get_engine()) as session:
+        for payload in payloads:
+            session.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": CHANNEL, "payload": payload},
+            )
+        session.commit()
+
+
+def test_hub_skips_malformed_events() -> None:
+    async def scenario() -> None:
+        hub = RunsheetEventHub()
+        runsheet_id = uuid.uuid4()
+        event = {"type": "state_changed", "runsheet_id": str(runsheet_id)}
+        async with hub.run(), hub.subscribe(runsheet_id) as events:
+            await to_thread.run_sync(
+                notify,
+                "not json",
+                '{"type": "state_changed", "runsheet_id": "not a uuid"}',
+                "[]",
+                json.dumps(event),
+            )
+            with anyio.fail_after(5):
+                assert await events.receive() == event
+
+    anyio.run(scenario)
+
+
+def test_subscribe_times_out_without_a_listener() -> None:
+    async def scenario() -> None:
+        hub = RunsheetEventHub()
+        async with hub.run():
+            with pytest.raises(TimeoutError):
+                async with hub.subscribe(uuid.uuid4(), timeout=0.2):
+                    pass
+
+    with patch(
+        "app.runsheet_events.get_listener_conninfo",
+        return_value="postgresql://nobody@127.0.0.1:1/none",
+    ):
+        anyio.run(scenario)
+
+
+def test_event_stream_ends_before_the_deadline(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    runsheet_id = create_random_runsheet(db)
+    with (
+        patch.dict(settings.REQUEST_DEADLINES_SECONDS, {"events": 1.5}),
+        patch("app.core.config.settings.RUNSHEET_EVENTS_KEEPALIVE_SECONDS", 0.1),
+    ):
+        r = client.get(
+            f"{API}/runsheets/{runsheet_id}/events", headers=normal_user_token_headers
+        )
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    assert r.text.startswith(
+        f'event: ready\ndata: {{"type": "ready", "runsheet_id": "{runsheet_id}"}}\n\n'
+    )
+    assert ": keepalive\n\n" in r.text
+
+
+def test_event_stream_of_missing_runsheet(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    r = client.get(
+        f"{API}/runsheets/{uuid.uuid4()}/events", headers=normal_user_token_headers
+    )
+    assert r.status_code == 404
+    assert r.json() == {"detail": "Runsheet not found"}
+
+
+def test_event_stream_requires_authentication(client: TestClient) -> None:
+    r = client.get(f"{API}/runsheets/{uuid.uuid4()}/events")
+    assert r.status_code == 401
+
+
+def get_steps(db: Session, runsheet_id: uuid.UUID) -> list[tuple[str, int]]:
+    statement = (
+        select(StepProcess.title, StepProcess.position)
+        .where(StepProcess.runsheet_id == runsheet_id)
+        .order_by(col(StepProcess.position))
+    )
+    return [(title, position) for title, position in db.exec(statement).all()]
+
+
+def set_positions(db: Session, runsheet_id: uuid.UUID, positions: list[int]) -> None:
+    # In creation order, as ids are time-ordered
+    steps = db.exec(
+        select(StepProcess)
+        .where(StepProcess.runsheet_id == runsheet_id)
+        .order_by(col(StepProcess.id))
+    ).all()
+    for step, position in zip(steps, positions, strict=True):
+        step.position = position
+    db.add_all(steps)
+    db.commit()
+
+
+def test_create_steps_in_the_middle(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    runsheet_id = create_random_runsheet(db)
+    url = f"{API}/runsheets/{runsheet_id}/steps"
+    ids: dict[str, str] = {}
+    for title, after in [("Etch", None), ("Strip", None), ("Rinse", "Etch")]:
+        data = {"title": title, "details": f"{title} details"}
+        if after:
+            data["after_id"] = ids[after]
+        r = client.post(url, headers=superuser_token_headers, json=data)
+        assert r.status_code == 200
+        assert r.json()["details"] == f"{title} details"
+        ids[title] = r.json()["id"]
+
+    # Each step took the middle of its gap, no other step moved
+    assert get_steps(db, runsheet_id) == [
+        ("Clean", 0),
+        ("Etch", POSITION_GAP),
+        ("Rinse", POSITION_GAP * 3 // 2),
+        ("Strip", POSITION_GAP * 2),
+    ]
+
+
+def test_move_step_writes_only_the_moved_step(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    runsheet_id = create_random_runsheet(db)
+    url = f"{API}/runsheets/{runsheet_id}/steps"
+    etch, _strip, rinse = (
+        client.post(
+            url,
+            headers=superuser_token_headers,
+            json={"title": title, "details": title},
+        )
+        for title in ["Etch", "Strip", "Rinse"]
+    )
+    r = client.put(
+        f"{url}/{rinse.json()['id']}/position",
+        headers=superuser_token_headers,
+        json={"after_id": etch.json()["id"]},
+    )
+    assert r.status_code == 200
+    assert r.json()["position"] == POSITION_GAP * 3 // 2
+    assert get_steps(db, runsheet_id) == [
+        ("Clean", 0),
+        ("Etch", POSITION_GAP),
+        ("Rinse", POSITION_GAP * 3 // 2),
+        ("Strip", POSITION_GAP * 2),
+    ]
+
+
+def test_step_in_a_full_gap_rebalances_the_runsheet(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    runsheet_id = create_random_runsheet(db)
+    url = f"{API}/runsheets/{runsheet_id}/steps"
+    etch = client.post(
+        url, headers=superuser_token_headers, json={"title": "Etch", "details": "Etch"}
+    )
+    set_positions(db, runsheet_id, [1, 2])
+    r = client.post(
+        url,
+        headers=superuser_token_headers,
+        json={"title": "Rinse", "details": "Rinse", "before_id": etch.json()["id"]},
+    )
+    assert r.status_code == 200
+    assert get_steps(db, runsheet_id) == [
+        ("Clean", POSITION_GAP),
+        ("Rinse", POSITION_GAP * 3 // 2),
+        ("Etch", POSITION_GAP * 2),
+    ]
+
+
+def test_narrow_gap_schedules_a_rebalance(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    runsheet_id = create_random_runsheet(db)
+    url = f"{API}/runsheets/{runsheet_id}/steps"
+    client.post(
+        url, headers=superuser_token_headers, json={"title": "Etch", "details": "Etch"}
+    )
+    set_positions(db, runsheet_id, [POSITION_GAP, POSITION_GAP + MIN_GAP])
+    clean = db.exec(
+        select(StepProcess.id).where(
+            StepProcess.runsheet_id == runsheet_id, StepProcess.title == "Clean"
+        )
+    ).one()
+    for _ in range(2):
+        r = client.post(
+            url,
+            headers=superuser_token_headers,
+            json={"title": "Rinse", "details": "Rinse", "after_id": str(clean)},
+        )
+        assert r.status_code == 200
+    jobs = db.exec(
+        select(Job).where(
+            Job.task == REBALANCE_TASK,
+            Job.payload == {"runsheet_id": str(runsheet_id)},
+        )
+    ).all()
+    assert len(jobs) == 1
+
+
+def test_step_placement_takes_a_single_neighbour(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    runsheet_id = create_random_runsheet(db)
+    data = {
+        "title": "Etch",
+        "details": "Etch",
+        "before_id": str(uuid.uuid4()),
+        "after_id": str(uuid.uuid4()),
+    }
+    r = client.post(
+        f"{API}/runsheets/{runsheet_id}/steps",
+        headers=superuser_token_headers,
+        json=data,
+    )
+    assert r.status_code == 422
+
+
+def test_step_neighbour_of_another_runsheet(
+    client: TestClient, superuser_token_headers: dict[str, str], db: Session
+) -> None:
+    runsheet_id = create_random_runsheet(db)
+    other_step = db.exec(
+        select(StepProcess.id).where(
+            StepProcess.runsheet_id == create_random_runsheet(db)
+        )
+    ).one()
+    r = client.post(
+        f"{API}/runsheets/{runsheet_id}/steps",
+        headers=superuser_token_headers,
+        json={"title": "Etch", "details": "Etch", "after_id": str(other_step)},
+    )
+    assert r.status_code == 404
+    assert r.json() == {"detail": "Step not found"}
+
+
+def test_steps_of_another_users_runsheet(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    runsheet_id = create_random_runsheet(db)
+    r = client.post(
+        f"{API}/runsheets/{runsheet_id}/steps",
+        headers=normal_user_token_headers,
+        json={"title": "Etch", "details": "Etch"},
+    )
+    assert r.status_code == 400
+    assert r.json() == {"detail": "Not enough permissions"}
@@ -0,0 +1,177 @@
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, col, delete, select
+
+from app import crud
+from app.core.config import settings
+from app.core.db import get_engine
+from app.models import Runsheet, RunsheetSampleLink, SyncTombstone
+from app.sync import encode_token
+from tests.utils.runsheet import create_random_runsheet
+from tests.utils.utils import random_lower_string
+
+API = settings.API_V1_STR
+
+
+def test_sync_without_token_returns_all_rows(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    runsheet_id = create_random_runsheet(db)
+    r = client.get(f"{API}/sync/", headers=normal_user_token_headers)
+    assert r.status_code == 200
+    content = r.json()
+    assert content["token"]
+    assert content["deleted"] == []
+    runsheet = next(
+        runsheet
+        for runsheet in content["runsheets"]
+        if runsheet["id"] == str(runsheet_id)
+    )
+    assert runsheet["description"] == "Etch test"
+    links = [
+        link
+        for link in content["runsheet_samples"]
+        if link["runsheet_id"] == str(runsheet_id)
+    ]
+    assert len(links) == 1
+    sample_ids = {sample["id"] for sample in content["samples"]}
+    assert links[0]["sample_id"] in sample_ids
+    steps = [
+        step
+        for step in content["step_processes"]
+        if step["runsheet_id"] == str(runsheet_id)
+    ]
+    assert [step["details"] for step in steps] == ["Piranha clean"]
+
+
+def test_sync_reports_deleted_rows(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    runsheet_id = create_random_runsheet(db)
+    r = client.get(f"{API}/sync/", headers=normal_user_token_headers)
+    token = r.json()["token"]
+
+    link = db.exec(
+        select(RunsheetSampleLink).where(RunsheetSampleLink.runsheet_id == runsheet_id)
+    ).one()
+    db.delete(link)
+    db.commit()
+
+    r = client.get(
+        f"{API}/sync/", headers=normal_user_token_headers, params={"since": token}
+    )
+    assert r.status_code == 200
+    assert {
+        "table": "link_runsheet_sample",
+        "key": {"runsheet_id": str(runsheet_id), "sample_id": str(link.sample_id)},
+    } in r.json()["deleted"]
+
+
+def test_sync_returns_rows_written_since_the_token(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    # Committed, as every write of a test shares the id of its transaction
+    with Session(get_engine()) as session:
+        superuser = crud.get_user_by_email(
+            session=session, email=settings.FIRST_SUPERUSER
+        )
+        assert superuser
+        unchanged, changed = (
+            Runsheet(citic_id=random_lower_string(), creator_id=superuser.id)
+            for _ in range(2)
+        )
+        session.add_all([unchanged, changed])
+        session.commit()
+        ids = [unchanged.id, changed.id]
+        try:
+            changed.description = "Updated"
+            session.add(changed)
+            session.commit()
+            assert changed.change_xid and unchanged.change_xid
+            assert changed.change_xid > unchanged.change_xid
+
+            token = encode_token(changed.change_xid, datetime.now(timezone.utc))
+            r = client.get(
+                f"{API}/sync/",
+                headers=normal_user_token_headers,
+                params={"since": token},
+            )
+            assert r.status_code == 200
+            synced = {runsheet["id"] for runsheet in r.json()["runsheets"]}
+            assert str(changed.id) in synced
+            assert str(unchanged.id) not in synced
+        finally:
+            session.exec(delete(Runsheet).where(col(Runsheet.id).in_(ids)))  # type: ignore
+            session.exec(delete(SyncTombstone))  # type: ignore
+            session.commit()
+
+
+def synced_rows(content: dict[str, Any]) -> set[tuple[str, str]]:
+    return {
+        (name, json.dumps(row, sort_keys=True))
+        for name, rows in content.items()
+        if isinstance(rows, list)
+        for row in rows
+    }
+
+
+def test_sync_pages_through_large_changes(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    # Rows of a test share its transaction, pages split the rows of one xid
+    for _ in range(3):
+        create_random_runsheet(db)
+    r = client.get(f"{API}/sync/", headers=normal_user_token_headers)
+    assert r.json()["has_more"] is False
+    expected = synced_rows(r.json())
+
+    rows: set[tuple[str, str]] = set()
+    params: dict[str, str] = {}
+    with patch("app.core.config.settings.SYNC_PAGE_SIZE", 4):
+        for _ in range(len(expected)):
+            r = client.get(
+                f"{API}/sync/", headers=normal_user_token_headers, params=params
+            )
+            assert r.status_code == 200
+            page = synced_rows(r.json())
+            assert len(page) <= 4
+            rows |= page
+            params = {"since": r.json()["token"]}
+            if not r.json()["has_more"]:
+                break
+    assert not r.json()["has_more"]
+    assert rows == expected
+
+
+@pytest.mark.parametrize("token", ["abc", "1.2.0.99", "1.2.0.1.3.not-a-uuid"])
+def test_sync_rejects_invalid_token(
+    client: TestClient, normal_user_token_headers: dict[str, str], token: str
+) -> None:
+    r = client.get(
+        f"{API}/sync/", headers=normal_user_token_headers, params={"since": token}
+    )
+    assert r.status_code == 400
+
+
+def test_sync_rejects_expired_token(
+    client: TestClient, normal_user_token_headers: dict[str, str]
+) -> None:
+    issued_at = datetime.now(timezone.utc) - timedelta(
+        days=settings.SYNC_TOMBSTONE_RETENTION_DAYS + 1
+    )
+    r = client.get(
+        f"{API}/sync/",
+        headers=normal_user_token_headers,
+        params={"since": encode_token(1, issued_at)},
+    )
+    assert r.status_code == 410
+
+
+def test_sync_requires_authentication(client: TestClient) -> None:
+    r = client.get(f"{API}/sync/")
+    assert r.status_code == 401
@@ -321,6 +321,18 @@ def test_register_user_already_exists_error(client: TestClient) -> None:
     assert r.json()["detail"] == "The user with this email already exists in the system"
 
 
+def test_register_user_already_exists_in_other_case_error(client: TestClient) -> None:
+    data = {
+        "email": settings.FIRST_SUPERUSER.upper(),
+        "password": random_lower_string(),
+    }
+    r = client.post(
+        f"{settings.API_V1_STR}/users/signup",
+        json=data,
+    )
+    assert r.status_code == 400
+
+
 def test_update_user(
     client: TestClient, superuser_token_headers: dict[str, str], db: Session
 ) -> None:
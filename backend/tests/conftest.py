@@ -1,31 +1,160 @@
+import os
 from collections.abc import Generator
+from pathlib import Path
+from unittest.mock import patch
 
 import pytest
+from alembic import command
+from alembic.config import Config
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
-from sqlmodel import Session, delete
+from sqlalchemy import Connection, event, make_url
+from sqlalchemy.orm import SessionTransaction
+from sqlmodel import Session, SQLModel
 
+from app.api.deps import get_db, get_read_db
+from app.core import db as core_db
 from app.core.config import settings
-from app.core.db import engine, init_db
-from app.main import app
-from app.models import Item, User
+from app.core.db import (
+    create_database,
+    dispose_engine,
+    drop_database,
+    get_engine,
+    init_db,
+)
+from app.main import create_app
 from tests.utils.user import authentication_token_from_email
 from tests.utils.utils import get_superuser_token_headers
 
+# With pytest-xdist (`pytest -n auto`) every worker gets its own database, copied
+# from a template database that the controller migrates once per run
+TEMPLATE_DATABASE = f"{settings.POSTGRES_DB}_test_template"
+XDIST_WORKER = os.environ.get("PYTEST_XDIST_WORKER")
+
+
+def is_xdist_controller(config: pytest.Config) -> bool:
+    return XDIST_WORKER is None and bool(getattr(config.option, "numprocesses", 0))
+
+
+def pytest_sessionstart(session: pytest.Session) -> None:
+    if not is_xdist_controller(session.config):
+        return
+    database = settings.POSTGRES_DB
+    drop_database(TEMPLATE_DATABASE)
+    create_database(TEMPLATE_DATABASE)
+    settings.POSTGRES_DB = TEMPLATE_DATABASE
+    try:
+        alembic_config = Config(Path(__file__).parents[1] / "alembic.ini")
+        alembic_config.set_main_option(
+            "script_location", str(Path(__file__).parents[1] / "app" / "alembic")
+        )
+        command.upgrade(alembic_config, "head")
+        with Session(get_engine()) as session_:
+            init_db(session_)
+    finally:
+        dispose_engine()
+        settings.POSTGRES_DB = database
+
+
+def pytest_sessionfinish(session: pytest.Session) -> None:
+    if is_xdist_controller(session.config):
+        drop_database(TEMPLATE_DATABASE)
+
 
 @pytest.fixture(scope="session", autouse=True)
-def db() -> Generator[Session, None, None]:
-    with Session(engine) as session:
-        init_db(session)
+def test_database() -> Generator[None, None, None]:
+    if XDIST_WORKER is None:
+        with Session(get_engine()) as session:
+            init_db(session)
+        yield
+        return
+
+    database = settings.POSTGRES_DB
+    worker_database = f"{database}_test_{XDIST_WORKER}"
+    drop_database(worker_database)
+    create_database(worker_database, template=TEMPLATE_DATABASE)
+    settings.POSTGRES_DB = worker_database
+    dispose_engine()
+    yield
+    dispose_engine()
+    settings.POSTGRES_DB = database
+    drop_database(worker_database)
+
+
+@pytest.fixture(scope="module")
+def replica() -> Generator[None, None, None]:
+    """An empty database with the schema, standing in for a replica."""
+    name = f"{settings.POSTGRES_DB}_replica"
+    drop_database(name)
+    create_database(name)
+    url = make_url(str(settings.SQLALCHEMY_DATABASE_URI)).set(database=name)
+    replica_url = url.render_as_string(hide_password=False)
+    with patch("app.core.config.settings.POSTGRES_REPLICA_URIS", [replica_url]):
+        core_db._replica_engines = None
+        SQLModel.metadata.create_all(core_db.get_replica_engines()[0])
+        yield
+        for engine in core_db.get_replica_engines():
+            engine.dispose()
+        core_db._replica_engines = None
+    drop_database(name)
+
+
+@pytest.fixture(scope="session")
+def app() -> FastAPI:
+    return create_app()
+
+
+def set_read_only(
+    _session: Session, _transaction: SessionTransaction, connection: Connection
+) -> None:
+    connection.exec_driver_sql("SET TRANSACTION READ ONLY")
+
+
+@pytest.fixture
+def connection(app: FastAPI) -> Generator[Connection, None, None]:
+    """A connection whose transaction is rolled back at the end of the test.
+
+    Sessions of the test and of the API requests it makes share the connection
+    and turn their commits into savepoints, so nothing a test writes outlives it.
+    """
+    with get_engine().connect() as connection:
+        transaction = connection.begin()
+
+        def get_test_db() -> Generator[Session, None, None]:
+            with Session(
+                bind=connection,
+                join_transaction_mode="create_savepoint",
+                expire_on_commit=False,
+            ) as session:
+                yield session
+
+        def get_test_read_db() -> Generator[Session, None, None]:
+            # Read-only like the sessions of `get_read_db`. Closing the session
+            # rolls its savepoint back, which ends the read-only mode with it
+            with Session(
+                bind=connection,
+                join_transaction_mode="create_savepoint",
+                expire_on_commit=False,
+            ) as session:
+                event.listen(session, "after_begin", set_read_only)
+                yield session
+
+        app.dependency_overrides[get_db] = get_test_db
+        app.dependency_overrides[get_read_db] = get_test_read_db
+        yield connection
+        del app.dependency_overrides[get_db]
+        del app.dependency_overrides[get_read_db]
+        transaction.rollback()
+
+
+@pytest.fixture(autouse=True)
+def db(connection: Connection) -> Generator[Session, None, None]:
+    with Session(bind=connection, join_transaction_mode="create_savepoint") as session:
         yield session
-        statement = delete(Item)
-        session.execute(statement)
-        statement = delete(User)
-        session.execute(statement)
-        session.commit()
 
 
 @pytest.fixture(scope="module")
-def client() -> Generator[TestClient, None, None]:
+def client(app: FastAPI) -> Generator[TestClient, None, None]:
     with TestClient(app) as c:
         yield c
 
@@ -36,7 +165,9 @@ def superuser_token_headers(client: TestClient) -> dict[str, str]:
 
 
 @pytest.fixture(scope="module")
-def normal_user_token_headers(client: TestClient, db: Session) -> dict[str, str]:
-    return authentication_token_from_email(
-        client=client, email=settings.EMAIL_TEST_USER, db=db
-    )
+def normal_user_token_headers(client: TestClient) -> dict[str, str]:
+    # Shared by the tests of a module, so the user is committed
+    with Session(get_engine()) as session:
+        return authentication_token_from_email(
+            client=client, email=settings.EMAIL_TEST_USER, db=session
+        )
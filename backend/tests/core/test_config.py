@@ -0,0 +1,21 @@
+import pytest
+
+from app.core.config import Settings
+
+SECRETS = {
+    "SECRET_KEY": "a-secret-key",
+    "POSTGRES_PASSWORD": "a-password",
+    "FIRST_SUPERUSER_PASSWORD": "a-password",
+}
+
+
+def test_password_hashing_is_cheap_only_in_local() -> None:
+    assert Settings(ENVIRONMENT="local", **SECRETS).password_bcrypt_rounds == 4
+    assert Settings(ENVIRONMENT="production", **SECRETS).password_bcrypt_rounds == 12
+    settings = Settings(ENVIRONMENT="local", PASSWORD_BCRYPT_ROUNDS=6, **SECRETS)
+    assert settings.password_bcrypt_rounds == 6
+
+
+def test_weak_password_hashing_is_rejected_outside_local() -> None:
+    with pytest.raises(ValueError, match="PASSWORD_BCRYPT_ROUNDS"):
+        Settings(ENVIRONMENT="staging", PASSWORD_BCRYPT_ROUNDS=4, **SECRETS)
@@ -0,0 +1,85 @@
+import os
+from contextlib import ExitStack
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from psycopg.errors import ReadOnlySqlTransaction
+from sqlalchemy.exc import DBAPIError
+from sqlmodel import Session, col, select, text, update
+
+from app.api.deps import ReadSessionDep
+from app.core.config import settings
+from app.core.db import create_read_only_session, get_engine
+from app.main import create_app
+from app.models import User
+
+
+def test_lifespan_disposes_engine_on_shutdown() -> None:
+    with TestClient(create_app()) as client:
+        engine = get_engine()
+        r = client.get(f"{settings.API_V1_STR}/utils/health-check/")
+        assert r.status_code == 200
+        assert get_engine() is engine
+    assert get_engine() is not engine
+
+
+def test_forked_child_does_not_reuse_parent_connections() -> None:
+    engine = get_engine()
+    with engine.connect() as connection:
+        connection.execute(select(1))
+    pool = engine.pool
+    assert pool.checkedin() >= 1
+
+    pid = os.fork()
+    if pid == 0:
+        fresh_pool = engine.pool is not pool and engine.pool.checkedin() == 0
+        os._exit(0 if fresh_pool else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert engine.pool is pool
+
+
+def test_read_only_session_rejects_writes() -> None:
+    with create_read_only_session() as session:
+        assert session.exec(select(User)).first()
+        with pytest.raises(DBAPIError) as exc_info:
+            session.exec(text("CREATE TEMPORARY TABLE scratch (id int)"))  # type: ignore
+    assert isinstance(exc_info.value.orig, ReadOnlySqlTransaction)
+
+
+def test_read_only_flag_is_reset_on_pool_return() -> None:
+    engine = get_engine()
+    with create_read_only_session() as session:
+        pid = session.exec(text("SELECT pg_backend_pid()")).one()[0]  # type: ignore
+    # Check out every idle connection, to get the one the session used back
+    with ExitStack() as stack:
+        for _ in range(engine.pool.checkedin()):  # type: ignore[attr-defined]
+            connection = stack.enter_context(engine.connect())
+            statement = text(
+                "SELECT pg_backend_pid(), current_setting('transaction_read_only')"
+            )
+            if connection.execute(statement).one() == (pid, "off"):
+                return
+    pytest.fail("The connection of the read-only session is still read-only")
+
+
+def test_read_session_dependency_rejects_writes(app: FastAPI, db: Session) -> None:
+    db_user = db.exec(select(User)).first()
+    assert db_user
+    statement = update(User).where(col(User.id) == db_user.id).values(name="x")
+    read_app = FastAPI()
+    read_app.dependency_overrides = app.dependency_overrides
+
+    @read_app.get("/")
+    def write(session: ReadSessionDep) -> None:
+        session.exec(statement)  # type: ignore[call-overload]
+
+    with TestClient(read_app) as client:
+        with pytest.raises(DBAPIError) as exc_info:
+            client.get("/")
+    assert isinstance(exc_info.value.orig, ReadOnlySqlTransaction)
+    # The savepoint of the request was rolled back, the test can still write
+    db_user.name = "Still writable"
+    db.add(db_user)
+    db.commit()
@@ -0,0 +1,92 @@
+import time
+from unittest.mock import patch
+
+import anyio
+import psycopg
+from fastapi.testclient import TestClient
+from sqlmodel import text
+
+from app.api.deps import SessionDep
+from app.main import create_app
+
+
+def create_slow_app() -> TestClient:
+    app = create_app()
+
+    @app.get("/slow-query", tags=["test"])
+    def slow_query(session: SessionDep) -> str:
+        session.exec(text("SELECT pg_sleep(5)"))  # type: ignore
+        return "done"
+
+    @app.api_route("/statement-timeout", methods=["GET", "POST"], tags=["test"])
+    def statement_timeout(session: SessionDep, wait: float = 0) -> int:
+        time.sleep(wait)
+        statement = text(
+            "SELECT setting FROM pg_settings WHERE name = 'statement_timeout'"
+        )
+        return int(session.exec(statement).one()[0])  # type: ignore
+
+    @app.get("/slow-async", tags=["test"])
+    async def slow_async() -> str:
+        await anyio.sleep(5)
+        return "done"
+
+    return TestClient(app)
+
+
+def test_statement_timeout_follows_route_deadline() -> None:
+    with (
+        patch("app.core.config.settings.REQUEST_DEADLINES_SECONDS", {"reads": 60}),
+        patch("app.core.config.settings.REQUEST_DEADLINE_SECONDS", 30),
+        create_slow_app() as client,
+    ):
+        assert client.get("/statement-timeout").json() == 60_000
+        assert client.post("/statement-timeout").json() == 30_000
+        assert client.get("/statement-timeout").json() == 60_000
+
+
+def test_statement_timeout_is_only_sent_when_it_changes() -> None:
+    with (
+        patch("app.core.config.settings.REQUEST_DEADLINES_SECONDS", {"reads": 60}),
+        create_slow_app() as client,
+    ):
+        client.get("/statement-timeout")
+        with patch.object(
+            psycopg.Cursor, "execute", autospec=True, side_effect=psycopg.Cursor.execute
+        ) as execute:
+            client.get("/statement-timeout")
+    statements = [str(call.args[1]) for call in execute.call_args_list]
+    assert statements
+    assert not any("statement_timeout =" in statement for statement in statements)
+
+
+def test_statement_timeout_tightens_late_in_the_request() -> None:
+    with (
+        patch("app.core.config.settings.REQUEST_DEADLINES_SECONDS", {"reads": 1}),
+        create_slow_app() as client,
+    ):
+        r = client.get("/statement-timeout", params={"wait": 0.6})
+    assert r.status_code == 200
+    assert 1 <= r.json() <= 400
+
+
+def test_runaway_query_is_canceled() -> None:
+    with (
+        patch(
+            "app.core.config.settings.REQUEST_DEADLINES_SECONDS",
+            {"test-slow_query": 0.2},
+        ),
+        create_slow_app() as client,
+    ):
+        r = client.get("/slow-query")
+    assert r.status_code == 504
+    assert r.elapsed.total_seconds() < 2
+
+
+def test_request_past_deadline_is_answered_with_504() -> None:
+    with (
+        patch("app.core.config.settings.REQUEST_DEADLINES_SECONDS", {"reads": 0.2}),
+        create_slow_app() as client,
+    ):
+        r = client.get("/slow-async")
+    assert r.status_code == 504
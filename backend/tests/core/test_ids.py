@@ -0,0 +1,35 @@
+import time
+import uuid
+
+from app.core.ids import uuid7, uuid7_timestamp_ms
+from app.models import Item
+
+
+def test_uuid7_layout() -> None:
+    before = time.time_ns() // 1_000_000
+    value = uuid7()
+    after = time.time_ns() // 1_000_000
+    assert isinstance(value, uuid.UUID)
+    assert value.version == 7
+    assert value.variant == uuid.RFC_4122
+    assert before <= uuid7_timestamp_ms(value) <= after
+
+
+def test_uuid7_is_time_ordered() -> None:
+    values = []
+    for _ in range(5):
+        values.append(uuid7())
+        time.sleep(0.002)
+    assert values == sorted(values)
+
+
+def test_uuid7_increases_within_a_millisecond() -> None:
+    values = [uuid7() for _ in range(10_000)]
+    assert values == sorted(values)
+    assert len(set(values)) == len(values)
+    assert all(value.version == 7 for value in values)
+
+
+def test_models_default_to_uuid7() -> None:
+    item = Item(title="Foo", owner_id=uuid.uuid4())
+    assert item.id.version == 7
@@ -0,0 +1,48 @@
+import json
+import subprocess
+import sys
+
+# Budget for importing `app.main` and building the app, which every worker
+# process and test run pays
+IMPORT_TIME_BUDGET_SECONDS = 1.5
+
+# Imported on first use, they must not slow down the startup
+LAZY_MODULES = ["emails", "jinja2", "sentry_sdk"]
+
+IMPORT_APP = f"""
+import json, sys, time
+start = time.process_time()
+import app.main
+app.main.create_app()
+print(json.dumps({{
+    "seconds": time.process_time() - start,
+    "lazy_modules": [m for m in {LAZY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+def import_app() -> tuple[float, list[str]]:
+    """Import `app.main` and build the app in a fresh interpreter, return the CPU
+    time it took and the lazy modules that got imported with it.
+
+    CPU time rather than wall time, so tests running in parallel don't count.
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_APP], capture_output=True, text=True, check=True
+    )
+    report = json.loads(result.stdout)
+    return report["seconds"], report["lazy_modules"]
+
+
+def test_lazy_modules_are_not_imported_at_startup() -> None:
+    _, lazy_modules = import_app()
+    assert lazy_modules == []
+
+
+def test_import_time_within_budget() -> None:
+    import_time = min(import_app()[0] for _ in range(3))
+    assert import_time < IMPORT_TIME_BUDGET_SECONDS, (
+        f"Importing app.main and building the app took {import_time:.2f}s, "
+        f"over the {IMPORT_TIME_BUDGET_SECONDS}s budget. "
+        "Run scripts/import-time.sh to find the slowest imports."
+    )
@@ -0,0 +1,54 @@
+from unittest.mock import patch
+
+import anyio
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.limits import ConcurrencyLimiter
+from app.main import create_app
+
+
+def test_limiter_queues_then_sheds() -> None:
+    async def scenario() -> None:
+        limiter = ConcurrencyLimiter(limit=1, queue_size=1)
+        assert await limiter.acquire(timeout=1) == 0.0
+        waited: list[float | None] = []
+
+        async def queued() -> None:
+            waited.append(await limiter.acquire(timeout=1))
+
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(queued)
+            await anyio.sleep(0.01)
+            assert limiter.waiting == 1
+            assert await limiter.acquire(timeout=1) is None
+            limiter.release()
+        assert waited[0] is not None and waited[0] > 0
+
+    anyio.run(scenario)
+
+
+def test_limiter_sheds_after_timeout() -> None:
+    async def scenario() -> None:
+        limiter = ConcurrencyLimiter(limit=0, queue_size=1)
+        assert await limiter.acquire(timeout=0.01) is None
+        assert limiter.waiting == 0
+
+    anyio.run(scenario)
+
+
+def test_saturated_group_answers_503() -> None:
+    with (
+        patch("app.core.config.settings.CONCURRENCY_LIMITS", {"auth": 0}),
+        patch("app.core.config.settings.CONCURRENCY_QUEUE_SIZES", {"auth": 0}),
+        TestClient(create_app()) as client,
+    ):
+        r = client.post(
+            f"{settings.API_V1_STR}/login/access-token",
+            data={"username": "a@example.com", "password": "password"},
+        )
+        assert r.status_code == 503
+        assert r.headers["Retry-After"] == str(settings.CONCURRENCY_RETRY_AFTER_SECONDS)
+        # Other groups are not affected
+        r = client.get(f"{settings.API_V1_STR}/utils/health-check/")
+        assert r.status_code == 200
@@ -0,0 +1,75 @@
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client.parser import text_string_to_metric_families
+
+from app.core.config import settings
+
+
+def get_samples(
+    client: TestClient,
+) -> dict[tuple[str, frozenset[tuple[str, str]]], float]:
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    return {
+        (sample.name, frozenset(sample.labels.items())): sample.value
+        for family in text_string_to_metric_families(r.text)
+        for sample in family.samples
+    }
+
+
+def test_request_metrics_are_labelled_by_route_id(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    labels = frozenset({("method", "GET"), ("route", "users-read_users")})
+    count_key = ("http_requests_total", labels | {("status", "200")})
+    before = get_samples(client).get(count_key, 0.0)
+
+    r = client.get(f"{settings.API_V1_STR}/users/", headers=superuser_token_headers)
+    assert r.status_code == 200
+
+    samples = get_samples(client)
+    assert samples[count_key] == before + 1
+    assert samples[("http_request_duration_seconds_count", labels)] >= 1
+    assert samples[("http_requests_in_progress", labels)] == 0
+
+
+def test_unknown_paths_share_a_route_label(client: TestClient) -> None:
+    r = client.get(f"{settings.API_V1_STR}/does-not-exist/123")
+    assert r.status_code == 404
+    samples = get_samples(client)
+    key = (
+        "http_requests_total",
+        frozenset({("method", "GET"), ("route", "unmatched"), ("status", "404")}),
+    )
+    assert samples[key] >= 1
+
+
+def test_password_hash_and_pool_metrics(client: TestClient) -> None:
+    login_data = {
+        "username": settings.FIRST_SUPERUSER,
+        "password": settings.FIRST_SUPERUSER_PASSWORD,
+    }
+    client.post(f"{settings.API_V1_STR}/login/access-token", data=login_data)
+    samples = get_samples(client)
+    verify = frozenset({("operation", "verify")})
+    assert samples[("password_hash_duration_seconds_count", verify)] >= 1
+    assert samples[("db_pool_connections", frozenset())] >= 1
+
+
+@pytest.mark.parametrize("token", [None, "scraper-token"])
+def test_metrics_require_the_token_outside_local(
+    client: TestClient, token: str | None
+) -> None:
+    with (
+        patch("app.core.config.settings.ENVIRONMENT", "production"),
+        patch("app.core.config.settings.METRICS_TOKEN", token),
+    ):
+        r = client.get("/metrics")
+        assert r.status_code == 401
+        assert r.headers["www-authenticate"] == "Bearer"
+        r = client.get("/metrics", headers={"Authorization": "Bearer wrong"})
+        assert r.status_code == 401
+        r = client.get("/metrics", headers={"Authorization": f"Bearer {token}"})
+        assert r.status_code == (401 if token is None else 200)
@@ -0,0 +1,55 @@
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+
+
+def get_profiled(
+    client: TestClient, tmp_path: Path, headers: dict[str, str], environment: str
+) -> str | None:
+    with (
+        patch("app.core.config.settings.PROFILE_DIR", str(tmp_path)),
+        patch("app.core.config.settings.PROFILE_INTERVAL_MS", 1),
+        patch("app.core.config.settings.ENVIRONMENT", environment),
+    ):
+        r = client.get(
+            f"{settings.API_V1_STR}/users/", headers={**headers, "X-Profile": "1"}
+        )
+    return r.headers.get("X-Profile-File")
+
+
+def test_profile_is_written_in_folded_format(
+    client: TestClient, superuser_token_headers: dict[str, str], tmp_path: Path
+) -> None:
+    name = get_profiled(client, tmp_path, superuser_token_headers, "local")
+    assert name
+    assert name.startswith("users-read_users-")
+    for line in (tmp_path / name).read_text().splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) > 0
+        assert ";" in stack
+
+
+def test_profiling_outside_local_requires_superuser(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    normal_user_token_headers: dict[str, str],
+    tmp_path: Path,
+) -> None:
+    assert get_profiled(client, tmp_path, superuser_token_headers, "staging")
+    assert not get_profiled(client, tmp_path, normal_user_token_headers, "staging")
+    assert not get_profiled(client, tmp_path, {}, "staging")
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_only_the_newest_profiles_are_kept(
+    client: TestClient, superuser_token_headers: dict[str, str], tmp_path: Path
+) -> None:
+    with patch("app.core.config.settings.PROFILE_MAX_FILES", 2):
+        names = [
+            get_profiled(client, tmp_path, superuser_token_headers, "local")
+            for _ in range(3)
+        ]
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(names[1:])
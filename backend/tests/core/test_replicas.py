@@ -0,0 +1,134 @@
+import math
+import time
+import uuid
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import col, func, select, update
+
+from app.api.deps import PRIMARY_READS_COOKIE
+from app.core.config import settings
+from app.core.db import RoutingSession, create_read_only_session
+from app.core.revocation import revoked_tokens
+from app.main import create_app
+from app.models import User
+from tests.utils.utils import get_superuser_token_headers
+
+
+def count_users(session: RoutingSession) -> int:
+    return session.exec(select(func.count()).select_from(User)).one()
+
+
+@pytest.mark.usefixtures("replica")
+def test_read_only_sessions_read_from_replica() -> None:
+    with create_read_only_session() as session:
+        assert count_users(session) == 0
+    with RoutingSession() as session:
+        assert count_users(session) > 0
+
+
+def test_only_commits_that_wrote_call_on_write() -> None:
+    writes: list[None] = []
+    with RoutingSession(on_write=lambda: writes.append(None)) as session:
+        session.commit()
+        user = session.exec(select(User)).first()
+        session.add(user)
+        session.commit()
+        assert writes == []
+        session.exec(update(User).where(col(User.id) == uuid.uuid4()).values(name="x"))
+        session.commit()
+        assert len(writes) == 1
+
+
+@pytest.mark.usefixtures("replica")
+def test_reads_stick_to_primary_after_a_write() -> None:
+    # Each request could be served by another worker, the client carries the
+    # stickiness in a cookie
+    url = f"{settings.API_V1_STR}/users/"
+    with TestClient(create_app()) as client:
+        # Claims tokens don't load the user, which the replica doesn't have. The
+        # versions revoked by other tests were rolled back
+        revoked_tokens.clear()
+        with patch("app.core.config.settings.ACCESS_TOKEN_CLAIMS", True):
+            superuser_token_headers = get_superuser_token_headers(client)
+        client.cookies.clear()
+        r = client.get(url, headers=superuser_token_headers)
+        assert r.json()["count"] == 0
+
+        name = client.get(f"{url}me", headers=superuser_token_headers).json()["name"]
+        r = client.patch(
+            f"{url}me", headers=superuser_token_headers, json={"name": name}
+        )
+        assert PRIMARY_READS_COOKIE not in r.cookies
+        r = client.patch(
+            f"{url}me", headers=superuser_token_headers, json={"name": "Sticky"}
+        )
+        assert PRIMARY_READS_COOKIE in r.cookies
+        r = client.get(url, headers=superuser_token_headers)
+        assert r.json()["count"] > 0
+
+        client.patch(f"{url}me", headers=superuser_token_headers, json={"name": name})
+        client.cookies.clear()
+        r = client.get(url, headers=superuser_token_headers)
+        assert r.json()["count"] == 0
+
+
+@pytest.mark.usefixtures("replica")
+def test_primary_reads_cookie() -> None:
+    url = f"{settings.API_V1_STR}/users/"
+    with TestClient(create_app()) as client:
+        revoked_tokens.clear()
+        with patch("app.core.config.settings.ACCESS_TOKEN_CLAIMS", True):
+            superuser_token_headers = get_superuser_token_headers(client)
+        client.cookies.clear()
+        name = client.get(f"{url}me", headers=superuser_token_headers).json()["name"]
+        r = client.patch(
+            f"{url}me", headers=superuser_token_headers, json={"name": "Sticky"}
+        )
+        cookie = r.headers["set-cookie"]
+        assert cookie.startswith(f"{PRIMARY_READS_COOKIE}=")
+        assert f"Path={settings.API_V1_STR}" in cookie
+        assert f"Max-Age={math.ceil(settings.REPLICA_STICKY_SECONDS)}" in cookie
+        assert "HttpOnly" in cookie
+        # The next read is served by the primary, which has the write
+        r = client.get(f"{url}me", headers=superuser_token_headers)
+        assert r.json()["name"] == "Sticky"
+        assert client.get(url, headers=superuser_token_headers).json()["count"] > 0
+
+        client.patch(f"{url}me", headers=superuser_token_headers, json={"name": name})
+        client.cookies.set(
+            PRIMARY_READS_COOKIE, f"{time.time() - 1:.3f}", path=settings.API_V1_STR
+        )
+        r = client.get(url, headers=superuser_token_headers)
+        assert r.json()["count"] == 0
+
+
+@pytest.mark.usefixtures("replica")
+def test_revocations_are_loaded_from_the_primary() -> None:
+    with TestClient(create_app()) as client:
+        revoked_tokens.clear()
+        with patch("app.core.config.settings.ACCESS_TOKEN_CLAIMS", True):
+            superuser_token_headers = get_superuser_token_headers(client)
+        with RoutingSession() as session:
+            superuser = session.exec(
+                select(User).where(User.email == settings.FIRST_SUPERUSER)
+            ).one()
+            version = superuser.token_version
+            superuser.token_version += 1
+            superuser.token_version_bumped_at = datetime.now(timezone.utc)
+            session.add(superuser)
+            session.commit()
+            try:
+                # The replica has no user, its revocations would be empty
+                revoked_tokens.clear()
+                r = client.get(
+                    f"{settings.API_V1_STR}/users/", headers=superuser_token_headers
+                )
+                assert r.status_code == 403
+            finally:
+                superuser.token_version = version
+                session.add(superuser)
+                session.commit()
+                revoked_tokens.clear()
@@ -0,0 +1,45 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.revocation import RevocationSet
+from tests.utils.user import create_random_user
+
+
+def test_sync_loads_the_bumps_of_valid_tokens_only(db: Session) -> None:
+    now = datetime.now(timezone.utc)
+    lifetime = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    recent, old = create_random_user(db), create_random_user(db)
+    for user, bumped_at in [(recent, now), (old, now - lifetime - timedelta(1))]:
+        user.token_version = 2
+        user.token_version_bumped_at = bumped_at
+        db.add(user)
+    db.commit()
+
+    revoked = RevocationSet()
+    revoked.sync(db)
+    assert revoked.is_revoked(recent.id, 1)
+    assert not revoked.is_revoked(recent.id, 2)
+    # Every token issued before the old bump expired
+    assert not revoked.is_revoked(old.id, 1)
+
+
+def test_first_sync_waits_for_the_sync_running(db: Session) -> None:
+    revoked = RevocationSet()
+    locked = threading.Event()
+
+    def hold_lock() -> None:
+        with revoked._lock:
+            locked.set()
+            time.sleep(0.2)
+
+    thread = threading.Thread(target=hold_lock)
+    thread.start()
+    locked.wait()
+    revoked.sync(db)
+    thread.join()
+    # Requests can't check tokens against a set that was never loaded
+    assert not revoked.is_stale()
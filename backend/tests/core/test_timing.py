@@ -0,0 +1,77 @@
+import logging
+import re
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from tests.utils.utils import random_email, random_lower_string
+
+
+def parse_server_timing(header: str) -> dict[str, str]:
+    return {entry.split(";")[0].strip(): entry for entry in header.split(",")}
+
+
+def test_server_timing_header(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    r = client.get(f"{settings.API_V1_STR}/users/", headers=superuser_token_headers)
+    assert r.status_code == 200
+    timings = parse_server_timing(r.headers["Server-Timing"])
+    assert set(timings) == {"db", "db-slowest", "hash", "queue", "app"}
+    # Current user lookup, count and page
+    match = re.search(r'desc="(\d+) queries"', timings["db"])
+    assert match
+    assert int(match.group(1)) >= 3
+
+
+def test_server_timing_includes_hashing(
+    client: TestClient, superuser_token_headers: dict[str, str]
+) -> None:
+    data = {"email": random_email(), "password": random_lower_string()}
+    r = client.post(
+        f"{settings.API_V1_STR}/users/", headers=superuser_token_headers, json=data
+    )
+    timings = parse_server_timing(r.headers["Server-Timing"])
+    match = re.search(r"dur=([\d.]+)", timings["hash"])
+    assert match
+    assert float(match.group(1)) > 0
+
+
+def test_server_timing_hides_hashing_on_auth_routes(client: TestClient) -> None:
+    login_data = {
+        "username": settings.FIRST_SUPERUSER,
+        "password": settings.FIRST_SUPERUSER_PASSWORD,
+    }
+    r = client.post(f"{settings.API_V1_STR}/login/access-token", data=login_data)
+    timings = parse_server_timing(r.headers["Server-Timing"])
+    assert set(timings) == {"db", "db-slowest", "queue", "app"}
+
+
+def test_server_timing_can_be_disabled(client: TestClient) -> None:
+    with patch("app.core.config.settings.SERVER_TIMING_ENABLED", False):
+        r = client.get(f"{settings.API_V1_STR}/utils/health-check/")
+    assert "Server-Timing" not in r.headers
+
+
+def test_server_timing_is_off_outside_local(client: TestClient) -> None:
+    with patch("app.core.config.settings.ENVIRONMENT", "staging"):
+        r = client.get(f"{settings.API_V1_STR}/utils/health-check/")
+    assert "Server-Timing" not in r.headers
+
+
+def test_slow_query_log_includes_route_id(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    with (
+        patch("app.core.config.settings.SLOW_QUERY_THRESHOLD_MS", 0),
+        caplog.at_level(logging.WARNING, logger="app.core.timing"),
+    ):
+        client.get(f"{settings.API_V1_STR}/users/", headers=superuser_token_headers)
+    assert any(
+        "users-read_users" in record.getMessage() and "SELECT" in record.getMessage()
+        for record in caplog.records
+    )
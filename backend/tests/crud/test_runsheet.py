@@ -0,0 +1,28 @@
+from sqlalchemy import inspect
+from sqlmodel import Session, select
+
+from app import crud
+from app.models import Runsheet
+from tests.utils.runsheet import create_random_runsheet
+
+
+def test_long_texts_are_deferred(db: Session) -> None:
+    runsheet_id = create_random_runsheet(db)
+    runsheet = db.exec(select(Runsheet).where(Runsheet.id == runsheet_id)).one()
+    samples = runsheet.samples
+    assert "description" in inspect(runsheet).unloaded
+    assert {"description", "notes"} <= inspect(samples[0]).unloaded
+    assert runsheet.description == "Etch test"
+    db.expunge_all()
+
+
+def test_get_runsheet_detail(db: Session) -> None:
+    runsheet_id = create_random_runsheet(db)
+    runsheet = crud.get_runsheet_detail(session=db, runsheet_id=runsheet_id)
+    assert runsheet
+    db.expunge_all()
+    # Detached, so reading a column that was not loaded would raise
+    assert runsheet.description == "Etch test"
+    assert runsheet.samples[0].description == "Wafer"
+    assert runsheet.step_processes[0].details == "Piranha clean"
+    assert runsheet.step_processes[0].samples[0].description == "Wafer"
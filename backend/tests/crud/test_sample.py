@@ -0,0 +1,27 @@
+from sqlmodel import Session
+
+from app import crud
+from app.enums.sample_type import SampleType
+from app.models import Sample
+from app.schemas.sample.sample_creation import SampleCreate
+from tests.utils.user import create_random_user
+from tests.utils.utils import random_lower_string
+
+
+def test_create_samples(db: Session) -> None:
+    user = create_random_user(db)
+    samples_in = [
+        SampleCreate(
+            citic_id=random_lower_string(), type=SampleType.wafer, notes="Chipped"
+        )
+        for _ in range(20)
+    ]
+    samples = crud.create_samples(session=db, samples_in=samples_in, creator_id=user.id)
+    assert [sample.citic_id for sample in samples] == [
+        sample_in.citic_id for sample_in in samples_in
+    ]
+    for sample in samples:
+        assert sample.creator_id == user.id
+        assert sample.type == SampleType.wafer
+        assert sample.notes == "Chipped"
+        assert db.get(Sample, sample.id) is sample
@@ -1,8 +1,10 @@
 from fastapi.encoders import jsonable_encoder
+from passlib.hash import bcrypt
 from sqlmodel import Session
 
 from app import crud
-from app.core.security import verify_password
+from app.core.config import settings
+from app.core.security import pwd_context, verify_password
 from app.models import User
 from app.schemas.user.user_creation import UserCreate
 from app.schemas.user.user_updating import UserUpdate
@@ -18,6 +20,14 @@ def test_create_user(db: Session) -> None:
     assert hasattr(user, "hashed_password")
 
 
+def test_get_user_by_email_ignores_case(db: Session) -> None:
+    email = random_email()
+    user_in = UserCreate(email=email.upper(), password=random_lower_string())
+    user = crud.create_user(session=db, user_create=user_in)
+    assert user.email == email
+    assert crud.get_user_by_email(session=db, email=email.title()) == user
+
+
 def test_authenticate_user(db: Session) -> None:
     email = random_email()
     password = random_lower_string()
@@ -35,6 +45,24 @@ def test_not_authenticate_user(db: Session) -> None:
     assert user is None
 
 
+def test_authenticate_user_rehashes_outdated_hash(db: Session) -> None:
+    email = random_email()
+    password = random_lower_string()
+    user_in = UserCreate(email=email, password=password)
+    user = crud.create_user(session=db, user_create=user_in)
+    outdated_rounds = settings.password_bcrypt_rounds + 1
+    outdated_hash = bcrypt.using(rounds=outdated_rounds).hash(password)
+    user.hashed_password = outdated_hash
+    db.add(user)
+    db.commit()
+
+    authenticated_user = crud.authenticate(session=db, email=email, password=password)
+    assert authenticated_user
+    assert authenticated_user.hashed_password != outdated_hash
+    assert not pwd_context.needs_update(authenticated_user.hashed_password)
+    assert verify_password(password, authenticated_user.hashed_password)
+
+
 def test_check_if_user_is_active(db: Session) -> None:
     email = random_email()
     password = random_lower_string()
@@ -0,0 +1,41 @@
+from app.utils import (
+    get_email_templates,
+    load_email_templates,
+    render_email_template,
+    render_email_templates,
+)
+
+
+def test_load_email_templates_compiles_all_templates() -> None:
+    load_email_templates()
+    cache = get_email_templates().cache
+    assert cache is not None
+    cached_names = {name for _, name in cache.keys()}
+    assert {
+        "new_account.html",
+        "reset_password.html",
+        "test_email.html",
+    } <= cached_names
+
+
+def test_render_email_template() -> None:
+    html_content = render_email_template(
+        template_name="test_email.html",
+        context={"project_name": "Runsheet Manager", "email": "foo@example.com"},
+    )
+    assert "Runsheet Manager" in html_content
+    assert "foo@example.com" in html_content
+
+
+def test_render_email_templates_matches_single_render() -> None:
+    contexts = [
+        {"project_name": "Runsheet Manager", "email": f"user{i}@example.com"}
+        for i in range(3)
+    ]
+    html_contents = render_email_templates(
+        template_name="test_email.html", contexts=contexts
+    )
+    assert html_contents == [
+        render_email_template(template_name="test_email.html", context=context)
+        for context in contexts
+    ]
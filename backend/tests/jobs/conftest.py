@@ -0,0 +1,14 @@
+from collections.abc import Generator
+
+import pytest
+from sqlmodel import Session
+
+from app.core.db import get_engine
+
+
+@pytest.fixture(autouse=True)
+def db() -> Generator[Session, None, None]:
+    # Jobs are claimed and run through connections of their own, so these tests
+    # commit for real instead of rolling back a shared transaction
+    with Session(get_engine()) as session:
+        yield session
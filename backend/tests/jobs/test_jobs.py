@@ -0,0 +1,181 @@
+import email
+import threading
+from collections.abc import Generator
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, delete, select
+
+from app.core.config import settings
+from app.core.db import get_engine
+from app.enums.job_status import JobStatus
+from app.jobs import PRUNE_TASK, claim_jobs, enqueue, prune_jobs, run_job
+from app.models import Job
+from app.utils import send_email
+from app.worker import work
+from tests.utils.smtp import SMTPState, run_smtp_server
+from tests.utils.utils import random_email
+
+
+@pytest.fixture(autouse=True)
+def clear_jobs(db: Session) -> Generator[None, None, None]:
+    db.exec(delete(Job))  # type: ignore
+    db.commit()
+    yield
+    db.exec(delete(Job))  # type: ignore
+    db.commit()
+
+
+@pytest.fixture
+def smtp_server() -> Generator[SMTPState, None, None]:
+    with run_smtp_server() as (port, state):
+        with (
+            patch("app.core.config.settings.SMTP_HOST", "127.0.0.1"),
+            patch("app.core.config.settings.SMTP_PORT", port),
+            patch("app.core.config.settings.SMTP_TLS", False),
+            patch("app.core.config.settings.SMTP_SSL", False),
+            patch("app.core.config.settings.SMTP_USER", None),
+            patch("app.core.config.settings.SMTP_PASSWORD", None),
+        ):
+            yield state
+
+
+def claim_and_run(db: Session) -> list[Job]:
+    job_ids = claim_jobs(session=db, limit=10)
+    jobs = [job for job in (db.get(Job, job_id) for job_id in job_ids) if job]
+    for job in jobs:
+        run_job(session=db, job=job)
+    return jobs
+
+
+def test_recover_password_enqueues_email(
+    client: TestClient, normal_user_token_headers: dict[str, str], db: Session
+) -> None:
+    with patch("app.core.config.settings.SMTP_HOST", "smtp.example.com"):
+        r = client.post(
+            f"{settings.API_V1_STR}/password-recovery/{settings.EMAIL_TEST_USER}",
+            headers=normal_user_token_headers,
+        )
+    assert r.status_code == 200
+    job = db.exec(select(Job)).one()
+    assert job.task == "send_email"
+    assert job.status == JobStatus.queued
+    assert job.payload == {
+        "email_to": settings.EMAIL_TEST_USER,
+        "email": "password_recovery",
+        "params": {"email": settings.EMAIL_TEST_USER},
+    }
+
+
+def test_worker_renders_new_account_email(db: Session, smtp_server: SMTPState) -> None:
+    email_to = random_email()
+    send_email(
+        session=db,
+        email_to=email_to,
+        email="new_account",
+        params={"username": email_to},
+    )
+    db.commit()
+    (job,) = claim_and_run(db)
+    assert job.status == JobStatus.done
+    (received,) = smtp_server.messages
+    message = email.message_from_string(received.data)
+    (html,) = (
+        part for part in message.walk() if part.get_content_type() == "text/html"
+    )
+    assert "/reset-password?token=" in html.get_payload(decode=True).decode()
+
+
+def test_worker_delivers_email(db: Session, smtp_server: SMTPState) -> None:
+    email_to = random_email()
+    send_email(session=db, email_to=email_to, email="test_email")
+    db.commit()
+    jobs = claim_and_run(db)
+    assert len(jobs) == 1
+    assert jobs[0].status == JobStatus.done
+    assert jobs[0].attempts == 1
+    assert len(smtp_server.messages) == 1
+    assert smtp_server.messages[0].rcpt_to == [f"<{email_to}>"]
+
+
+def test_failed_delivery_is_retried_with_backoff(
+    db: Session, smtp_server: SMTPState
+) -> None:
+    smtp_server.reject_next = 1
+    send_email(session=db, email_to=random_email(), email="test_email")
+    db.commit()
+    (job,) = claim_and_run(db)
+    assert job.status == JobStatus.queued
+    assert job.attempts == 1
+    assert job.last_error
+    assert job.run_at > datetime.now(timezone.utc)
+    # Not due yet, so it is not claimed again
+    assert claim_jobs(session=db, limit=10) == []
+
+    job.run_at = datetime.now(timezone.utc)
+    db.add(job)
+    db.commit()
+    (job,) = claim_and_run(db)
+    assert job.status == JobStatus.done
+    assert job.attempts == 2
+    assert len(smtp_server.messages) == 1
+
+
+def test_job_fails_after_max_attempts(db: Session) -> None:
+    enqueue(session=db, task="unknown-task", payload={}, max_attempts=1)
+    db.commit()
+    (job,) = claim_and_run(db)
+    assert job.status == JobStatus.failed
+    assert "unknown-task" in (job.last_error or "")
+
+
+def test_claim_skips_locked_jobs(db: Session) -> None:
+    job = enqueue(session=db, task="unknown-task", payload={})
+    db.commit()
+    with Session(get_engine()) as other_session:
+        statement = select(Job).where(Job.id == job.id).with_for_update()
+        assert other_session.exec(statement).one()
+        assert claim_jobs(session=db, limit=10) == []
+    assert claim_jobs(session=db, limit=10) == [job.id]
+
+
+def test_work_loop_processes_queue(db: Session, smtp_server: SMTPState) -> None:
+    for _ in range(3):
+        send_email(session=db, email_to=random_email(), email="test_email")
+    db.commit()
+    stop = threading.Event()
+    with patch("app.core.config.settings.JOBS_POLL_INTERVAL_SECONDS", 0.05):
+        worker = threading.Thread(target=work, args=(get_engine(), stop))
+        worker.start()
+        for _ in range(100):
+            if len(smtp_server.messages) == 3:
+                break
+            stop.wait(0.05)
+        stop.set()
+        worker.join(timeout=5)
+    assert len(smtp_server.messages) == 3
+    statuses = db.exec(select(Job.status)).all()
+    assert statuses == [JobStatus.done] * 3
+
+
+def test_prune_finished_jobs(db: Session) -> None:
+    old = datetime.now(timezone.utc) - timedelta(days=settings.JOBS_RETENTION_DAYS + 1)
+    for status in JobStatus:
+        db.add(Job(task="unknown-task", payload={}, status=status, run_at=old))
+    db.add(Job(task="unknown-task", payload={}, status=JobStatus.done))
+    db.commit()
+    prune_jobs({})
+    remaining = db.exec(
+        select(Job.status, Job.task).where(Job.task != PRUNE_TASK)
+    ).all()
+    assert sorted(remaining) == sorted(
+        [
+            (JobStatus.queued, "unknown-task"),
+            (JobStatus.running, "unknown-task"),
+            (JobStatus.done, "unknown-task"),
+        ]
+    )
+    # The next pruning is queued
+    assert db.exec(select(Job).where(Job.task == PRUNE_TASK)).one().run_at > old
@@ -0,0 +1,66 @@
+import uuid
+from collections.abc import Generator
+
+import pytest
+from sqlmodel import Session, col, delete, select
+
+from app.enums.job_status import JobStatus
+from app.models import Job, StepProcess
+from app.step_order import (
+    POSITION_GAP,
+    REBALANCE_TASK,
+    rebalance_steps,
+    schedule_rebalance,
+)
+from tests.utils.runsheet import create_random_runsheet, delete_runsheet
+
+
+@pytest.fixture(autouse=True)
+def clear_jobs(db: Session) -> Generator[None, None, None]:
+    yield
+    db.exec(delete(Job))  # type: ignore
+    db.commit()
+
+
+def test_rebalance_spreads_positions_in_order(db: Session) -> None:
+    runsheet_id = create_random_runsheet(db)
+    try:
+        clean = db.exec(
+            select(StepProcess).where(StepProcess.runsheet_id == runsheet_id)
+        ).one()
+        db.add_all(
+            StepProcess(
+                title=title,
+                details=title,
+                position=position,
+                runsheet_id=runsheet_id,
+                creator_id=clean.creator_id,
+            )
+            for title, position in [("Strip", 7), ("Etch", 5)]
+        )
+        db.commit()
+
+        rebalance_steps({"runsheet_id": str(runsheet_id)})
+
+        statement = (
+            select(StepProcess.title, StepProcess.position)
+            .where(StepProcess.runsheet_id == runsheet_id)
+            .order_by(col(StepProcess.position))
+        )
+        assert list(db.exec(statement).all()) == [
+            ("Clean", POSITION_GAP),
+            ("Etch", POSITION_GAP * 2),
+            ("Strip", POSITION_GAP * 3),
+        ]
+    finally:
+        delete_runsheet(db, runsheet_id)
+
+
+def test_rebalance_is_scheduled_once(db: Session) -> None:
+    runsheet_id = uuid.uuid4()
+    schedule_rebalance(session=db, runsheet_id=runsheet_id)
+    schedule_rebalance(session=db, runsheet_id=runsheet_id)
+    jobs = db.exec(select(Job).where(Job.task == REBALANCE_TASK)).all()
+    assert len(jobs) == 1
+    assert jobs[0].status == JobStatus.queued
+    assert jobs[0].payload == {"runsheet_id": str(runsheet_id)}
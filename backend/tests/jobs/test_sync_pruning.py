@@ -0,0 +1,44 @@
+from collections.abc import Generator
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlmodel import Session, delete, select
+
+from app.core.config import settings
+from app.enums.job_status import JobStatus
+from app.models import Job, SyncTombstone
+from app.sync import PRUNE_TASK, prune_tombstones, schedule_tombstone_pruning
+
+
+@pytest.fixture(autouse=True)
+def clear_tombstones(db: Session) -> Generator[None, None, None]:
+    yield
+    db.exec(delete(SyncTombstone))  # type: ignore
+    db.exec(delete(Job))  # type: ignore
+    db.commit()
+
+
+def test_prune_tombstones(db: Session) -> None:
+    now = datetime.now(timezone.utc)
+    retention = timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    old, recent = (
+        SyncTombstone(table_name="sample", row_key={"id": str(i)}, deleted_at=at)
+        for i, at in enumerate([now - retention * 2, now - retention])
+    )
+    db.add_all([old, recent])
+    db.commit()
+
+    prune_tombstones({})
+
+    remaining = db.exec(select(SyncTombstone.id)).all()
+    assert remaining == [recent.id]
+    job = db.exec(select(Job).where(Job.task == PRUNE_TASK)).one()
+    assert job.status == JobStatus.queued
+    assert job.run_at > now + timedelta(hours=23)
+
+
+def test_pruning_is_scheduled_once(db: Session) -> None:
+    schedule_tombstone_pruning(session=db)
+    schedule_tombstone_pruning(session=db)
+    jobs = db.exec(select(Job).where(Job.task == PRUNE_TASK)).all()
+    assert len(jobs) == 1
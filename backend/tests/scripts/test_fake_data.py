@@ -0,0 +1,64 @@
+from sqlalchemy import text
+
+from app.core.db import get_engine
+from app.enums.runsheet_state import RunsheetState
+from app.enums.step_system import StepSystem
+from app.fake_data import FakeDataGenerator, Volumes, copy_rows
+
+VOLUMES = Volumes(users=20, items=10, samples=40, runsheets=10)
+
+
+def test_generator_is_reproducible() -> None:
+    first = FakeDataGenerator(VOLUMES, random_seed=1)
+    second = FakeDataGenerator(VOLUMES, random_seed=1)
+    other = FakeDataGenerator(VOLUMES, random_seed=2)
+    # Timestamps are relative to the time of generation
+    assert [row["citic_id"] for row in first.samples()] == [
+        row["citic_id"] for row in second.samples()
+    ]
+    assert first.sample_ids == second.sample_ids
+    assert first.sample_ids != other.sample_ids
+
+
+def test_samples_form_wafer_dice_genealogies() -> None:
+    samples = list(FakeDataGenerator(VOLUMES).samples())
+    wafers = {row["id"]: row for row in samples if row["type"] == "wafer"}
+    dice = [row for row in samples if row["type"] == "dice"]
+    assert len(wafers) == 4
+    assert len(dice) == 36
+    for row in dice:
+        parent = wafers[row["parent_sample_id"]]
+        assert parent["material"] == row["material"]
+
+
+def test_runsheets_and_steps_cover_all_states_and_systems() -> None:
+    generator = FakeDataGenerator(VOLUMES)
+    runsheets = list(generator.runsheets())
+    steps = list(generator.step_processes())
+    assert {row["state"] for row in runsheets} == {
+        state.name for state in RunsheetState
+    }
+    assert {row["system"] for row in steps} == {system.name for system in StepSystem}
+    assert len(steps) == VOLUMES.runsheets * VOLUMES.steps_per_runsheet
+
+    finished = {
+        row["id"] for row in runsheets if row["state"] == RunsheetState.finished.name
+    }
+    for row in steps:
+        if row["runsheet_id"] in finished:
+            assert row["completed"]
+        assert row["engineer_id"] in generator.engineer_ids
+
+    links = list(generator.sample_step_process_links())
+    assert len(links) == len(steps) * VOLUMES.samples_per_step
+
+
+def test_copy_rows() -> None:
+    generator = FakeDataGenerator(VOLUMES, random_seed=3)
+    with get_engine().connect() as connection:
+        copied = copy_rows(connection, '"user"', generator.users())
+        count = connection.execute(
+            text("SELECT count(*) FROM \"user\" WHERE email LIKE 'fake-3-%'")
+        ).scalar_one()
+        connection.rollback()
+    assert copied == count == VOLUMES.users
@@ -0,0 +1,45 @@
+import uuid
+
+from sqlmodel import Session, delete
+
+from app.models import Runsheet, Sample, StepProcess, SyncTombstone
+from tests.utils.user import create_random_user
+from tests.utils.utils import random_lower_string
+
+
+def create_random_runsheet(db: Session) -> uuid.UUID:
+    """Create a runsheet with a step and a sample, and detach them from `db`."""
+    user = create_random_user(db)
+    sample = Sample(
+        citic_id=random_lower_string(), description="Wafer", creator_id=user.id
+    )
+    runsheet = Runsheet(
+        citic_id=random_lower_string(),
+        description="Etch test",
+        creator_id=user.id,
+        reviewer_id=None,
+        samples=[sample],
+    )
+    runsheet.step_processes = [
+        StepProcess(
+            title="Clean",
+            details="Piranha clean",
+            creator_id=user.id,
+            samples=[sample],
+        )
+    ]
+    db.add(runsheet)
+    db.commit()
+    runsheet_id = runsheet.id
+    db.expunge_all()
+    return runsheet_id
+
+
+def delete_runsheet(db: Session, runsheet_id: uuid.UUID) -> None:
+    """Delete a committed runsheet from `create_random_runsheet`, with its rows."""
+    runsheet = db.get_one(Runsheet, runsheet_id)
+    for row in [*runsheet.samples, runsheet, runsheet.creator]:
+        db.delete(row)
+        db.flush()
+    db.exec(delete(SyncTombstone))  # type: ignore
+    db.commit()
@@ -0,0 +1,94 @@
+import socketserver
+import threading
+from collections.abc import Generator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+
+@dataclass
+class ReceivedEmail:
+    mail_from: str
+    rcpt_to: list[str]
+    data: str
+
+
+@dataclass
+class SMTPState:
+    messages: list[ReceivedEmail] = field(default_factory=list)
+    # Number of upcoming messages to reject with a temporary failure
+    reject_next: int = 0
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    server: "_SMTPServer"
+
+    def reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self) -> None:
+        state = self.server.state
+        mail_from = ""
+        rcpt_to: list[str] = []
+        self.reply("220 localhost stand-in SMTP")
+        for raw_line in self.rfile:
+            line = raw_line.decode().rstrip("\r\n")
+            command = line[:4].upper()
+            if command == "EHLO":
+                self.reply("250-localhost")
+                self.reply("250 8BITMIME")
+            elif command == "HELO":
+                self.reply("250 localhost")
+            elif command == "MAIL":
+                mail_from = line.split(":", 1)[1].strip()
+                rcpt_to = []
+                self.reply("250 OK")
+            elif command == "RCPT":
+                rcpt_to.append(line.split(":", 1)[1].strip())
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data_lines = []
+                for data_line in self.rfile:
+                    if data_line in (b".\r\n", b".\n"):
+                        break
+                    data_lines.append(data_line.decode())
+                if state.reject_next > 0:
+                    state.reject_next -= 1
+                    self.reply("451 Temporary failure, try again later")
+                else:
+                    state.messages.append(
+                        ReceivedEmail(
+                            mail_from=mail_from,
+                            rcpt_to=rcpt_to,
+                            data="".join(data_lines),
+                        )
+                    )
+                    self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+class _SMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, state: SMTPState) -> None:
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.state = state
+
+
+@contextmanager
+def run_smtp_server() -> Generator[tuple[int, SMTPState], None, None]:
+    """Run a local stand-in SMTP server, yielding its port and received emails."""
+    state = SMTPState()
+    server = _SMTPServer(state)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server.server_address[1], state
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -4,7 +4,7 @@ set -e
 set -x
 
 cd backend
-python -c "import app.main; import json; print(json.dumps(app.main.app.openapi()))" > ../openapi.json
+python -c "import app.main; import json; print(json.dumps(app.main.create_app().openapi()))" > ../openapi.json
 cd ..
 mv openapi.json frontend/
 cd frontend